@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+MDX Audit
+Checks every <slug>/page.mdx of the blog for leftover HTML tags, including
+hand-edited posts, without running the converter. See --help for the options.
+"""
+
+import sys
+
+from wordpress_mdx.cli import audit_main
+
+
+if __name__ == '__main__':
+    sys.exit(1 if audit_main() else 0)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Converter Benchmarks
+Generates synthetic WordPress exports and measures how fast the blog
+converters turn them into markdown.
+
+    python benchmarks/bench_converters.py                   # run and print results
+    python benchmarks/bench_converters.py --check           # fail on regressions
+    python benchmarks/bench_converters.py --update-baseline # store new numbers
+    python benchmarks/bench_converters.py --generate out.xml --posts 5000
+
+Each scenario/converter pair runs in a fresh process so peak RSS is measured
+per case. Baseline numbers are machine specific: refresh them with
+--update-baseline when moving the budget to another build box.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from xml.sax.saxutils import escape
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from wordpress_mdx import ENGINES, iter_posts  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Every engine of the conversion package
+CONVERTERS = ENGINES
+
+# Synthetic export shapes. Densities are the chance that a block is a
+# table, list or image instead of a paragraph. Lists nest as deep as the
+# inline markup unless list_depth says otherwise.
+SCENARIOS = {
+    'typical': {'posts': 200, 'body_kb': 20, 'tables': 0.05, 'lists': 0.15, 'images': 0.05, 'nesting': 1},
+    'long-posts': {'posts': 10, 'body_kb': 1000, 'tables': 0.05, 'lists': 0.15, 'images': 0.05, 'nesting': 1},
+    'table-heavy': {'posts': 50, 'body_kb': 100, 'tables': 0.6, 'lists': 0.0, 'images': 0.0, 'nesting': 1},
+    'list-heavy': {'posts': 50, 'body_kb': 100, 'tables': 0.0, 'lists': 0.6, 'images': 0.0, 'nesting': 3},
+    'image-heavy': {'posts': 50, 'body_kb': 50, 'tables': 0.0, 'lists': 0.0, 'images': 0.5, 'nesting': 1},
+    'deep-lists': {'posts': 50, 'body_kb': 100, 'tables': 0.0, 'lists': 0.6, 'images': 0.0, 'nesting': 1,
+                   'list_depth': 12},
+}
+
+# Tracked numbers and the direction in which a change is a regression
+METRICS = {
+    'posts_per_sec': 'higher',
+    'mb_per_sec': 'higher',
+    'peak_rss_mb': 'lower',
+}
+
+WORDS = (
+    'freight shipment carrier drayage warehouse pallet container logistics '
+    'delivery route driver dock trailer truckload customs broker cargo '
+    'inventory transit rate lane port rail cold chain hazmat compliance'
+).split()
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _inline(rng, depth):
+    """A run of text wrapped in up to depth levels of inline markup."""
+    text = _sentence(rng, 6)
+    for level in range(depth):
+        tag = ('strong', 'em', 'span', 'a')[level % 4]
+        if tag == 'a':
+            text = f'<a href="https://example.com/{rng.choice(WORDS)}/">{text}</a>'
+        else:
+            text = f'<{tag}>{text}</{tag}>'
+    return text
+
+
+def _paragraph(rng, nesting):
+    parts = [_sentence(rng) for _ in range(rng.randint(2, 5))]
+    parts.insert(rng.randint(0, len(parts)), _inline(rng, nesting))
+    return '<!-- wp:paragraph -->\n<p>' + ' '.join(parts) + '</p>\n<!-- /wp:paragraph -->'
+
+
+def _list(rng, depth):
+    tag = rng.choice(('ul', 'ol'))
+    items = []
+    for i in range(rng.randint(3, 6)):
+        item = _inline(rng, 1) + ' ' + _sentence(rng, 8)
+        if i == 0 and depth > 1:
+            item += _list(rng, depth - 1)
+        items.append(f'<li>{item}</li>')
+    return f'<{tag} class="wp-block-list">' + ''.join(items) + f'</{tag}>'
+
+
+def _table(rng):
+    cols = rng.randint(3, 6)
+    head = ''.join(f'<th>{rng.choice(WORDS).title()}</th>' for _ in range(cols))
+    rows = ''.join(
+        '<tr>' + ''.join(f'<td>{_inline(rng, 1)}</td>' for _ in range(cols)) + '</tr>'
+        for _ in range(rng.randint(5, 15))
+    )
+    return (f'<figure class="wp-block-table"><table><thead><tr>{head}</tr></thead>'
+            f'<tbody>{rows}</tbody></table></figure>')
+
+
+def _image(rng):
+    name = '-'.join(rng.choice(WORDS) for _ in range(3))
+    return (f'<figure class="wp-block-image"><img src="https://crexpressinc.com/wp-content/'
+            f'uploads/2025/01/{name}.jpg" alt="{name.replace("-", " ")}"/>'
+            f'<figcaption>{_sentence(rng, 5)}</figcaption></figure>')
+
+
+def generate_body(rng, body_kb, tables, lists, images, nesting, list_depth=None):
+    """Build one post body of roughly body_kb kilobytes."""
+    list_depth = list_depth or nesting
+    blocks = []
+    size = 0
+    while size < body_kb * 1024:
+        roll = rng.random()
+        if roll < tables:
+            block = _table(rng)
+        elif roll < tables + lists:
+            block = _list(rng, list_depth)
+        elif roll < tables + lists + images:
+            block = _image(rng)
+        elif roll < tables + lists + images + 0.1:
+            level = rng.randint(2, 4)
+            block = f'<h{level}>{_sentence(rng, 5)}</h{level}>'
+        else:
+            block = _paragraph(rng, nesting)
+        blocks.append(block)
+        size += len(block) + 2
+    return '\n\n'.join(blocks)
+
+
+def generate_export(path, posts=100, body_kb=20, tables=0.05, lists=0.15, images=0.05,
+                    nesting=1, list_depth=None, seed=0):
+    """Write a synthetic WordPress export shaped like the real one in Rules/."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<data>\n')
+        for post_id in range(1, posts + 1):
+            title = _sentence(rng, 6)[:-1]
+            body = generate_body(rng, body_kb, tables, lists, images, nesting, list_depth)
+            f.write(
+                '\t<post>\n'
+                f'\t\t<id>{post_id}</id>\n'
+                f'\t\t<Title>{escape(title)}</Title>\n'
+                f'\t\t<Content><![CDATA[{body}]]></Content>\n'
+                f'\t\t<ImageFeatured>https://crexpressinc.com/wp-content/uploads/2025/01/{post_id}.jpg</ImageFeatured>\n'
+                f'\t\t<Slug>synthetic-post-{post_id}</Slug>\n'
+                f'\t\t<Date>2025-01-{post_id % 28 + 1:02d}</Date>\n'
+                '\t</post>\n'
+            )
+        f.write('</data>\n')
+    return path
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(xml_path, converter):
+    """Convert every post of an export and return throughput numbers."""
+    convert = CONVERTERS[converter]
+    posts = 0
+    size = 0
+    elapsed = 0.0
+    for fields in iter_posts(xml_path):
+        content = fields.get('Content') or ''
+        start = time.perf_counter()
+        convert(content)
+        elapsed += time.perf_counter() - start
+        posts += 1
+        size += len(content.encode('utf-8'))
+    elapsed = max(elapsed, 1e-9)
+    return {
+        'posts': posts,
+        'seconds': round(elapsed, 4),
+        'posts_per_sec': round(posts / elapsed, 2),
+        'mb_per_sec': round(size / (1024 * 1024) / elapsed, 3),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def run_isolated(xml_path, converter):
+    """Run one case in a fresh process so its peak RSS is its own."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(run_case, xml_path, converter).result()
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a message for every tracked number that regressed past tolerance."""
+    failures = []
+    for case, metrics in results.items():
+        expected = baseline.get(case)
+        if not expected:
+            continue
+        for metric, better in METRICS.items():
+            if metric not in expected:
+                continue
+            limit = expected[metric] * (1 - tolerance if better == 'higher' else 1 + tolerance)
+            value = metrics[metric]
+            if (better == 'higher' and value < limit) or (better == 'lower' and value > limit):
+                failures.append(f"{case} {metric}: {value} (baseline {expected[metric]}, limit {limit:.2f})")
+    return failures
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark the WordPress to markdown converters.')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run (repeatable, default: all)')
+    parser.add_argument('--converter', action='append', choices=sorted(CONVERTERS),
+                        help='Converter to run (repeatable, default: all)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply every scenario post count by this factor')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON file')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit non-zero if a tracked number regresses past the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed regression as a fraction of the baseline (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store this run as the new baseline')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+
+    generate = parser.add_argument_group('export generation')
+    generate.add_argument('--generate', metavar='PATH',
+                          help='Only write a synthetic export to PATH and exit')
+    generate.add_argument('--posts', type=int, default=100)
+    generate.add_argument('--body-kb', type=float, default=20)
+    generate.add_argument('--tables', type=float, default=0.05, help='Table density')
+    generate.add_argument('--lists', type=float, default=0.15, help='List density')
+    generate.add_argument('--images', type=float, default=0.05, help='Image density')
+    generate.add_argument('--nesting', type=int, default=1, help='List and inline nesting depth')
+    generate.add_argument('--list-depth', type=int, help='List nesting depth (default: --nesting)')
+    generate.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the benchmark matrix and compare it with the stored baseline."""
+    args = parse_args(argv)
+
+    if args.generate:
+        generate_export(args.generate, posts=args.posts, body_kb=args.body_kb, tables=args.tables,
+                        lists=args.lists, images=args.images, nesting=args.nesting,
+                        list_depth=args.list_depth, seed=args.seed)
+        print(f"Wrote synthetic export: {args.generate}")
+        return 0
+
+    scenarios = args.scenario or list(SCENARIOS)
+    converters = args.converter or list(CONVERTERS)
+    results = {}
+
+    print(f"{'case':<28} {'posts':>6} {'posts/s':>10} {'MB/s':>8} {'peak RSS MB':>12}")
+    print("-" * 68)
+    with tempfile.TemporaryDirectory() as tmp:
+        for scenario in scenarios:
+            shape = dict(SCENARIOS[scenario])
+            shape['posts'] = max(1, int(shape['posts'] * args.scale))
+            xml_path = generate_export(os.path.join(tmp, f'{scenario}.xml'), **shape)
+            for converter in converters:
+                case = f'{scenario}/{converter}'
+                metrics = run_isolated(xml_path, converter)
+                results[case] = metrics
+                print(f"{case:<28} {metrics['posts']:>6} {metrics['posts_per_sec']:>10} "
+                      f"{metrics['mb_per_sec']:>8} {metrics['peak_rss_mb']:>12}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update({case: {m: metrics[m] for m in METRICS} for case, metrics in results.items()})
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline updated: {args.baseline}")
+        return 0
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"\n✗ No baseline at {args.baseline}; run with --update-baseline first")
+            return 1
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        failures = compare_to_baseline(results, baseline, args.tolerance)
+        if failures:
+            print("\n✗ Performance regressions:")
+            for failure in failures:
+                print(f"  - {failure}")
+            return 1
+        print("\n✓ All tracked numbers are within the baseline budget")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
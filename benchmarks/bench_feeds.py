@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Sitemap and Feed Benchmarks
+Writes the sitemap and feeds of a large synthetic blog index and measures
+time, the memory the writer allocates beyond the entries themselves, and
+how many files a run rewrites after one post is added.
+
+    python benchmarks/bench_feeds.py                      # 120000 posts
+    python benchmarks/bench_feeds.py --posts 500000 --json results.json
+
+With more posts than the sitemap limit the sitemap is an index of shards;
+adding a post, which is newer than every other, rewrites the last shard,
+the sitemap index and the feeds only.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from wordpress_mdx.feeds import SITEMAP_LIMIT, stage_feeds, stale_feed_files  # noqa: E402
+from wordpress_mdx.output import OutputWriter  # noqa: E402
+
+
+def make_entries(rng, posts):
+    """Blog index entries with a slug, a date and a description each."""
+    entries = []
+    for post_id in range(1, posts + 1):
+        day = rng.randrange(3650)
+        entries.append({
+            'id': str(post_id),
+            'slug': f'post-{post_id}',
+            'title': f'Post {post_id}: shipping & logistics',
+            'date': time.strftime('%Y-%m-%d', time.gmtime(1420070400 + day * 86400)),
+            'description': 'A description of the post that runs for about a sentence or so.',
+        })
+    return entries
+
+
+def write(target_dir, entries, limit, trace=False):
+    """Stage and publish the sitemap and feeds; return ({name: status}, seconds, peak bytes).
+
+    Tracing allocations slows the writer down many times, so only a
+    traced run reports a peak, and only an untraced one a fair time.
+    """
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with OutputWriter(target_dir) as writer:
+        statuses = stage_feeds(writer, entries, sitemap_limit=limit, sitemap=True)
+        writer.publish()
+    for name in stale_feed_files(target_dir, statuses):
+        os.remove(os.path.join(target_dir, name))
+    seconds = time.perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return statuses, seconds, peak
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark the sitemap and feed writer.')
+    parser.add_argument('--posts', type=int, default=120000, help='Posts in the index (default: 120000)')
+    parser.add_argument('--limit', type=int, default=SITEMAP_LIMIT,
+                        help=f'URLs per sitemap file (default: {SITEMAP_LIMIT})')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Write the sitemap and feeds of a synthetic index, then again after adding a post."""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    entries = make_entries(rng, args.posts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        statuses, seconds, _ = write(tmp, entries, args.limit)
+        _, _, peak = write(tmp, entries, args.limit, trace=True)
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in statuses)
+        results = {'posts': args.posts, 'files': len(statuses), 'full_seconds': round(seconds, 2),
+                   'peak_mb': round(peak / 1024 / 1024, 2), 'written_mb': round(size / 1024 / 1024, 2)}
+
+        entries.append(dict(entries[-1], id='new', slug='a-new-post', date='2030-01-01'))
+        statuses, seconds, _ = write(tmp, entries, args.limit)
+        results['incremental_seconds'] = round(seconds, 2)
+        results['rewritten'] = sorted(name for name, status in statuses.items() if status != 'unchanged')
+
+    print(f"Posts: {args.posts}  files: {results['files']}  written: {results['written_mb']} MB")
+    print(f"Full: {results['full_seconds']}s, writer peak {results['peak_mb']} MB beyond the entries")
+    print(f"After adding a post: {results['incremental_seconds']}s, rewrote "
+          f"{', '.join(results['rewritten'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Description and Reading Time Benchmarks
+Times the description extractors of both templates and the word count on
+synthetic posts of growing length, with the memory each allocates.
+
+    python benchmarks/bench_reading.py                    # 1000 to 100000 words
+    python benchmarks/bench_reading.py --words 500 50000 --json results.json
+
+The extractors read a bounded prefix of the post, so their time and memory
+stay flat as posts grow; the word count reads the whole post, in time that
+grows with it and memory that does not.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench_search import make_post, make_vocabulary  # noqa: E402
+from wordpress_mdx.templates import count_words, extract_description, generate_description  # noqa: E402
+
+FUNCTIONS = {
+    'generate_description': generate_description,
+    'extract_description': extract_description,
+    'count_words': count_words,
+}
+
+
+def measure(function, content, repeat):
+    """Return (milliseconds per call, peak KB allocated by one call)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(content)
+    ms = (time.perf_counter() - start) * 1000 / repeat
+    tracemalloc.start()
+    function(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ms, peak / 1024
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark the description and word count of posts.')
+    parser.add_argument('--words', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Words per post, one post per size (default: 1000 10000 100000)')
+    parser.add_argument('--vocabulary', type=int, default=20000,
+                        help='Distinct words in the corpus (default: 20000)')
+    parser.add_argument('--repeat', type=int, default=20, help='Calls timed per post (default: 20)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Time each function on posts of each size."""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    weights = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        weights.append(total)
+
+    results = []
+    print(f"{'function':<22} {'words':>8} {'KB':>8} {'ms':>9} {'peak KB':>9}")
+    for words in args.words:
+        content = make_post(rng, vocabulary, weights, words)
+        for name, function in FUNCTIONS.items():
+            ms, peak = measure(function, content, args.repeat)
+            results.append({'function': name, 'words': words, 'kb': round(len(content) / 1024, 1),
+                            'ms': round(ms, 3), 'peak_kb': round(peak, 1)})
+            print(f"{name:<22} {words:>8} {len(content) / 1024:>8.1f} {ms:>9.3f} {peak:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Related Posts Benchmarks
+Scores the related posts of a large synthetic corpus and measures the full
+computation against an incremental run after a few posts change.
+
+    python benchmarks/bench_related.py                     # 5000 posts
+    python benchmarks/bench_related.py --posts 20000 --json results.json
+
+Posts are drawn from a handful of topics, each favouring its own part of
+the vocabulary, so that the share of neighbours from a post's own topic
+shows the lists are meaningful and not only fast.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench_search import make_vocabulary  # noqa: E402
+from wordpress_mdx.related import RelatedPosts, term_counts  # noqa: E402
+from wordpress_mdx.search_index import index_document  # noqa: E402
+
+
+def make_post(rng, common, topic_words, words):
+    """Markdown mixing the corpus' common words with the words of one topic."""
+    picked = [rng.choice(topic_words) if rng.random() < 0.3 else rng.choice(common)
+              for _ in range(words)]
+    return ' '.join(picked) + '.'
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark the related posts computation.')
+    parser.add_argument('--posts', type=int, default=5000, help='Posts in the corpus (default: 5000)')
+    parser.add_argument('--words', type=int, default=400, help='Words per post (default: 400)')
+    parser.add_argument('--vocabulary', type=int, default=20000,
+                        help='Distinct words in the corpus (default: 20000)')
+    parser.add_argument('--topics', type=int, default=50, help='Topics posts are drawn from (default: 50)')
+    parser.add_argument('--related', type=int, default=5, help='Neighbours per post (default: 5)')
+    parser.add_argument('--changed', type=int, default=10,
+                        help='Posts changed for the incremental run (default: 10)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Score a synthetic corpus in full, then again after changing a few posts."""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    common = vocabulary[:2000]
+    per_topic = (len(vocabulary) - len(common)) // args.topics
+    topics = [vocabulary[len(common) + i * per_topic:len(common) + (i + 1) * per_topic]
+              for i in range(args.topics)]
+
+    start = time.perf_counter()
+    counts = {}
+    topic_of = {}
+    for post_id in range(1, args.posts + 1):
+        topic = rng.randrange(args.topics)
+        topic_of[str(post_id)] = topic
+        body = make_post(rng, common, topics[topic], args.words)
+        counts[str(post_id)] = term_counts(index_document(f'Post {post_id}', body))
+    tokenize_seconds = time.perf_counter() - start
+
+    results = {'posts': args.posts, 'words': args.words, 'related': args.related}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'related-posts.json.gz')
+
+        start = time.perf_counter()
+        related = RelatedPosts(path, args.related)
+        for post_id, post_counts in counts.items():
+            related.update(post_id, post_counts)
+        results['full_scored'] = related.compute()
+        results['full_seconds'] = round(time.perf_counter() - start, 2)
+        data = related.dump()
+        with open(path, 'wb') as f:
+            f.write(data)
+        results['state_mb'] = round(len(data) / 1024 / 1024, 2)
+
+        same_topic = sum(topic_of[other] == topic_of[post_id]
+                         for post_id, neighbours in related.related.items() for other, _ in neighbours)
+        listed = sum(len(neighbours) for neighbours in related.related.values())
+        results['same_topic'] = round(same_topic / listed, 3) if listed else 0
+
+        # Change a few posts of a state read back from disk, as a conversion run does
+        start = time.perf_counter()
+        related = RelatedPosts(path, args.related)
+        for post_id in rng.sample(sorted(counts), args.changed):
+            body = make_post(rng, common, topics[topic_of[post_id]], args.words)
+            related.update(post_id, term_counts(index_document(f'Post {post_id}', body)))
+        results['incremental_scored'] = related.compute()
+        results['incremental_seconds'] = round(time.perf_counter() - start, 2)
+
+    print(f"Posts: {args.posts}  words per post: {args.words}  topics: {args.topics}  "
+          f"(tokenized in {tokenize_seconds:.1f}s)")
+    print(f"Full: {results['full_scored']} lists in {results['full_seconds']}s, "
+          f"state {results['state_mb']} MB, {results['same_topic']:.1%} of neighbours on topic")
+    print(f"Incremental after {args.changed} changed posts: {results['incremental_scored']} lists "
+          f"in {results['incremental_seconds']}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
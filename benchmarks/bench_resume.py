@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Resume Benchmarks
+Converts a large synthetic WordPress export, interrupts the run once its
+event log lists a given share of the posts, resumes it with --resume, and
+compares the time and the output with an uninterrupted run.
+
+    python benchmarks/bench_resume.py                     # 1500 posts, stopped halfway
+    python benchmarks/bench_resume.py --posts 5000 --stop-at 0.9 --json results.json
+
+The run is stopped with SIGKILL, as a crash would stop it, so nothing of
+it is cleaned up. The resumed run still rebuilds the blog index, search
+index and related posts of every post, which it publishes with the pages.
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench_search import make_vocabulary  # noqa: E402
+from bench_watch import make_export, save  # noqa: E402
+from wordpress_mdx.events import EVENTS_NAME  # noqa: E402
+
+
+def run(command, target_dir):
+    """Run a conversion to target_dir; return its seconds."""
+    start = time.perf_counter()
+    subprocess.run(command + ['--target-dir', target_dir], stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def logged_posts(path):
+    """How many post records the event log at path holds."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read().count(b'"event": "post"')
+    except OSError:
+        return 0
+
+
+def same_tree(left, right, ignore):
+    """Whether two directories hold the same files with the same bytes, leaving out ignore."""
+    def files(root):
+        found = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name not in ignore:
+                    path = os.path.join(directory, name)
+                    with open(path, 'rb') as f:
+                        found[os.path.relpath(path, root)] = f.read()
+        return found
+    return files(left) == files(right)
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark resuming an interrupted conversion.')
+    parser.add_argument('--posts', type=int, default=1500, help='Posts in the export (default: 1500)')
+    parser.add_argument('--words', type=int, default=600, help='Words per post (default: 600)')
+    parser.add_argument('--vocabulary', type=int, default=20000,
+                        help='Distinct words in the corpus (default: 20000)')
+    parser.add_argument('--stop-at', type=float, default=0.5,
+                        help='Share of the posts logged when the run is stopped (default: 0.5)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Time an uninterrupted run, then a run stopped partway and resumed."""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    weights = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        weights.append(total)
+
+    results = {'posts': args.posts, 'stop_at': args.stop_at}
+    with tempfile.TemporaryDirectory() as tmp:
+        export = os.path.join(tmp, 'export.xml')
+        save(export, make_export(rng, vocabulary, weights, args.posts, args.words))
+        command = [sys.executable, os.path.join(REPO_ROOT, 'convert_wordpress_to_mdx.py'),
+                   '--xml', export, '--no-cache', '--no-redirects',
+                   '--public-dir', os.path.join(tmp, 'public'), '--search-index']
+        full_dir = os.path.join(tmp, 'full')
+        results['full_seconds'] = round(run(command, full_dir), 2)
+
+        target_dir = os.path.join(tmp, 'blog')
+        log_path = os.path.join(target_dir, EVENTS_NAME)
+        stop = max(1, int(args.posts * args.stop_at))
+        start = time.perf_counter()
+        converter = subprocess.Popen(command + ['--target-dir', target_dir], stdout=subprocess.DEVNULL)
+        while converter.poll() is None and logged_posts(log_path) < stop:
+            time.sleep(0.01)
+        converter.send_signal(signal.SIGKILL)
+        converter.wait()
+        results['stopped_seconds'] = round(time.perf_counter() - start, 2)
+        results['logged'] = logged_posts(log_path)
+
+        results['resumed_seconds'] = round(run(command + ['--resume'], target_dir), 2)
+        results['same_output'] = same_tree(full_dir, target_dir,
+                                           {EVENTS_NAME, 'conversion_manifest.json'})
+
+    print(f"Posts: {args.posts}  uninterrupted run: {results['full_seconds']}s")
+    print(f"Stopped after {results['stopped_seconds']}s with {results['logged']} post(s) logged; "
+          f"resumed in {results['resumed_seconds']}s")
+    print(f"Output of the resumed run {'matches' if results['same_output'] else 'DIFFERS from'} "
+          f"the uninterrupted one")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0 if results['same_output'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Search Index Benchmarks
+Builds the full-text search index of a large synthetic corpus and measures
+build time, index size and query latency.
+
+    python benchmarks/bench_search.py                     # 20000 posts
+    python benchmarks/bench_search.py --posts 100000 --json results.json
+
+Cold queries open the index afresh, so they include reading index.json
+and loading the chunks of their terms; warm queries repeat them on one
+SearchIndex whose chunks are already loaded. An incremental update of a
+few posts is timed against the full build.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from wordpress_mdx.search_index import SearchIndex, SearchIndexBuilder, index_document  # noqa: E402
+
+SYLLABLES = ('ba be bi bo ca co da de di do fa fe ga go ha he ka ko la le li lo ma me mi mo '
+             'na ne no pa pe po ra re ri ro sa se si so ta te ti to va ve vo za ze').split()
+SUFFIXES = ('', '', '', 's', 'ing', 'ed', 'er', 'tion', 'ly', 'ment')
+STOP = ('the', 'of', 'and', 'to', 'a', 'in', 'for', 'is', 'on', 'with')
+
+
+def make_vocabulary(rng, size):
+    """Invented words of two to four syllables, some with English suffixes."""
+    words = set()
+    while len(words) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        words.add(word + rng.choice(SUFFIXES))
+    return sorted(words)
+
+
+def make_post(rng, vocabulary, weights, words):
+    """Markdown of roughly words words, drawn from a Zipf-like distribution."""
+    picked = rng.choices(vocabulary, cum_weights=weights, k=words)
+    for i in range(0, words, 7):
+        picked[i] = rng.choice(STOP)
+    paragraphs = [' '.join(picked[i:i + 80]) + '.' for i in range(0, words, 80)]
+    return '\n\n'.join(paragraphs)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def time_queries(index_dir, queries, cold):
+    """Run every query and return the latencies in milliseconds."""
+    latencies = []
+    index = None
+    if not cold:
+        index = SearchIndex(index_dir)
+        for query in queries:
+            index.search(query)
+    for query in queries:
+        start = time.perf_counter()
+        (SearchIndex(index_dir) if cold else index).search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark the full-text search index.')
+    parser.add_argument('--posts', type=int, default=20000, help='Posts in the corpus (default: 20000)')
+    parser.add_argument('--words', type=int, default=800, help='Words per post (default: 800)')
+    parser.add_argument('--vocabulary', type=int, default=50000,
+                        help='Distinct words in the corpus (default: 50000)')
+    parser.add_argument('--queries', type=int, default=500, help='Queries per kind (default: 500)')
+    parser.add_argument('--changed', type=int, default=10,
+                        help='Posts changed for the incremental update (default: 10)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Build the index of a synthetic corpus and time queries against it."""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    weights = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        weights.append(total)
+
+    results = {'posts': args.posts, 'words': args.words, 'vocabulary': args.vocabulary}
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, 'search-index')
+        os.makedirs(index_dir)
+
+        start = time.perf_counter()
+        builder = SearchIndexBuilder(index_dir)
+        bodies = []
+        for post_id in range(1, args.posts + 1):
+            body = make_post(rng, vocabulary, weights, args.words)
+            if post_id <= 200:
+                bodies.append(body)
+            builder.update(str(post_id), f'post-{post_id}', f'Post {post_id}',
+                           index_document(f'Post {post_id}', body))
+        files = builder.files()
+        for name, data in files.items():
+            with open(os.path.join(index_dir, name), 'wb') as f:
+                f.write(data)
+        results['build_seconds'] = round(time.perf_counter() - start, 2)
+        results['posts_per_sec'] = round(args.posts / results['build_seconds'], 1)
+        results['index_mb'] = round(sum(len(data) for data in files.values()) / 1024 / 1024, 2)
+        results['chunks'] = len(files) - 2
+        results['largest_chunk_kb'] = round(
+            max(len(data) for name, data in files.items() if name not in ('index.json', 'terms.json.gz'))
+            / 1024, 1)
+        results['manifest_kb'] = round(len(files['index.json']) / 1024, 1)
+
+        # Update a few posts of an index read back from disk, as a conversion run does
+        start = time.perf_counter()
+        builder = SearchIndexBuilder(index_dir)
+        for post_id in range(1, args.changed + 1):
+            body = make_post(rng, vocabulary, weights, args.words)
+            builder.update(str(post_id), f'post-{post_id}', f'Post {post_id}',
+                           index_document(f'Post {post_id}', body))
+        changed = builder.files()
+        results['incremental_seconds'] = round(time.perf_counter() - start, 3)
+        results['incremental_files'] = len(changed)
+        # The builders hold the whole index; collecting them during queries would skew latencies
+        del builder, files, changed
+        gc.collect()
+
+        # Terms from the head and tail of the vocabulary, and phrases from real posts
+        kinds = {
+            'one term': [rng.choice(vocabulary[:2000]) for _ in range(args.queries)],
+            'two terms': [' '.join(rng.choices(vocabulary[:5000], k=2)) for _ in range(args.queries)],
+            'rare term': [rng.choice(vocabulary[-20000:]) for _ in range(args.queries)],
+        }
+        phrases = []
+        for _ in range(args.queries):
+            words = rng.choice(bodies).split()
+            start_word = rng.randrange(len(words) - 3)
+            phrases.append('"' + ' '.join(words[start_word:start_word + 3]).rstrip('.') + '"')
+        kinds['phrase'] = phrases
+
+        print(f"Posts: {args.posts}  words per post: {args.words}  vocabulary: {args.vocabulary}")
+        print(f"Build: {results['build_seconds']}s ({results['posts_per_sec']} posts/s)  "
+              f"index: {results['index_mb']} MB in {results['chunks']} chunks, "
+              f"largest {results['largest_chunk_kb']} KB, index.json {results['manifest_kb']} KB")
+        print(f"Incremental update of {args.changed} posts: {results['incremental_seconds']}s, "
+              f"{results['incremental_files']} files rewritten\n")
+        print(f"{'query':<12} {'cache':<6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        print("-" * 46)
+        results['queries'] = {}
+        for kind, queries in kinds.items():
+            for cold in (True, False):
+                latencies = time_queries(index_dir, queries, cold)
+                label = 'cold' if cold else 'warm'
+                numbers = {name: round(percentile(latencies, fraction), 3)
+                           for name, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99))}
+                results['queries'][f'{kind}/{label}'] = numbers
+                print(f"{kind:<12} {label:<6} {numbers['p50_ms']:>8} {numbers['p95_ms']:>8} "
+                      f"{numbers['p99_ms']:>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Watch Mode Benchmarks
+Converts a large synthetic WordPress export, keeps the converter running
+with --watch, then saves edited versions of the export and measures how
+long each edit takes to reach the post's page.mdx on disk.
+
+    python benchmarks/bench_watch.py                      # 3000 posts
+    python benchmarks/bench_watch.py --posts 10000 --json results.json
+
+Each edit changes one post and is saved the way editors save, by writing
+a new file and renaming it over the export. The latency runs from the
+rename to the moment the new page.mdx is readable, so it includes the
+wait for the next look at the export (--interval). Edits follow each other
+closely, as an editor's do, so the search index and the other files saved
+once the export settles are timed separately, when the watcher stops.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench_search import make_post, make_vocabulary, percentile  # noqa: E402
+
+
+def make_export(rng, vocabulary, weights, posts, words):
+    """The bytes of a WordPress export of posts posts, each a few paragraphs of HTML."""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<data>\n']
+    for post_id in range(1, posts + 1):
+        paragraphs = make_post(rng, vocabulary, weights, words).split('\n\n')
+        content = '\n'.join(f'<!-- wp:paragraph -->\n<p>{text}</p>\n<!-- /wp:paragraph -->'
+                            for text in paragraphs)
+        parts.append(f'\t<post>\n\t\t<id>{post_id}</id>\n\t\t<Title>Post {post_id}</Title>\n'
+                     f'\t\t<Content><![CDATA[{content}]]></Content>\n'
+                     f'\t\t<Slug>post-{post_id}</Slug>\n\t\t<Date>2024-01-01</Date>\n\t</post>\n')
+    parts.append('</data>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def save(path, data):
+    """Replace the export as an editor's save does: a new file renamed over the old one."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def wait_for(path, marker, timeout=60):
+    """Wait until the file at path contains marker."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with open(path, 'rb') as f:
+                if marker in f.read():
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.002)
+    return False
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark watch mode on a large export.')
+    parser.add_argument('--posts', type=int, default=3000, help='Posts in the export (default: 3000)')
+    parser.add_argument('--words', type=int, default=600, help='Words per post (default: 600)')
+    parser.add_argument('--vocabulary', type=int, default=20000,
+                        help='Distinct words in the corpus (default: 20000)')
+    parser.add_argument('--edits', type=int, default=10, help='Edits saved one after another (default: 10)')
+    parser.add_argument('--interval', type=float, default=0.2,
+                        help='Seconds between two looks at the export (default: 0.2)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Convert a synthetic export with --watch and time edits from save to page.mdx."""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    weights = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        weights.append(total)
+    data = make_export(rng, vocabulary, weights, args.posts, args.words)
+
+    results = {'posts': args.posts, 'export_mb': round(len(data) / 1024 / 1024, 2),
+               'interval': args.interval}
+    with tempfile.TemporaryDirectory() as tmp:
+        export = os.path.join(tmp, 'export.xml')
+        target_dir = os.path.join(tmp, 'blog')
+        save(export, data)
+        command = [sys.executable, os.path.join(REPO_ROOT, 'convert_wordpress_to_mdx.py'),
+                   '--xml', export, '--target-dir', target_dir, '--no-cache', '--no-redirects',
+                   '--public-dir', os.path.join(tmp, 'public'), '--search-index',
+                   '--watch', '--watch-interval', str(args.interval)]
+        start = time.perf_counter()
+        watcher = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, bufsize=1,
+                                   env=dict(os.environ, PYTHONUNBUFFERED='1'))
+        try:
+            refreshes = []
+            for line in watcher.stdout:
+                if line.startswith('Watching'):
+                    break
+            results['initial_seconds'] = round(time.perf_counter() - start, 2)
+
+            latencies = []
+            for edit in range(args.edits):
+                post_id = rng.randint(1, args.posts)
+                marker = f'edit{edit}marker'.encode()
+                data = re.sub(rb'(<id>%d</id>.*?<p>)' % post_id, rb'\g<1>' + marker + b' ',
+                              data, count=1, flags=re.DOTALL)
+                page = os.path.join(target_dir, f'post-{post_id}', 'page.mdx')
+                saved = time.perf_counter()
+                save(export, data)
+                if not wait_for(page, marker):
+                    raise SystemExit(f'edit {edit} never reached {page}')
+                latencies.append((time.perf_counter() - saved) * 1000)
+                for line in watcher.stdout:
+                    if line.startswith('↻'):
+                        refreshes.append(float(re.search(r'in ([\d.]+)s', line).group(1)) * 1000)
+                        break
+            # Stopping saves the search index, related posts and manifest of the edits
+            watcher.send_signal(signal.SIGINT)
+            for line in watcher.stdout:
+                if line.startswith('✓ Saved'):
+                    results['save_seconds'] = float(re.search(r'in ([\d.]+)s', line).group(1))
+        finally:
+            if watcher.poll() is None:
+                watcher.terminate()
+            watcher.wait()
+
+    results['latency_ms'] = {'median': round(percentile(latencies, 0.5), 1),
+                             'max': round(max(latencies), 1)}
+    results['refresh_ms'] = {'median': round(percentile(refreshes, 0.5), 1),
+                             'max': round(max(refreshes), 1)}
+
+    print(f"Posts: {args.posts}  export: {results['export_mb']} MB  "
+          f"(initial conversion in {results['initial_seconds']}s)")
+    print(f"Save to page.mdx over {args.edits} edits: median {results['latency_ms']['median']} ms, "
+          f"max {results['latency_ms']['max']} ms (looking every {args.interval}s)")
+    print(f"Refresh of the output: median {results['refresh_ms']['median']} ms, "
+          f"max {results['refresh_ms']['max']} ms")
+    print(f"Search index, related posts and manifest saved on stopping in "
+          f"{results.get('save_seconds', 0)}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
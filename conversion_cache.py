@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Conversion Cache
+Shows what the cache of converted markdown holds, and evicts entries from
+it. See --help for the commands.
+"""
+
+from wordpress_mdx.cli import cache_main
+
+
+if __name__ == '__main__':
+    cache_main()
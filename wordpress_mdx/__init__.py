@@ -0,0 +1,39 @@
+"""Convert WordPress XML exports, with SEO metadata from the CSV export, to MDX blog posts.
+
+Shared by convert_wordpress_to_mdx.py and Rules/migrate_blog_posts.py: the
+scripts only pick their default engine and output template and run cli.main.
+"""
+
+from .assets import collect_asset_urls, copy_assets, localize
+from .audit import audit_file, audit_tree, find_html_tags
+from .blog_index import build_index_files, index_entry, load_index
+from .cache import ConversionCache
+from .engines import CONVERTER_VERSION, ENGINES, PARITY_ENGINES, RULES_VERSION
+from .events import EventLog, read_events
+from .export import (extract_post, iter_csv_posts, iter_posts, join_seo, load_seo_index,
+                     post_fields, slugify)
+from .feeds import stage_feeds
+from .images import probe_images, read_image_size
+from .output import OutputWriter
+from .pipeline import compare_engines, convert_post, iter_results
+from .redirects import RedirectMap, load_redirects
+from .regex_engine import clean_html_to_markdown
+from .related import RelatedPosts
+from .search_index import SearchIndex, SearchIndexBuilder, index_document
+from .templates import (TEMPLATES, create_mdx_file, extract_description,
+                        generate_description, render_mdx)
+from .tokenizer import tokenize_html_to_markdown
+from .watch import WatchSession
+from .wordpress_engine import clean_wordpress_content
+
+__all__ = [
+    'CONVERTER_VERSION', 'ConversionCache', 'ENGINES', 'EventLog', 'OutputWriter',
+    'PARITY_ENGINES', 'RULES_VERSION', 'RedirectMap', 'RelatedPosts', 'SearchIndex',
+    'SearchIndexBuilder', 'TEMPLATES', 'WatchSession', 'audit_file', 'audit_tree',
+    'build_index_files', 'clean_html_to_markdown', 'clean_wordpress_content', 'collect_asset_urls',
+    'compare_engines', 'convert_post', 'copy_assets', 'create_mdx_file', 'extract_description',
+    'extract_post', 'find_html_tags', 'generate_description', 'index_document', 'index_entry',
+    'iter_csv_posts', 'iter_posts', 'iter_results', 'join_seo', 'load_index', 'load_redirects',
+    'load_seo_index', 'localize', 'post_fields', 'probe_images', 'read_events', 'read_image_size',
+    'render_mdx', 'slugify', 'stage_feeds', 'tokenize_html_to_markdown',
+]
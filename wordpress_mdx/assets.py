@@ -0,0 +1,287 @@
+"""Copying the images posts show from the old site into public/, named by their content.
+
+Featured images and the images in post bodies point at wp-content/uploads
+on the old site. Before posts are converted, one pass over the export
+collects every such URL; the ones not copied yet are fetched with urllib in
+a thread pool, at most a fixed number at a time. Redirects are followed to
+the asset hosts only, and a response is kept only when it is an image,
+so error pages and login walls are not copied. Each file is stored under the SHA-256 of its bytes, so an image
+uploaded twice is kept once, and the asset map records which file each URL
+became. Converted posts then point at the copies. URLs already in the map
+whose file exists are never fetched again.
+"""
+
+import asyncio
+import hashlib
+import html
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http.client import HTTPException
+from urllib.parse import quote, urlsplit, urlunsplit
+
+from .redirects import SITE_HOSTS
+
+
+ASSET_MAP_NAME = 'assets.json'
+
+# Where the copies go, relative to the public/ directory
+ASSET_DIR = os.path.join('images', 'blog-post')
+
+# Downloads in flight at once
+DEFAULT_CONCURRENCY = 8
+
+# Seconds to connect, or to wait on the response, before a download fails
+DEFAULT_TIMEOUT = 30
+
+MAX_REDIRECTS = 5
+
+# Larger responses are not images a post should carry
+MAX_ASSET_BYTES = 64 * 1024 * 1024
+
+USER_AGENT = 'wordpress_mdx asset copier'
+
+# The src of an <img> in the exported HTML
+_IMG_SRC_RE = re.compile(r'''<img\b[^>]*?\bsrc\s*=\s*["']([^"']+)''', re.IGNORECASE)
+
+# Markdown image targets, up to the closing parenthesis or a title
+_IMAGE_TARGET_RE = re.compile(r'(!\[[^\]\n]*\]\()([^()\s]+)')
+
+# File extensions by content type, for URLs that do not end in one
+_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg',
+    'image/avif': '.avif',
+}
+
+
+class AssetError(Exception):
+    """A download that did not produce a file."""
+
+
+def asset_hosts(extra=()):
+    """The hosts images are copied from: the old site's, and the extra hosts given."""
+    return frozenset(SITE_HOSTS) | {host.lower() for host in extra}
+
+
+def is_asset_url(url, hosts):
+    """Whether url is an http(s) URL on one of hosts."""
+    parts = urlsplit(url)
+    return parts.scheme in ('http', 'https') and parts.netloc.lower() in hosts
+
+
+def iter_asset_urls(fields, hosts):
+    """Yield the images of a record that are on hosts.
+
+    These are the featured image, the <img> srcs of the Content and, as
+    some posts were written in markdown, its markdown images.
+    """
+    featured = fields.get('ImageFeatured')
+    if featured and is_asset_url(featured, hosts):
+        yield featured
+    content = fields.get('Content') or ''
+    for src in _IMG_SRC_RE.findall(content):
+        src = html.unescape(src).strip()
+        if is_asset_url(src, hosts):
+            yield src
+    for _, src in _IMAGE_TARGET_RE.findall(content):
+        if is_asset_url(src, hosts):
+            yield src
+
+
+def collect_asset_urls(records, hosts):
+    """Return the asset URLs of every record, each once, in the order they first appear."""
+    urls = {}
+    for fields in records:
+        urls.update(dict.fromkeys(iter_asset_urls(fields, hosts)))
+    return list(urls)
+
+
+def load_asset_map(path):
+    """Read an asset map: {URL: site path of its copy}; empty when there is none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return dict(json.load(f).get('assets', {}))
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save_asset_map(path, assets):
+    """Write an asset map, replacing the previous one only once it is complete."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'assets': assets}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=4)
+def _cached_asset_map(path, mtime_ns):
+    return load_asset_map(path)
+
+
+def asset_key(fields, hosts, assets):
+    """Describe where the images of a record point, so its manifest entry changes with them."""
+    pairs = [(url, assets.get(url)) for url in dict.fromkeys(iter_asset_urls(fields, hosts))]
+    if not pairs:
+        return ''
+    return hashlib.sha256(json.dumps(pairs).encode('utf-8')).hexdigest()[:16]
+
+
+def asset_map(path):
+    """load_asset_map, read once per process for each version of the file."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    return _cached_asset_map(path, mtime_ns)
+
+
+def localize(markdown, assets):
+    """Point the markdown images whose URL is in assets at their copies; return (markdown, count)."""
+    localized = 0
+
+    def replace(match):
+        nonlocal localized
+        local = assets.get(match.group(2))
+        if local is None:
+            return match.group(0)
+        localized += 1
+        return match.group(1) + local
+
+    return _IMAGE_TARGET_RE.sub(replace, markdown), localized
+
+
+def asset_extension(url, content_type):
+    """The extension of a copy: the URL's own, else one for its content type."""
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    if re.fullmatch(r'\.[a-z0-9]{1,5}', extension):
+        return '.jpg' if extension == '.jpeg' else extension
+    content_type = content_type.split(';')[0].strip().lower()
+    return _EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type) or ''
+
+
+def store_asset(data, extension, asset_dir):
+    """Store data as <sha256><extension> in asset_dir unless it is there; return the file name."""
+    name = hashlib.sha256(data).hexdigest()[:32] + extension
+    path = os.path.join(asset_dir, name)
+    if os.path.exists(path):
+        return name
+    os.makedirs(asset_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=asset_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return name
+
+
+class _RedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follows at most MAX_REDIRECTS redirects, and only to hosts."""
+
+    max_redirections = MAX_REDIRECTS
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if not is_asset_url(newurl, self.hosts):
+            fp.close()
+            raise AssetError(f"redirect to {urlsplit(newurl).netloc or newurl}, not an asset host")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _request_url(url):
+    """url with the non-ASCII and unsafe characters of its path and query quoted."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc,
+                       quote(parts.path or '/', safe="/%:@!$&'()*+,;=~-._"),
+                       quote(parts.query, safe="/%:@!$&'()*+,;=~-._?"), ''))
+
+
+def download(url, hosts, timeout=DEFAULT_TIMEOUT):
+    """Fetch url, following redirects to hosts only; return (body, content type).
+
+    Raises AssetError unless the response is a 200 with an image content
+    type, so an error page or a login form is never stored as an image.
+    """
+    opener = urllib.request.build_opener(_RedirectHandler(hosts))
+    request = urllib.request.Request(_request_url(url),
+                                     headers={'User-Agent': USER_AGENT, 'Accept': 'image/*'})
+    with opener.open(request, timeout=timeout) as response:
+        if response.status != 200:
+            raise AssetError(f"HTTP {response.status}")
+        content_type = response.headers.get_content_type()
+        if not content_type.startswith('image/'):
+            raise AssetError(f"not an image: {content_type}")
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > MAX_ASSET_BYTES:
+            raise AssetError("response too large")
+        body = response.read(MAX_ASSET_BYTES + 1)
+    if len(body) > MAX_ASSET_BYTES:
+        raise AssetError("response too large")
+    return body, content_type
+
+
+async def _copy_assets(urls, asset_dir, url_prefix, hosts, concurrency, timeout):
+    loop = asyncio.get_running_loop()
+    limit = asyncio.Semaphore(max(1, concurrency))
+    copied = {}
+    failed = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        async def copy(url):
+            async with limit:
+                try:
+                    body, content_type = await loop.run_in_executor(
+                        executor, download, url, hosts, timeout)
+                except (AssetError, OSError, HTTPException, ValueError) as e:
+                    failed[url] = (str(e) or type(e).__name__).splitlines()[0]
+                    return
+            # Hashing and writing do not wait on the network, so they run outside the limit
+            name = store_asset(body, asset_extension(url, content_type), asset_dir)
+            copied[url] = url_prefix + name
+
+        await asyncio.gather(*(copy(url) for url in urls))
+    return copied, failed
+
+
+def copy_assets(urls, asset_dir, url_prefix, known=None, hosts=None,
+                concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """Copy the images at urls into asset_dir; return (copied, failed).
+
+    copied maps each newly copied URL to url_prefix and the file name of its
+    copy; failed maps URLs that could not be copied to the reason. URLs in
+    known, an asset map, whose copy is still in asset_dir are skipped.
+    Redirects are only followed to hosts (default: asset_hosts()).
+    """
+    known = known or {}
+    hosts = asset_hosts() if hosts is None else hosts
+    pending = [url for url in urls
+               if not (url in known and os.path.exists(
+                   os.path.join(asset_dir, known[url].rsplit('/', 1)[-1])))]
+    if not pending:
+        return {}, {}
+    return asyncio.run(_copy_assets(pending, asset_dir, url_prefix, hosts, concurrency, timeout))
+
+
+def copy_new_assets(urls, asset_dir, url_prefix, path, hosts=None,
+                    concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """copy_assets for the URLs the asset map at path has no copy of; the copies are added to it."""
+    stored = load_asset_map(path)
+    copied, failed = copy_assets(urls, asset_dir, url_prefix, stored, hosts, concurrency, timeout)
+    if copied:
+        stored.update(copied)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        save_asset_map(path, stored)
+    return copied, failed
@@ -0,0 +1,120 @@
+"""Checking converted markdown and written page.mdx files for leftover HTML tags.
+
+Tags that are JSX rather than HTML are not leftovers: the figures of sized
+images the converter writes, and the figures and embedded videos of
+hand-written posts, however their elements are spread over lines. An
+element is JSX when it is a component, such as <Image>, or has an
+attribute only JSX has: className, a camelCase name such as
+allowFullScreen, or a {expression} value. Closing tags are JSX when they
+close a JSX element.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Anything that looks like an opening or closing tag; a > in a quoted or
+# {expression} attribute value does not end it
+HTML_TAG_RE = re.compile(r"""<[a-zA-Z/](?:"[^"]*"|'[^']*'|\{(?:[^{}]|\{[^{}]*\})*\}|[^>"'{])*>""")
+
+# Autolinked email addresses, which look like tags but are markdown
+EMAIL_RE = re.compile(r'<[^@>]*@[^>]*>')
+
+_TAG_NAME_RE = re.compile(r'<(/?)([A-Za-z][\w.:-]*)')
+
+# Quoted attribute values, left out before looking at the attribute names
+_QUOTED_RE = re.compile(r'"[^"]*"|\'[^\']*\'')
+
+_JSX_ATTRIBUTE_RE = re.compile(r'\s(?:className|htmlFor|[a-z]+[A-Z][A-Za-z]*)(?=[\s=/>])|=\s*\{')
+
+
+def _is_jsx(tag, name):
+    if name[0].isupper():
+        return True
+    return bool(_JSX_ATTRIBUTE_RE.search(_QUOTED_RE.sub('""', tag)))
+
+
+def iter_html_tags(text):
+    """Yield (offset, tag) for each HTML tag of text that is neither JSX nor an email autolink."""
+    open_elements = []
+    for match in HTML_TAG_RE.finditer(text):
+        tag = match.group()
+        name = _TAG_NAME_RE.match(tag)
+        if name is None or EMAIL_RE.match(tag):
+            continue
+        closing, name = name.groups()
+        if closing:
+            if name in open_elements:
+                # Elements JSX leaves open inside the one closed are closed with it
+                del open_elements[len(open_elements) - 1 - open_elements[::-1].index(name):]
+                continue
+        elif _is_jsx(tag, name):
+            if not tag.endswith('/>'):
+                open_elements.append(name)
+            continue
+        yield match.start(), tag
+
+
+def find_html_tags(text):
+    """Return the HTML tags left in a piece of markdown, excluding JSX and email autolinks."""
+    if '<' not in text:
+        return []
+    return [tag for _, tag in iter_html_tags(text)]
+
+
+def audit_file(mdx_file):
+    """Read a page.mdx and return (line number, tag) for each leftover tag.
+
+    MDX import and export statements, such as the metadata block and the
+    layout component of the templates, are skipped wherever they appear,
+    so hand-edited pages are checked the same way generated ones are.
+    """
+    lines = []
+    depth = 0
+    with open(mdx_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if depth or line.startswith(('import ', 'export ')):
+                depth = max(depth + line.count('{') - line.count('}'), 0)
+                # Kept as an empty line, so offsets still give line numbers
+                line = '\n'
+            lines.append(line)
+    text = ''.join(lines)
+    found = []
+    number = 1
+    position = 0
+    for offset, tag in iter_html_tags(text):
+        number += text.count('\n', position, offset)
+        position = offset
+        found.append((number, tag))
+    return found
+
+
+def iter_mdx_files(target_dir):
+    """Yield the path of every page.mdx below target_dir, in a stable order."""
+    for root, dirs, files in os.walk(target_dir):
+        dirs.sort()
+        if 'page.mdx' in files:
+            yield os.path.join(root, 'page.mdx')
+
+
+def _audit_entry(mdx_file):
+    """audit_file for the pool: never raises, so one unreadable file does not stop the audit."""
+    try:
+        return mdx_file, audit_file(mdx_file), None
+    except (OSError, UnicodeDecodeError) as e:
+        return mdx_file, [], str(e)
+
+
+def audit_tree(target_dir, jobs=1, chunk_size=16):
+    """Yield (path, tags, error) for every page.mdx below target_dir, in path order.
+
+    With more than one job the files are audited across worker processes.
+    """
+    paths = iter_mdx_files(target_dir)
+    if jobs <= 1:
+        yield from map(_audit_entry, paths)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(_audit_entry, paths, chunksize=chunk_size)
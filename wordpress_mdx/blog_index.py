@@ -0,0 +1,100 @@
+"""The blog index: the listing metadata of every post in one JSON file.
+
+The site can list, sort, paginate and map posts from the index instead of
+importing every page.mdx. Entries are sorted newest first, like the blog
+listing. For large blogs the index can be split into shards of a fixed
+number of entries, each a page of the listing, with the index file naming
+the shards. The conversion run adds the slugs of each post's related posts;
+see related.py.
+"""
+
+import json
+import os
+import re
+
+from .templates import DESCRIPTIONS, reading_stats
+
+
+INDEX_NAME = 'blog-index.json'
+
+
+def index_entry(post, template):
+    """Describe a converted post for the index, as the page of template presents it."""
+    # The raw text; templates escape it when they render the page
+    description = post.get('seo_description') or post.get('description') \
+        or DESCRIPTIONS[template](post['content'])
+    word_count, minutes = reading_stats(post)
+    return {
+        'id': post['id'],
+        'slug': post['slug'],
+        'title': post['title'],
+        'date': post['date'],
+        'description': description,
+        'featured_image': post['featured_image'],
+        'word_count': word_count,
+        'reading_time': minutes
+    }
+
+
+def load_index(target_dir, index_name=INDEX_NAME):
+    """Load the entries of an earlier run's index, keyed by post id.
+
+    Returns None when there is no readable index, so that callers can tell
+    a missing index from an empty one.
+    """
+    try:
+        with open(os.path.join(target_dir, index_name), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        posts = list(index.get('posts', []))
+        for shard in index.get('shards', []):
+            with open(os.path.join(target_dir, shard), 'r', encoding='utf-8') as f:
+                posts.extend(json.load(f)['posts'])
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+    return {entry['id']: entry for entry in posts if 'id' in entry}
+
+
+def sort_entries(entries):
+    """Order index entries newest first; posts of the same day by slug."""
+    entries = sorted(entries, key=lambda entry: entry['slug'])
+    return sorted(entries, key=lambda entry: entry['date'], reverse=True)
+
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def build_index_files(entries, index_name=INDEX_NAME, shard_size=0):
+    """Return {relative path: text} for the index of entries.
+
+    With shard_size > 0 the index file names shards of shard_size entries
+    each, <name>-0001.json onwards; otherwise it holds every entry.
+    """
+    entries = sort_entries(entries)
+    if shard_size <= 0:
+        return {index_name: _dump({'total': len(entries), 'posts': entries})}
+
+    stem = os.path.splitext(index_name)[0]
+    files = {}
+    for number, start in enumerate(range(0, len(entries), shard_size), 1):
+        files[f'{stem}-{number:04d}.json'] = _dump({
+            'shard': number,
+            'posts': entries[start:start + shard_size]
+        })
+    files[index_name] = _dump({
+        'total': len(entries),
+        'shard_size': shard_size,
+        'shards': sorted(name for name in files)
+    })
+    return files
+
+
+def stale_index_files(target_dir, files, index_name=INDEX_NAME):
+    """Return the shards of an earlier index in target_dir that files no longer has."""
+    stem = os.path.splitext(index_name)[0]
+    shard_re = re.compile(re.escape(stem) + r'-\d{4}\.json')
+    try:
+        names = os.listdir(target_dir)
+    except OSError:
+        return []
+    return sorted(name for name in names if shard_re.fullmatch(name) and name not in files)
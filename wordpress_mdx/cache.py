@@ -0,0 +1,194 @@
+"""On-disk cache of converted markdown, shared by runs and worker processes.
+
+Entries map the hash of a post's raw Content, the engine, RULES_VERSION and
+the template to the markdown and the description derived from it, so
+re-running a migration after changing only templates or output layout
+skips the HTML conversion. The cache is a single SQLite file; entries are
+evicted least recently used first once it grows past its size bound.
+Conversion runs only use it when asked to, with --cache.
+
+The same file remembers the width and height of the images posts show,
+keyed by path, modification time and file size.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+from .engines import RULES_VERSION
+
+
+DEFAULT_CACHE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'wordpress_mdx', 'conversions.sqlite')
+
+# Size bound applied after every conversion run, in bytes of cached text
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    engine TEXT NOT NULL,
+    template TEXT NOT NULL,
+    rules_version TEXT NOT NULL,
+    markdown TEXT NOT NULL,
+    description TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS image_sizes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL
+);
+'''
+
+
+def cache_key(content, engine, template):
+    """Return the cache key of a post's raw Content converted with engine for template."""
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    raw = '\0'.join((content_hash, engine, RULES_VERSION, template))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ConversionCache:
+    """A connection to the cache file at path, which is created if missing.
+
+    Lookups and stores never raise: a cache that cannot be read or written,
+    for example while another process holds the lock for too long, only
+    costs the conversion it would have saved.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+
+    def get(self, key):
+        """Return (markdown, description) for key, or None, and mark the entry as used."""
+        try:
+            row = self.db.execute(
+                'SELECT markdown, description FROM entries WHERE key = ?', (key,)).fetchone()
+            if row:
+                self.db.execute('UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?',
+                                (time.time(), key))
+        except sqlite3.Error:
+            return None
+        return row
+
+    def put(self, key, engine, template, markdown, description):
+        """Store the conversion of a post under key."""
+        now = time.time()
+        size = len(markdown.encode('utf-8')) + len(description.encode('utf-8'))
+        try:
+            self.db.execute(
+                'INSERT OR REPLACE INTO entries (key, engine, template, rules_version, markdown, '
+                'description, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, engine, template, RULES_VERSION, markdown, description, size, now, now))
+        except sqlite3.Error:
+            pass
+
+    def get_image_size(self, path, mtime_ns, size):
+        """Return (width, height) of the image at path if it has not changed since it was stored."""
+        try:
+            row = self.db.execute(
+                'SELECT width, height FROM image_sizes WHERE path = ? AND mtime_ns = ? AND size = ?',
+                (path, mtime_ns, size)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row
+
+    def put_image_size(self, path, mtime_ns, size, width, height):
+        """Store the width and height of the image at path as it is now."""
+        try:
+            self.db.execute(
+                'INSERT OR REPLACE INTO image_sizes (path, mtime_ns, size, width, height) '
+                'VALUES (?, ?, ?, ?, ?)', (path, mtime_ns, size, width, height))
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        """Describe the cache: entry count, size and the entries per engine, template and rules version."""
+        count, size, hits, oldest, newest = self.db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), '
+            'MIN(last_used), MAX(last_used) FROM entries').fetchone()
+        groups = self.db.execute(
+            'SELECT engine, template, rules_version, COUNT(*), SUM(size) FROM entries '
+            'GROUP BY engine, template, rules_version ORDER BY engine, template, rules_version').fetchall()
+        return {
+            'path': self.path,
+            'entries': count,
+            'size': size,
+            'file_size': os.path.getsize(self.path),
+            'hits': hits,
+            'oldest_use': oldest,
+            'newest_use': newest,
+            'groups': [
+                {'engine': engine, 'template': template, 'rules_version': version,
+                 'entries': entries, 'size': group_size}
+                for engine, template, version, entries, group_size in groups
+            ]
+        }
+
+    def prune(self, max_size=None, stale=False):
+        """Evict entries and return how many were removed.
+
+        stale removes entries made with another RULES_VERSION, which can
+        never be hit again. max_size then evicts the least recently used
+        entries until the cached text fits in max_size bytes.
+        """
+        removed = 0
+        if stale:
+            removed += self.db.execute(
+                'DELETE FROM entries WHERE rules_version != ?', (RULES_VERSION,)).rowcount
+        if max_size is not None:
+            total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            evict = []
+            for key, size in self.db.execute('SELECT key, size FROM entries ORDER BY last_used'):
+                if total <= max_size:
+                    break
+                evict.append((key,))
+                total -= size
+            self.db.executemany('DELETE FROM entries WHERE key = ?', evict)
+            removed += len(evict)
+        return removed
+
+    def vacuum(self):
+        """Give the space of evicted entries back to the file system."""
+        self.db.execute('VACUUM')
+        self.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def close(self):
+        """Close the connection."""
+        self.db.close()
+
+
+# Connections by process id and path. A forked worker process inherits the
+# connections of its parent, which SQLite connections must not be used
+# across, so it opens its own
+_open_caches = {}
+
+
+def open_cache(path):
+    """Return this process's connection to the cache at path, opening it once.
+
+    Returns None when the cache cannot be opened; posts are then converted
+    without it.
+    """
+    key = (os.getpid(), path)
+    if key not in _open_caches:
+        try:
+            _open_caches[key] = ConversionCache(path)
+        except (OSError, sqlite3.Error):
+            _open_caches[key] = None
+    return _open_caches[key]
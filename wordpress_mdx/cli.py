@@ -0,0 +1,817 @@
+"""Command line interface shared by the conversion scripts."""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from .assets import (ASSET_DIR, ASSET_MAP_NAME, DEFAULT_CONCURRENCY, asset_hosts, asset_key,
+                     collect_asset_urls, copy_new_assets, load_asset_map)
+from .audit import audit_tree
+from .blog_index import INDEX_NAME, load_index
+from .cache import DEFAULT_CACHE, DEFAULT_CACHE_SIZE, ConversionCache, open_cache
+from .engines import CONVERTER_VERSION, ENGINES, PARITY_ENGINES
+from .events import (EVENTS_NAME, Checkpoints, EventLog, ProgressBar, interrupted_run,
+                     merge_resumed, post_record, remove_staging_dir, resume_posts, staging_dir)
+from .export import count_posts, iter_posts, join_seo, load_seo_index
+from .feeds import ATOM_NAME, RSS_NAME, SITE_URL, SITEMAP_NAME, stage_feeds, stale_feed_files
+from .images import DEFAULT_PUBLIC_DIR
+from .manifest import (MANIFEST_NAME, find_orphans, iter_changed_posts, load_manifest,
+                       save_manifest)
+from .output import OutputWriter
+from .pipeline import (compare_engines, iter_results, remove_stale_indexes, report_post,
+                       stage_blog_index, stage_search_index, write_result)
+from .profiling import build_profile_report, print_profile_summary
+from .redirects import DEFAULT_REDIRECTS, REPO_ROOT, load_redirects
+from .related import DEFAULT_RELATED, RELATED_NAME, RelatedPosts, term_counts
+from .search_index import SEARCH_DIR, SearchIndexBuilder
+from .templates import TEMPLATES
+from .watch import DEFAULT_INTERVAL, WatchSession, file_state
+
+
+QUARANTINE_NAME = 'conversion_quarantine.json'
+
+# The export bundled with the repository and the Next.js blog route
+DEFAULT_XML = os.path.join(REPO_ROOT, 'Rules', 'Posts Export Oct 16 2025.xml')
+DEFAULT_TARGET_DIR = os.path.join(REPO_ROOT, 'src', 'app', 'blog')
+
+
+def parse_args(argv=None, description='Convert a WordPress XML export to MDX blog posts.',
+               engine='regex', template='blog-layout'):
+    """Parse command line options; each script passes its own defaults."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--xml',
+        default=DEFAULT_XML,
+        help='WordPress XML export to convert'
+    )
+    parser.add_argument(
+        '--csv',
+        help='WordPress CSV export whose SEO titles, descriptions and permalinks '
+             'are used for the posts of the same id'
+    )
+    parser.add_argument(
+        '--target-dir',
+        default=DEFAULT_TARGET_DIR,
+        help='Directory the <slug>/page.mdx files are written to'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=sorted(ENGINES),
+        default=engine,
+        help=f'HTML to markdown engine (default: {engine})'
+    )
+    parser.add_argument(
+        '--template',
+        choices=sorted(TEMPLATES),
+        default=template,
+        help=f'Layout of the generated page.mdx files (default: {template})'
+    )
+    parser.add_argument(
+        '--compare-engines',
+        action='store_true',
+        help=f"Run the {' and '.join(PARITY_ENGINES)} engines on each post and report "
+             f"differences instead of writing files"
+    )
+    parser.add_argument(
+        '--manifest',
+        help=f'Manifest used to skip unchanged posts (default: <target-dir>/{MANIFEST_NAME})'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Convert and write every post, even those the manifest lists as unchanged, '
+             'without reading markdown from the cache; with --cache, the new conversions are '
+             'still stored in it'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='REPORT',
+        help='Record time, matches and bytes per conversion rule and post, and write them to REPORT as JSON'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Worker processes to convert posts with; 0 uses every CPU (default: 1)'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=8,
+        help='Posts sent to a worker process at a time (default: 8)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=30,
+        help='Seconds a single post may take to convert before it is quarantined; 0 disables (default: 30)'
+    )
+    parser.add_argument(
+        '--quarantine',
+        metavar='REPORT',
+        help=f'Where quarantined posts are listed as JSON (default: <target-dir>/{QUARANTINE_NAME})'
+    )
+    parser.add_argument(
+        '--cache',
+        nargs='?',
+        const=DEFAULT_CACHE,
+        metavar='PATH',
+        help='Reuse converted markdown across runs from a cache file, PATH or, without one, '
+             f'{DEFAULT_CACHE}; off by default'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Convert every post without reading or filling the cache, even with --cache'
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=float,
+        default=DEFAULT_CACHE_SIZE / 1024 / 1024,
+        help='Megabytes of markdown the cache keeps; least recently used entries are evicted '
+             f'after each run (default: {DEFAULT_CACHE_SIZE // 1024 // 1024})'
+    )
+    parser.add_argument(
+        '--fsync-batch',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Flush written files to disk every N files, and their directories once published; '
+             '0 leaves flushing to the OS (default: 0)'
+    )
+    parser.add_argument(
+        '--events',
+        metavar='LOG',
+        help='Event log the run writes as it goes, one JSON record per post: its id, slug, '
+             'bytes in and out, seconds, warnings and error '
+             f'(default: <target-dir>/{EVENTS_NAME})'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Carry on the run the event log ends in if it was interrupted: the posts it '
+             'converted are published from its staging tree instead of being converted again'
+    )
+    parser.add_argument(
+        '--no-progress',
+        action='store_true',
+        help='Do not show the progress bar, shown when standard error is a terminal'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Report which files would be created or updated without writing anything'
+    )
+    parser.add_argument(
+        '--index',
+        default=INDEX_NAME,
+        metavar='NAME',
+        help=f'Blog index of every post\'s listing metadata, written to <target-dir>/NAME '
+             f'(default: {INDEX_NAME})'
+    )
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help='Do not write or update the blog index'
+    )
+    parser.add_argument(
+        '--index-shard-size',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Split the blog index into shards of N posts each, named by the index file; '
+             '0 keeps every post in the index file (default: 0)'
+    )
+    parser.add_argument(
+        '--related',
+        type=int,
+        default=DEFAULT_RELATED,
+        metavar='N',
+        help=f'Add the N most similar posts to each entry of the blog index; 0 leaves them out '
+             f'(default: {DEFAULT_RELATED})'
+    )
+    parser.add_argument(
+        '--feeds-dir',
+        help=f'Directory under --public-dir the RSS ({RSS_NAME}) and Atom ({ATOM_NAME}) feeds '
+             'are written to, from the blog index; their links point where the site serves it '
+             '(default: <public-dir>)'
+    )
+    parser.add_argument(
+        '--no-feeds',
+        action='store_true',
+        help='Do not write the feeds'
+    )
+    parser.add_argument(
+        '--sitemap',
+        action='store_true',
+        help=f'Also write a blog sitemap ({SITEMAP_NAME}) to --feeds-dir; src/app/sitemap.ts '
+             'already lists the blog posts, so this is only for a site that does not'
+    )
+    parser.add_argument(
+        '--site-url',
+        default=SITE_URL,
+        help=f'Address of the site the feeds and sitemap link to (default: {SITE_URL})'
+    )
+    parser.add_argument(
+        '--redirects',
+        action='append',
+        metavar='FILE',
+        help='Redirect rules whose final destinations links are rewritten to: Apache Redirect '
+             'lines, a JSON list or a Next.js config; repeatable, later files override earlier '
+             'ones (default: the bundled 301 configuration, blog-redirects.json and next.config.mjs)'
+    )
+    parser.add_argument(
+        '--no-redirects',
+        action='store_true',
+        help='Keep links as they are in the export'
+    )
+    parser.add_argument(
+        '--search-index',
+        action='store_true',
+        help='Write or update a full-text search index of the posts, for a client-side search '
+             'to load from the site: its index.json is served at /<path of --search-dir>/index.json'
+    )
+    parser.add_argument(
+        '--search-dir',
+        help=f'Directory under --public-dir the search index is written to '
+             f'(default: <public-dir>/{SEARCH_DIR}, served at /{SEARCH_DIR}/)'
+    )
+    parser.add_argument(
+        '--public-dir',
+        default=DEFAULT_PUBLIC_DIR,
+        help='The site\'s public/ directory; images served from it are written with their width '
+             'and height. Posts are only converted again when they change, so use --force after '
+             f'replacing an image in place (default: {DEFAULT_PUBLIC_DIR})'
+    )
+    parser.add_argument(
+        '--no-image-sizes',
+        action='store_true',
+        help='Write images without their width and height'
+    )
+    parser.add_argument(
+        '--copy-assets',
+        action='store_true',
+        help='Copy the featured and inline images of the old site into --asset-dir, named by '
+             'their content, and point the posts at the copies; images copied by earlier runs '
+             'are not fetched again'
+    )
+    parser.add_argument(
+        '--asset-dir',
+        help=f'Directory under --public-dir the copies are stored in '
+             f'(default: <public-dir>/{ASSET_DIR})'
+    )
+    parser.add_argument(
+        '--asset-map',
+        help=f'Which copy each image URL became, kept across runs '
+             f'(default: <target-dir>/{ASSET_MAP_NAME})'
+    )
+    parser.add_argument(
+        '--asset-host',
+        action='append',
+        default=[],
+        metavar='HOST',
+        help='Also copy images from HOST, such as a CDN or a local stand-in server, and follow '
+             'redirects to it; repeatable (the old site\'s hosts are always included)'
+    )
+    parser.add_argument(
+        '--asset-concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        metavar='N',
+        help=f'Images downloaded at once (default: {DEFAULT_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='After converting, keep running and convert the posts that were added, changed or '
+             'removed whenever the export or the CSV export is saved again; restart to pick up '
+             'changed options, redirects or images'
+    )
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=DEFAULT_INTERVAL,
+        metavar='SECONDS',
+        help=f'How often --watch looks at the export (default: {DEFAULT_INTERVAL})'
+    )
+    args = parser.parse_args(argv)
+    if args.watch and (args.dry_run or args.compare_engines):
+        parser.error('--watch writes files, so it cannot be combined with --dry-run or --compare-engines')
+    if args.resume and args.dry_run:
+        parser.error('--resume publishes what an interrupted run staged, so it cannot be combined '
+                     'with --dry-run')
+    if args.copy_assets:
+        asset_dir = os.path.abspath(args.asset_dir or os.path.join(args.public_dir, ASSET_DIR))
+        if os.path.relpath(asset_dir, os.path.abspath(args.public_dir)).startswith(os.pardir):
+            parser.error('--asset-dir must be inside --public-dir, which the site serves')
+    if args.search_dir and args.search_index:
+        search_dir = os.path.abspath(args.search_dir)
+        relative = os.path.relpath(search_dir, os.path.abspath(args.public_dir))
+        if relative.startswith(os.pardir):
+            parser.error('--search-dir must be inside --public-dir, which the site serves')
+        if relative == os.curdir:
+            parser.error('--search-dir must be a directory of its own inside --public-dir, as '
+                         'chunks the index no longer uses are deleted from it')
+    if args.feeds_dir and not args.no_feeds:
+        feeds_dir = os.path.abspath(args.feeds_dir)
+        if os.path.relpath(feeds_dir, os.path.abspath(args.public_dir)).startswith(os.pardir):
+            parser.error('--feeds-dir must be inside --public-dir, which the site serves')
+    return args
+
+
+def site_path(directory, public_dir):
+    """The path the site serves directory, inside public_dir, at: '' for public_dir itself."""
+    relative = os.path.relpath(directory, public_dir).replace(os.sep, '/')
+    return '' if relative == '.' else '/' + relative
+
+
+def run(args):
+    """Convert an export as parsed by parse_args; return the run summary.
+
+    Returns None when only comparing engines.
+    """
+    xml_file = args.xml
+    target_dir = args.target_dir
+    jobs = args.jobs or os.cpu_count() or 1
+
+    if args.compare_engines:
+        compare_engines(xml_file)
+        return None
+
+    print(f"Parsing XML file: {xml_file}")
+    if args.csv:
+        print(f"SEO metadata from CSV: {args.csv}")
+    print(f"Engine: {args.engine}")
+    print(f"Template: {args.template}")
+
+    # Default redirect files that are not in this checkout are skipped
+    redirects = None
+    if not args.no_redirects:
+        redirects = tuple(args.redirects or (path for path in DEFAULT_REDIRECTS if os.path.exists(path)))
+    redirect_map = load_redirects(redirects) if redirects else None
+    if redirect_map:
+        print(f"Redirect rules: {len(redirect_map)} from {', '.join(redirects)}")
+    if jobs > 1:
+        print(f"Worker processes: {jobs}")
+
+    # Copy the images of the old site before converting, so every post can point at its copies
+    assets = hosts = asset_dir = url_prefix = None
+    asset_failures = {}
+    copied = {}
+    if args.copy_assets:
+        asset_dir = args.asset_dir or os.path.join(args.public_dir, ASSET_DIR)
+        url_prefix = site_path(asset_dir, args.public_dir) + '/'
+        assets = args.asset_map or os.path.join(target_dir, ASSET_MAP_NAME)
+        hosts = asset_hosts(args.asset_host)
+        asset_urls = collect_asset_urls(iter_posts(xml_file), hosts)
+        print(f"Images on {', '.join(sorted(hosts))}: {len(asset_urls)}, copied to: {asset_dir}")
+        if not args.dry_run:
+            copied, asset_failures = copy_new_assets(
+                asset_urls, asset_dir, url_prefix, assets, hosts, args.asset_concurrency)
+            print(f"✓ Copied {len(copied)} image(s); "
+                  f"{len(asset_urls) - len(copied) - len(asset_failures)} already copied")
+            for url, reason in asset_failures.items():
+                print(f"✗ Could not copy {url}: {reason}")
+
+    # After the copies, which may be the first files of public/, so they are sized too
+    public_dir = None if args.no_image_sizes or not os.path.isdir(args.public_dir) else args.public_dir
+    if public_dir:
+        print(f"Image sizes from: {public_dir}")
+
+    if args.dry_run:
+        print(f"Dry run, nothing is written to: {target_dir}\n")
+    else:
+        print(f"Creating MDX files in: {target_dir}\n")
+
+    summary = {
+        'target_dir': target_dir,
+        'processed': 0,
+        'errors': [],
+        'created_posts': [],
+        'html_check_errors': [],
+        'quarantined': [],
+        'cache_hits': 0,
+        'links_rewritten': 0,
+        'assets_copied': len(copied),
+        'asset_failures': [{'url': url, 'error': reason} for url, reason in asset_failures.items()],
+        'assets_localized': 0,
+        'images_sized': 0,
+        'dry_run': args.dry_run,
+        'writes': {'created': 0, 'updated': 0, 'unchanged': 0},
+        'profiles': [],
+        'resumed': 0
+    }
+
+    manifest_path = args.manifest or os.path.join(target_dir, MANIFEST_NAME)
+    previous, known_orphans = load_manifest(manifest_path)
+    if args.force:
+        previous = {}
+    current = {}
+    posts = iter_posts(xml_file)
+    # Watch mode keeps every post anyway, and starts from the export as read here
+    if args.watch:
+        seen = {path: file_state(path) for path in (xml_file, args.csv) if path}
+        with open(xml_file, 'rb') as f:
+            watched = f.read()
+        watched_posts = list(iter_posts(io.BytesIO(watched)))
+        posts = iter(watched_posts)
+    seo_index = {}
+    if args.csv:
+        seo_index = load_seo_index(args.csv)
+        posts = join_seo(posts, seo_index)
+    # Posts missing from the blog or search index are converted again to add them
+    index = None if args.no_index else load_index(target_dir, args.index) or {}
+    search_dir = args.search_dir or os.path.join(args.public_dir, SEARCH_DIR)
+    search = SearchIndexBuilder(search_dir) if args.search_index else None
+    # The term counts related posts are scored from are kept next to the index
+    related = None
+    if index is not None and args.related > 0:
+        related = RelatedPosts(os.path.join(target_dir, RELATED_NAME), args.related)
+    known = [set(ids) for ids in (index, search and search.docs, related and related.docs)
+             if ids is not None]
+    # The redirects are part of the converter, so posts are converted again when they change
+    converter = f'{CONVERTER_VERSION}/{args.engine}/{args.template}'
+    if redirect_map:
+        converter += f'/redirects-{redirect_map.digest()}'
+    if public_dir:
+        converter += '/image-sizes'
+    # A post is converted again once an image of it has been copied
+    copies = None
+    if assets:
+        copies = load_asset_map(assets)
+        converter += '/assets'
+
+    # Every post gets a record in the event log as soon as it is done. A run
+    # stages its pages in a directory of its own, which it keeps if it is
+    # interrupted; unless resumed, the next run removes it
+    events_path = args.events or os.path.join(target_dir, EVENTS_NAME)
+    log = staging = checkpoints = None
+    completed = {}
+    if not args.dry_run:
+        interrupted, completed = interrupted_run(events_path)
+        resumed = bool(interrupted and args.resume and interrupted.get('staging'))
+        if resumed:
+            staging = interrupted['staging']
+            print(f"Resuming the interrupted run: {len(completed)} post(s) converted\n")
+        else:
+            if interrupted:
+                remove_staging_dir(interrupted.get('staging'), target_dir)
+            if args.resume:
+                print("Nothing to resume: the last run finished\n")
+            completed = {}
+            staging = staging_dir(target_dir)
+        checkpoints = Checkpoints(staging)
+        log = EventLog(events_path, append=resumed)
+        log.write('run', xml=xml_file, target_dir=target_dir, engine=args.engine,
+                  template=args.template, converter=converter, staging=staging, resumed=resumed)
+    started = time.perf_counter()
+
+    # The bar counts the posts skipped as unchanged as they are read
+    progress = None
+    if not args.no_progress and sys.stderr.isatty():
+        progress = ProgressBar(count_posts(xml_file))
+
+    def log_skipped(post_id):
+        if log:
+            log.write('post', id=post_id, slug=current[post_id]['slug'], status='skipped')
+        if progress:
+            progress.update()
+
+    records = iter_changed_posts(
+        posts, previous, current, target_dir, converter,
+        indexed=set.intersection(*known) if known else None,
+        asset_key=(lambda fields: asset_key(fields, hosts, copies)) if assets else None,
+        skipped=log_skipped)
+
+    # A dry run neither reads nor fills the cache, which is on disk too
+    cache = None if args.no_cache or args.dry_run else args.cache
+
+    # Convert each post as soon as it has been read and stage its page;
+    # the target directory only changes once every post is done
+    failed = []
+    converted = 0
+    # The feeds and sitemap list every post of the blog index
+    feeds_dir = None if index is None or args.no_feeds else args.feeds_dir or args.public_dir
+    feeds_path = site_path(feeds_dir, args.public_dir) if feeds_dir else ''
+    with OutputWriter(target_dir, args.fsync_batch, args.dry_run, staging) as writer, \
+            OutputWriter(search_dir, args.fsync_batch, args.dry_run) as search_writer, \
+            OutputWriter(feeds_dir or target_dir, args.fsync_batch, args.dry_run) as feed_writer:
+        # Posts a resumed run takes from the interrupted one are handled like converted ones
+        restored = deque()
+        converting = deque()
+        if completed:
+            records = resume_posts(records, completed, checkpoints, current, writer, restored,
+                                   converting)
+        results = iter_results(records, args.engine, args.template, jobs=jobs,
+                               chunk_size=args.chunk_size, profile=bool(args.profile),
+                               timeout=args.timeout, cache=cache, redirects=redirects,
+                               public_dir=public_dir, assets=assets, refresh=args.force)
+        for result in merge_resumed(results, restored, converting):
+            converted += 1
+            write_result(result, writer)
+            if progress:
+                progress.clear()
+            report_post(result, summary)
+            if progress:
+                progress.update(bytes_in=result['bytes_in'])
+            if log:
+                status = ('resumed' if result.get('resumed') else 'quarantined' if result['quarantined']
+                          else 'failed' if result['error'] else 'converted')
+                if status == 'converted':
+                    checkpoints.save(result, current[result['id']])
+                log.write('post', **post_record(result, status))
+            if result['error']:
+                failed.append(result['id'])
+                continue
+            if index is not None:
+                index[result['id']] = result['index']
+            if search is not None:
+                search.update(result['id'], result['slug'], result['title'], result['search'])
+            if related is not None:
+                related.update(result['id'], term_counts(result['search']))
+
+        # Index entries of posts no longer in the export are dropped; failed
+        # posts keep the entry of their last good conversion
+        index_files = None
+        if index is not None:
+            index_files = stage_blog_index(writer, current, index, related, args.index,
+                                           args.index_shard_size, summary)
+        if related is not None:
+            writer.stage_file(RELATED_NAME, related.dump())
+        if search is not None:
+            stage_search_index(search_writer, current, search, summary)
+        if feeds_dir:
+            feed_files = summary['feed_files'] = stage_feeds(
+                feed_writer, (entry for post_id, entry in index.items() if post_id in current),
+                args.site_url, path=feeds_path, sitemap=args.sitemap)
+        if progress:
+            progress.clear()
+        if checkpoints:
+            checkpoints.close()
+        writer.publish()
+        search_writer.publish()
+        feed_writer.publish()
+
+    if not args.dry_run:
+        remove_stale_indexes(target_dir, index_files, args.index, search)
+        if feeds_dir:
+            for name in stale_feed_files(feeds_dir, feed_files):
+                os.remove(os.path.join(feeds_dir, name))
+
+    skipped = summary['skipped'] = len(current) - converted
+    # Leave failed posts out of the manifest so the next run retries them
+    for post_id in failed:
+        current.pop(post_id, None)
+    orphans = find_orphans(previous, known_orphans, current, target_dir)
+    if not args.dry_run:
+        os.makedirs(target_dir, exist_ok=True)
+        save_manifest(manifest_path, current, orphans)
+
+    # Quarantined posts are left out of the manifest too, so the report
+    # always lists exactly the posts the latest run could not convert
+    quarantine_path = args.quarantine or os.path.join(target_dir, QUARANTINE_NAME)
+    quarantined = summary['quarantined']
+    if quarantined and not args.dry_run:
+        with open(quarantine_path, 'w', encoding='utf-8') as f:
+            json.dump({'engine': args.engine, 'timeout': args.timeout, 'posts': quarantined}, f, indent=2)
+    elif not args.dry_run and os.path.exists(quarantine_path):
+        os.remove(quarantine_path)
+
+    conversion_cache = open_cache(cache) if cache else None
+    if conversion_cache:
+        conversion_cache.prune(max_size=int(args.cache_size * 1024 * 1024))
+
+    if log:
+        writes = summary['writes']
+        log.write('done', seconds=round(time.perf_counter() - started, 3),
+                  processed=summary['processed'], created=writes['created'],
+                  updated=writes['updated'], unchanged=writes['unchanged'], skipped=skipped,
+                  resumed=summary['resumed'], errors=len(summary['errors']),
+                  quarantined=len(summary['quarantined']))
+        log.close()
+
+    errors = summary['errors']
+    html_check_errors = summary['html_check_errors']
+
+    # Print summary
+    print("\n" + "="*60)
+    print("CONVERSION SUMMARY")
+    print("="*60)
+    print(f"Total posts processed: {summary['processed']}")
+    writes = summary['writes']
+    would = 'would be ' if args.dry_run else ''
+    print(f"MDX files {would}created: {writes['created']}")
+    print(f"MDX files {would}updated: {writes['updated']}")
+    print(f"MDX files already up to date: {writes['unchanged']}")
+    print(f"Errors encountered: {len(errors)}")
+    print(f"Files with HTML tags: {len(html_check_errors)}")
+    print(f"Unchanged posts skipped: {skipped}")
+    print(f"Posts quarantined: {len(quarantined)}")
+    if summary['resumed']:
+        print(f"Posts taken from the interrupted run: {summary['resumed']}")
+    if conversion_cache:
+        print(f"Conversions reused from cache: {summary['cache_hits']}")
+    if redirect_map:
+        print(f"Links pointed past redirects: {summary['links_rewritten']}")
+    if assets:
+        print(f"Images copied: {summary['assets_copied']}")
+        print(f"Images that could not be copied: {len(summary['asset_failures'])}")
+        print(f"Image references pointed at copies: {summary['assets_localized']}")
+    if public_dir:
+        print(f"Inline images sized: {summary['images_sized']}")
+    if index is not None:
+        print(f"Posts in blog index: {summary['indexed']}")
+    if related is not None:
+        print(f"Related posts scored: {summary['related_scored']}")
+    if search is not None:
+        print(f"Posts in search index: {summary['searchable']}")
+    if feeds_dir:
+        feed_files = summary['feed_files']
+        rewritten = sum(1 for status in feed_files.values() if status != 'unchanged')
+        kind = 'Feed and sitemap' if args.sitemap else 'Feed'
+        print(f"{kind} files {would}rewritten: {rewritten} of {len(feed_files)}")
+
+    if html_check_errors:
+        print("\n⚠ WARNING: The following files contain HTML tags:")
+        for item in html_check_errors:
+            print(f"  - {item['file']}")
+            print(f"    Tags found: {', '.join(item['tags'][:3])}")
+    else:
+        print("\n✓ SUCCESS: All MDX files are clean (no HTML tags)")
+
+    if errors:
+        print("\nErrors:")
+        for error in errors:
+            print(f"  - {error['error']}")
+
+    if quarantined:
+        print(f"\n⚠ WARNING: These posts took longer than {args.timeout:g}s to convert and were skipped:")
+        for post in quarantined:
+            print(f"  - {post['slug']} (ID: {post['id']}): {post['title']}")
+        print(f"  Details: {quarantine_path}")
+
+    if seo_index:
+        print("\n⚠ WARNING: These CSV rows have no post in the XML export:")
+        for post_id in seo_index:
+            print(f"  - ID {post_id}: {seo_index[post_id]['Permalink']}")
+
+    if orphans:
+        print("\n⚠ WARNING: No post in the export writes these directories anymore:")
+        for slug in orphans:
+            print(f"  - {os.path.join(target_dir, slug)}")
+
+    if args.profile:
+        report = build_profile_report(args.engine, summary['profiles'])
+        with open(args.profile, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print_profile_summary(report)
+        print(f"\nProfile report: {args.profile}")
+
+    print("\nTarget directory: " + target_dir)
+    if log:
+        print(f"Event log: {events_path}")
+
+    if args.watch:
+        settings = {
+            'converter': converter, 'redirects': redirects, 'public_dir': public_dir,
+            'assets': assets, 'hosts': hosts, 'asset_dir': asset_dir, 'url_prefix': url_prefix,
+            'cache': cache, 'manifest_path': manifest_path, 'feeds_dir': feeds_dir,
+            'feeds_path': feeds_path,
+        }
+        session = WatchSession(args, settings, current, orphans, index, search, related)
+        session.seed(watched, watched_posts, failed)
+        session.watch(args.watch_interval, seen)
+
+    return summary
+
+
+def main(argv=None, **defaults):
+    """Parse options with the calling script's defaults and run the conversion."""
+    return run(parse_args(argv, **defaults))
+
+
+def parse_audit_args(argv=None):
+    """Parse the options of the standalone page.mdx audit."""
+    parser = argparse.ArgumentParser(
+        description='Check every page.mdx under a blog directory for leftover HTML tags.')
+    parser.add_argument(
+        '--target-dir',
+        default=DEFAULT_TARGET_DIR,
+        help='Directory whose <slug>/page.mdx files are audited'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=0,
+        help='Worker processes to read files with; 0 uses every CPU (default: 0)'
+    )
+    parser.add_argument(
+        '--report',
+        metavar='REPORT',
+        help='Also write the files with leftover tags to REPORT as JSON'
+    )
+    return parser.parse_args(argv)
+
+
+def audit_main(argv=None):
+    """Audit the page.mdx files of a blog directory; return the files with problems."""
+    args = parse_audit_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+
+    print(f"Auditing MDX files in: {args.target_dir}\n")
+
+    audited = 0
+    findings = []
+    for mdx_file, tags, error in audit_tree(args.target_dir, jobs=jobs):
+        audited += 1
+        if error:
+            findings.append({'file': mdx_file, 'error': error, 'tags': []})
+            print(f"✗ Could not read {mdx_file}: {error}")
+        elif tags:
+            findings.append({'file': mdx_file, 'error': None,
+                             'tags': [{'line': line, 'tag': tag} for line, tag in tags]})
+            print(f"⚠ WARNING: HTML tags found in {mdx_file}")
+            for line, tag in tags[:5]:  # Show first 5
+                print(f"    line {line}: {tag}")
+
+    print("\n" + "="*60)
+    print("AUDIT SUMMARY")
+    print("="*60)
+    print(f"MDX files audited: {audited}")
+    print(f"Files with HTML tags: {sum(1 for item in findings if item['tags'])}")
+    print(f"Unreadable files: {sum(1 for item in findings if item['error'])}")
+    if not findings:
+        print("\n✓ SUCCESS: All MDX files are clean (no HTML tags)")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'target_dir': args.target_dir, 'audited': audited, 'files': findings}, f, indent=2)
+        print(f"\nAudit report: {args.report}")
+
+    return findings
+
+
+def parse_cache_args(argv=None):
+    """Parse the options of the conversion cache command."""
+    parser = argparse.ArgumentParser(description='Inspect or prune the cache of converted markdown.')
+    parser.add_argument(
+        '--cache',
+        default=DEFAULT_CACHE,
+        help=f'Cache file (default: {DEFAULT_CACHE})'
+    )
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('stats', help='Show what the cache holds (the default)')
+    prune = commands.add_parser('prune', help='Evict entries and compact the cache file')
+    prune.add_argument(
+        '--max-size',
+        type=float,
+        default=DEFAULT_CACHE_SIZE / 1024 / 1024,
+        help='Megabytes of markdown to keep, evicting least recently used entries first '
+             f'(default: {DEFAULT_CACHE_SIZE // 1024 // 1024})'
+    )
+    prune.add_argument(
+        '--stale',
+        action='store_true',
+        help='Also evict entries made with earlier conversion rules'
+    )
+    commands.add_parser('clear', help='Evict every entry')
+    return parser.parse_args(argv)
+
+
+def cache_main(argv=None):
+    """Inspect or prune a conversion cache; return its statistics afterwards."""
+    args = parse_cache_args(argv)
+    if not os.path.exists(args.cache):
+        print(f"No cache at: {args.cache}")
+        return None
+
+    cache = ConversionCache(args.cache)
+    if args.command in ('prune', 'clear'):
+        max_size = 0 if args.command == 'clear' else int(args.max_size * 1024 * 1024)
+        removed = cache.prune(max_size=max_size, stale=getattr(args, 'stale', False))
+        cache.vacuum()
+        print(f"✓ Evicted {removed} entries\n")
+
+    stats = cache.stats()
+    cache.close()
+
+    def when(timestamp):
+        return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp else '-'
+
+    print(f"Cache: {stats['path']}")
+    print(f"Entries: {stats['entries']}")
+    print(f"Cached markdown: {stats['size'] / 1024 / 1024:.1f} MB (file: {stats['file_size'] / 1024 / 1024:.1f} MB)")
+    print(f"Hits: {stats['hits']}")
+    print(f"Least recently used: {when(stats['oldest_use'])}")
+    print(f"Most recently used: {when(stats['newest_use'])}")
+    if stats['groups']:
+        print(f"\n{'Engine':<12}{'Template':<14}{'Rules':>6}{'Entries':>9}{'MB':>9}")
+        for group in stats['groups']:
+            print(f"{group['engine']:<12}{group['template']:<14}{group['rules_version']:>6}"
+                  f"{group['entries']:>9}{group['size'] / 1024 / 1024:>9.2f}")
+
+    return stats
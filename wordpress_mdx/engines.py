@@ -0,0 +1,24 @@
+"""The HTML to markdown engines, by name."""
+
+from .regex_engine import clean_html_to_markdown
+from .tokenizer import tokenize_html_to_markdown
+from .wordpress_engine import clean_wordpress_content
+
+
+# Bump whenever a change to the conversion rules or MDX templates changes the
+# generated files, so incremental runs rebuild every post.
+CONVERTER_VERSION = '7'
+
+# Bump whenever a change to an engine or to generate_description or
+# extract_description changes their output. It keys the conversion cache,
+# so template-only changes keep using cached markdown.
+RULES_VERSION = '3'
+
+ENGINES = {
+    'regex': clean_html_to_markdown,
+    'tokenizer': tokenize_html_to_markdown,
+    'wordpress': clean_wordpress_content,
+}
+
+# Engines that must produce identical output; see compare_engines
+PARITY_ENGINES = ('regex', 'tokenizer')
@@ -0,0 +1,279 @@
+"""The event log of a conversion run, its progress bar, and resuming an interrupted run.
+
+Every post a run reads gets one record in the log, a line of JSON written
+and flushed as soon as the post is done: its id, slug, status, bytes in
+and out, seconds, warnings and error. The run itself gets a record when
+it starts and one when it is done, so a log without the last is the log
+of a run that did not finish. Each run starts the log afresh, unless it
+resumes the run the log is of.
+
+Pages are only published once every post is converted (see output.py),
+so what an interrupted run converted is still in its staging tree. With
+the pages, a run stages a checkpoint of every post it converts: its
+manifest entry and what the indexes need of it. A resumed run reads the
+log, takes the posts it lists as converted from their checkpoints when
+they have not changed since, and converts only the rest.
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+
+
+EVENTS_NAME = 'conversion_events.ndjson'
+
+# The file of checkpoints in the staging tree; no slug starts with a dot
+CHECKPOINT_NAME = '.checkpoints.ndjson'
+
+# The statuses of a post whose page and checkpoint are staged
+COMPLETED = ('converted', 'resumed')
+
+# Seconds between two redraws of the progress bar
+REDRAW = 0.1
+
+
+class EventLog:
+    """Appends records to the NDJSON file at path, each flushed as it is written.
+
+    Without append the file is started afresh. Use as a context manager.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, event, **fields):
+        """Write one record: the event, the time, then fields."""
+        record = {'event': event, 'time': round(time.time(), 3)}
+        record.update(fields)
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_events(path):
+    """Yield the records of a log; a line cut short by an interrupted write is skipped."""
+    try:
+        f = open(path, 'r', encoding='utf-8')
+    except OSError:
+        return
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def interrupted_run(path):
+    """Return the start record of the run the log ends in, and {post id: record} of its completed posts.
+
+    Resumed runs carry on the run they resume. Returns (None, {}) when
+    the last run is done, or there is no log.
+    """
+    run = None
+    completed = {}
+    for record in read_events(path):
+        event = record.get('event')
+        if event == 'run':
+            if not record.get('resumed'):
+                completed = {}
+            run = record
+        elif event == 'post' and record.get('status') in COMPLETED:
+            completed[record['id']] = record
+        elif event == 'done':
+            run = None
+            completed = {}
+    return run, completed
+
+
+def staging_dir(target_dir):
+    """A new staging directory for target_dir: hidden, next to it, named by the time and process."""
+    parent = os.path.dirname(os.path.abspath(target_dir))
+    name = os.path.basename(os.path.abspath(target_dir))
+    return os.path.join(parent, f".{name}-staging-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}")
+
+
+def remove_staging_dir(path, target_dir):
+    """Remove the staging tree an interrupted run left; a path that is not one for target_dir is left alone."""
+    parent = os.path.dirname(os.path.abspath(target_dir))
+    name = os.path.basename(os.path.abspath(target_dir))
+    if path and os.path.dirname(path) == parent \
+            and os.path.basename(path).startswith(f'.{name}-staging-'):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class Checkpoints:
+    """The checkpoints of the posts a run staged, one JSON line each in a file of its staging tree.
+
+    A post's log record is only written once its checkpoint is flushed, so
+    a line cut short by an interruption belongs to a post the log does not
+    list. Use as a context manager.
+    """
+
+    def __init__(self, staging):
+        self.path = os.path.join(staging, CHECKPOINT_NAME)
+        self.file = None
+        self.offsets = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def save(self, result, entry):
+        """Keep what a resumed run needs of a converted post: its result, without the page, and manifest entry."""
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, 'ab')
+        line = json.dumps({'id': result['id'], 'manifest': entry, 'result': dict(result, mdx=None)},
+                          ensure_ascii=False)
+        self.file.write(line.encode('utf-8') + b'\n')
+        self.file.flush()
+
+    def load(self, post_id):
+        """Return the latest checkpoint of a post, or None."""
+        if self.offsets is None:
+            # Only where each post's line starts is kept, not the lines
+            self.offsets = {}
+            offset = 0
+            try:
+                with open(self.path, 'rb') as f:
+                    for line in f:
+                        try:
+                            self.offsets[json.loads(line)['id']] = offset
+                        except (ValueError, KeyError, TypeError):
+                            pass
+                        offset += len(line)
+            except OSError:
+                pass
+        if post_id not in self.offsets:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[post_id])
+            return json.loads(f.readline())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def post_record(result, status):
+    """The fields of the log record of a converted post."""
+    warnings = []
+    if result['html_tags']:
+        warnings.append(f"HTML tags: {', '.join(result['html_tags'][:5])}")
+    return {
+        'id': result['id'], 'slug': result['slug'], 'title': result['title'], 'status': status,
+        'write': result['write'], 'cached': result['cached'], 'bytes_in': result['bytes_in'],
+        'bytes_out': result['bytes_out'], 'seconds': round(result['seconds'], 4),
+        'warnings': warnings, 'error': result['error'],
+    }
+
+
+def resume_posts(records, completed, checkpoints, current, writer, restored, converting):
+    """Yield the records a resumed run has to convert; restore the others.
+
+    A post is taken from its checkpoint when the log lists it as completed,
+    its manifest entry in current is the same, and its page is still
+    staged, which writer adopts, or was already on disk. Records are
+    numbered as they are read: (number, result) of each restored post is
+    appended to restored, and the number of each record yielded to
+    converting.
+    """
+    for sequence, fields in enumerate(records):
+        post_id = fields.get('id', 'unknown')
+        checkpoint = checkpoints.load(post_id) if post_id in completed else None
+        if checkpoint and checkpoint['manifest'] == current[post_id]:
+            result = checkpoint['result']
+            if result['write'] == 'unchanged' \
+                    or writer.adopt(os.path.join(result['slug'], 'page.mdx')):
+                result['resumed'] = True
+                restored.append((sequence, result))
+                continue
+        converting.append(sequence)
+        yield fields
+
+
+def merge_resumed(results, restored, converting):
+    """Yield the results of converted and restored posts in the order their records were read.
+
+    results are those of the records resume_posts yielded, in order, and
+    restored and converting the deques it fills. A worker pool reads
+    records ahead of the results it returns, so restored results are
+    merged by their number rather than as they come.
+    """
+    for result in results:
+        if converting:
+            sequence = converting.popleft()
+            while restored and restored[0][0] < sequence:
+                yield restored.popleft()[1]
+        yield result
+    while restored:
+        yield restored.popleft()[1]
+
+
+class ProgressBar:
+    """One line on a terminal: the posts done out of total, throughput and time left.
+
+    total is an estimate (see export.count_posts) and grows when the run
+    gets past it. Call clear() before printing anything else, so the line
+    is taken off first and drawn again below on the next update().
+    """
+
+    WIDTH = 24
+
+    def __init__(self, total, stream=None):
+        self.total = total
+        self.stream = stream or sys.stderr
+        self.started = time.monotonic()
+        self.drawn = 0.0
+        self.shown = False
+        self.done = 0
+        self.bytes_in = 0
+
+    def update(self, posts=1, bytes_in=0):
+        """Count posts done and the bytes of export they took; redraw the line."""
+        self.done += posts
+        self.bytes_in += bytes_in
+        self.total = max(self.total, self.done)
+        now = time.monotonic()
+        if self.shown and now - self.drawn < REDRAW:
+            return
+        self.drawn = now
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        filled = self.WIDTH * self.done // self.total if self.total else self.WIDTH
+        line = (f"{self.done:>{len(str(self.total))}}/{self.total} "
+                f"[{'#' * filled}{'-' * (self.WIDTH - filled)}] "
+                f"{rate:.1f} posts/s {self.bytes_in / elapsed / 1024 / 1024:.1f} MB/s")
+        if rate and self.done < self.total:
+            left = int((self.total - self.done) / rate)
+            line += f" ETA {left // 60}:{left % 60:02d}"
+        self.stream.write('\r\033[K' + line)
+        self.stream.flush()
+        self.shown = True
+
+    def clear(self):
+        """Take the line off the terminal."""
+        if self.shown:
+            self.stream.write('\r\033[K')
+            self.stream.flush()
+            self.shown = False
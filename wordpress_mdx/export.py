@@ -0,0 +1,145 @@
+"""Reading posts from the WordPress XML and CSV exports."""
+
+import csv
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+
+
+# The CSV export columns the XML posts are completed with
+SEO_COLUMNS = ('_seopress_titles_title', '_seopress_titles_desc', 'Permalink')
+
+# Largest CSV field accepted; the csv module's default of 128 KiB is
+# smaller than the Content of a long post
+CSV_FIELD_LIMIT = 64 * 1024 * 1024
+
+
+def iter_posts(xml_file):
+    """Yield the fields of each <post> in a WordPress export, one post at a time.
+
+    The export is read with iterparse and every post is discarded once it has
+    been yielded, so memory use does not grow with the size of the export.
+    Each record maps a child tag to its text; a missing child is absent from
+    the record and an empty one maps to None.
+    """
+    context = ET.iterparse(xml_file, events=('start', 'end'))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != 'end' or elem.tag != 'post':
+            continue
+        yield record_fields(elem)
+        root.clear()
+
+
+def count_posts(xml_file, chunk_size=1024 * 1024):
+    """Count the <post> tags of an export without parsing it, for a progress bar.
+
+    A <post> tag inside the text of a post counts too, so it is an estimate.
+    """
+    count = 0
+    tail = b''
+    with open(xml_file, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return count
+            data = tail + chunk
+            count += data.count(b'<post>')
+            # Too short to hold a whole tag, so no tag is counted twice
+            tail = data[-5:]
+
+
+def record_fields(elem):
+    """Map the child tags of a <post> element to their text; the first of a repeated tag wins."""
+    fields = {}
+    for child in elem:
+        fields.setdefault(child.tag, child.text)
+    return fields
+
+
+def iter_csv_posts(csv_file):
+    """Yield the fields of each row of a WordPress CSV export, one row at a time.
+
+    Rows are read as they are parsed, including Content fields that span
+    several lines inside quotes, so memory use is bounded by the largest
+    row rather than by the export. Records use the column names as keys,
+    like the tags of iter_posts.
+    """
+    csv.field_size_limit(max(csv.field_size_limit(), CSV_FIELD_LIMIT))
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def load_seo_index(csv_file):
+    """Read a CSV export once and index its SEO columns by post id.
+
+    Only the SEO_COLUMNS of each row are kept; Content is dropped as soon
+    as the row has been parsed.
+    """
+    index = {}
+    for row in iter_csv_posts(csv_file):
+        post_id = row.get('id')
+        if post_id:
+            index[post_id] = {column: row.get(column) or '' for column in SEO_COLUMNS}
+    return index
+
+
+def join_seo(records, index):
+    """Complete streamed XML records with the SEO columns of the CSV row of the same id.
+
+    Non-empty CSV values take precedence over the record's own. Matched
+    rows are removed from index, so what is left afterwards are the rows
+    no post in the XML export has.
+    """
+    for fields in records:
+        row = index.pop(fields.get('id'), None)
+        if row:
+            fields = dict(fields)
+            fields.update((column, value) for column, value in row.items() if value)
+        yield fields
+
+
+def slugify(text):
+    """
+    Convert text to URL-friendly slug
+    """
+    text = text.lower()
+    text = re.sub(r'[^a-z0-9]+', '-', text)
+    text = text.strip('-')
+    return text
+
+
+def permalink_slug(permalink):
+    """Return the last path segment of a WordPress permalink."""
+    path = urlsplit(permalink or '').path.rstrip('/')
+    return path.rsplit('/', 1)[-1]
+
+
+def post_fields(fields):
+    """Return the id, title, slug, date, featured image and SEO metadata of a record, with defaults.
+
+    A post without a slug gets the one of its permalink, or else one made
+    from its title. The SEO title and description are empty when SEOPress
+    has none; the templates then derive a description from the content.
+    """
+    post_id = fields.get('id') or 'unknown'
+    title = fields.get('Title') or 'Untitled'
+    permalink = fields.get('Permalink') or ''
+    return {
+        'id': post_id,
+        'title': title,
+        'slug': fields.get('Slug') or permalink_slug(permalink) or slugify(title) or f'post-{post_id}',
+        'date': fields.get('Date') or '2023-01-01',
+        'featured_image': fields.get('ImageFeatured') or '',
+        'seo_title': fields.get('_seopress_titles_title') or '',
+        'seo_description': fields.get('_seopress_titles_desc') or '',
+        'permalink': permalink
+    }
+
+
+def extract_post(fields, convert):
+    """Build the post data for create_mdx_file from a record of iter_posts."""
+    post = post_fields(fields)
+    post['content'] = convert(fields.get('Content') or '')
+    return post
@@ -0,0 +1,205 @@
+"""The blog's RSS and Atom feeds, and optionally a blog sitemap, written from the blog index entries.
+
+Every run writes them from the entries of the blog index, which hold the
+slug, date, title and description of every post, so posts a run skips as
+unchanged are still listed. The files are streamed entry by entry into
+OutputWriter.stage_stream: no document is built in memory, and a file is
+only replaced when its bytes change.
+
+The files go to the site's public/ directory, or a directory under it,
+and link to themselves where the site serves them. The feeds hold the
+newest FEED_ENTRIES posts.
+
+The site's src/app/sitemap.ts already lists the blog posts, so the blog
+sitemap is only written on request, for a site that does not. It lists
+posts oldest first, so new posts go to the end. Up to SITEMAP_LIMIT posts
+it is one urlset; beyond, the sitemap file is an index of shards of
+SITEMAP_LIMIT posts each, and a run that adds a post or changes the date
+of one rewrites only the shards whose posts changed.
+"""
+
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from operator import itemgetter
+from xml.sax.saxutils import escape
+
+
+SITE_URL = 'https://www.crexpressinc.com'
+BLOG_PATH = '/blog'
+
+SITEMAP_NAME = 'sitemap-blog.xml'
+RSS_NAME = 'feed.xml'
+ATOM_NAME = 'atom.xml'
+
+# The most URLs the sitemap protocol allows in one file
+SITEMAP_LIMIT = 50000
+
+FEED_ENTRIES = 20
+
+# The blog listing's title and description, as the site's blog page declares them
+FEED_TITLE = 'CR Express Blog - Logistics Insights & Industry News'
+FEED_DESCRIPTION = ('Expert insights on logistics, supply chain management, and transportation '
+                    'from CR Express. Stay informed about industry trends, shipping best '
+                    'practices, and warehousing solutions.')
+
+# Sitemap change frequency and priority of a post, as the site's sitemap.ts gives them
+CHANGE_FREQUENCY = 'monthly'
+PRIORITY = '0.6'
+
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def post_url(slug, site_url=SITE_URL):
+    """The address of a post on the site."""
+    return f'{site_url}{BLOG_PATH}/{slug}'
+
+
+def post_datetime(date):
+    """The UTC datetime of an entry's date: 2025-10-10, with or without a time; None if it is not one."""
+    match = re.match(r'(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}:\d{2}(?::\d{2})?))?', date or '')
+    if not match:
+        return None
+    text = match.group(1) + ' ' + (match.group(2) or '00:00')
+    try:
+        return datetime.fromisoformat(text).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def _lastmod(entry):
+    moment = post_datetime(entry['date'])
+    return moment.strftime('%Y-%m-%d') if moment else None
+
+
+def _oldest_first(entries):
+    """Sort a list of entries in place by date, then slug, without a key object per entry."""
+    entries.sort(key=itemgetter('slug'))
+    entries.sort(key=itemgetter('date'))
+
+
+def iter_urlset(entries, site_url=SITE_URL):
+    """Yield the bytes of a sitemap urlset of entries, one <url> at a time."""
+    yield f'{_XML_DECLARATION}<urlset xmlns="{_SITEMAP_NS}">\n'.encode('utf-8')
+    for entry in entries:
+        lastmod = _lastmod(entry)
+        yield (f'<url><loc>{escape(post_url(entry["slug"], site_url))}</loc>'
+               + (f'<lastmod>{lastmod}</lastmod>' if lastmod else '')
+               + f'<changefreq>{CHANGE_FREQUENCY}</changefreq><priority>{PRIORITY}</priority>'
+               + '</url>\n').encode('utf-8')
+    yield b'</urlset>\n'
+
+
+def _shard_name(number):
+    stem = os.path.splitext(SITEMAP_NAME)[0]
+    return f'{stem}-{number:04d}.xml'
+
+
+def stage_sitemap(writer, entries, site_url=SITE_URL, limit=SITEMAP_LIMIT, path=''):
+    """Stage the sitemap of entries, a list sorted oldest first, with writer; return {file name: status}.
+
+    path is where the site serves the sitemap files, such as /feeds.
+    """
+    if len(entries) <= limit:
+        return {SITEMAP_NAME: writer.stage_stream(SITEMAP_NAME, iter_urlset(entries, site_url))[1]}
+
+    statuses = {}
+    shards = []
+    for number, start in enumerate(range(0, len(entries), limit), 1):
+        shard = entries[start:start + limit]
+        name = _shard_name(number)
+        statuses[name] = writer.stage_stream(name, iter_urlset(shard, site_url))[1]
+        shards.append((name, max((_lastmod(entry) or '' for entry in shard), default='')))
+
+    def index():
+        yield f'{_XML_DECLARATION}<sitemapindex xmlns="{_SITEMAP_NS}">\n'.encode('utf-8')
+        for name, lastmod in shards:
+            yield (f'<sitemap><loc>{escape(site_url + path)}/{name}</loc>'
+                   + (f'<lastmod>{lastmod}</lastmod>' if lastmod else '')
+                   + '</sitemap>\n').encode('utf-8')
+        yield b'</sitemapindex>\n'
+
+    statuses[SITEMAP_NAME] = writer.stage_stream(SITEMAP_NAME, index())[1]
+    return statuses
+
+
+def newest(entries, count=FEED_ENTRIES):
+    """The count newest of entries sorted oldest first, newest first."""
+    return entries[:-count - 1:-1] if count else []
+
+
+def iter_rss(entries, site_url=SITE_URL, path=''):
+    """Yield the bytes of an RSS 2.0 feed of entries, newest first, served at path on the site."""
+    blog_url = site_url + BLOG_PATH
+    updated = post_datetime(entries[0]['date']) if entries else None
+    yield (f'{_XML_DECLARATION}<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">\n'
+           f'<channel>\n<title>{escape(FEED_TITLE)}</title>\n<link>{escape(blog_url)}</link>\n'
+           f'<description>{escape(FEED_DESCRIPTION)}</description>\n<language>en-us</language>\n'
+           f'<atom:link href="{escape(site_url + path)}/{RSS_NAME}" rel="self" '
+           f'type="application/rss+xml"/>\n'
+           + (f'<lastBuildDate>{format_datetime(updated)}</lastBuildDate>\n' if updated else '')
+           ).encode('utf-8')
+    for entry in entries:
+        url = escape(post_url(entry['slug'], site_url))
+        published = post_datetime(entry['date'])
+        yield (f'<item><title>{escape(entry["title"])}</title><link>{url}</link>'
+               f'<guid isPermaLink="true">{url}</guid>'
+               + (f'<pubDate>{format_datetime(published)}</pubDate>' if published else '')
+               + f'<description>{escape(entry["description"] or "")}</description></item>\n'
+               ).encode('utf-8')
+    yield b'</channel>\n</rss>\n'
+
+
+def _atom_time(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def iter_atom(entries, site_url=SITE_URL, path=''):
+    """Yield the bytes of an Atom feed of entries, newest first, served at path on the site."""
+    blog_url = site_url + BLOG_PATH
+    updated = post_datetime(entries[0]['date']) if entries else None
+    updated = updated or datetime(1970, 1, 1, tzinfo=timezone.utc)
+    yield (f'{_XML_DECLARATION}<feed xmlns="http://www.w3.org/2005/Atom">\n'
+           f'<id>{escape(blog_url)}</id>\n<title>{escape(FEED_TITLE)}</title>\n'
+           f'<subtitle>{escape(FEED_DESCRIPTION)}</subtitle>\n'
+           f'<link href="{escape(blog_url)}"/>\n'
+           f'<link href="{escape(site_url + path)}/{ATOM_NAME}" rel="self"/>\n'
+           f'<updated>{_atom_time(updated)}</updated>\n'
+           f'<author><name>CR Express</name></author>\n').encode('utf-8')
+    for entry in entries:
+        url = escape(post_url(entry['slug'], site_url))
+        published = post_datetime(entry['date']) or updated
+        yield (f'<entry><id>{url}</id><title>{escape(entry["title"])}</title>'
+               f'<link href="{url}"/><published>{_atom_time(published)}</published>'
+               f'<updated>{_atom_time(published)}</updated>'
+               f'<summary>{escape(entry["description"] or "")}</summary></entry>\n'
+               ).encode('utf-8')
+    yield b'</feed>\n'
+
+
+def stage_feeds(writer, entries, site_url=SITE_URL, sitemap_limit=SITEMAP_LIMIT, path='',
+                sitemap=False):
+    """Stage the RSS and Atom feeds of entries, and with sitemap their sitemap; return {file name: status}.
+
+    path is where the site serves the directory writer writes to: '' for
+    the root of public/, /feeds for public/feeds.
+    """
+    entries = list(entries)
+    _oldest_first(entries)
+    statuses = stage_sitemap(writer, entries, site_url, sitemap_limit, path) if sitemap else {}
+    latest = newest(entries)
+    statuses[RSS_NAME] = writer.stage_stream(RSS_NAME, iter_rss(latest, site_url, path))[1]
+    statuses[ATOM_NAME] = writer.stage_stream(ATOM_NAME, iter_atom(latest, site_url, path))[1]
+    return statuses
+
+
+def stale_feed_files(feeds_dir, files):
+    """Return the sitemap shards of an earlier run in feeds_dir that files no longer has."""
+    shard_re = re.compile(re.escape(os.path.splitext(SITEMAP_NAME)[0]) + r'-\d{4}\.xml')
+    try:
+        names = os.listdir(feeds_dir)
+    except OSError:
+        return []
+    return sorted(name for name in names if shard_re.fullmatch(name) and name not in files)
@@ -0,0 +1,233 @@
+"""Width and height of the images a post shows from public/, read from their headers.
+
+Without dimensions the browser only learns an image's size once it has
+loaded, and the page shifts around it. Images that resolve to a file under
+the site's public/ directory are probed for their size from the first
+bytes of the file: the PNG IHDR chunk, the GIF logical screen, the WebP
+VP8, VP8L or VP8X header, or the JPEG frame header found by seeking from
+marker to marker. Nothing is decoded. A post's images are probed
+concurrently in a thread pool, and sizes are remembered by path,
+modification time and file size, in memory and in the conversion cache,
+so later runs only read the images that changed.
+"""
+
+import os
+import re
+import stat
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+from .redirects import REPO_ROOT, site_path
+
+
+DEFAULT_PUBLIC_DIR = os.path.join(REPO_ROOT, 'public')
+
+# Threads reading image headers; the work is waiting on the disk
+PROBE_THREADS = 8
+
+# Classes of the figure the site's img component and hand-written posts put around an image
+FIGURE_CLASS = 'relative my-10 overflow-hidden rounded-4xl bg-neutral-100 max-sm:-mx-6 aspect-[16/10]'
+IMAGE_CLASS = 'absolute inset-0 h-full w-full object-cover'
+
+# Markdown images alone on their line; images inside a paragraph stay markdown
+_BLOCK_IMAGE_RE = re.compile(r'^!\[([^\]\n]*)\]\(([^()\s]+)\)[ \t]*$', re.MULTILINE)
+
+# JPEG start of frame markers; C4, C8 and CC are other segments
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# EXIF orientations that turn the image a quarter, so its width is displayed as height
+_TRANSPOSED = frozenset({5, 6, 7, 8})
+
+
+def _exif_orientation(data):
+    """Return the orientation tag of an APP1 Exif segment's data, or 1."""
+    tiff = data[6:]
+    if len(tiff) < 8 or tiff[:2] not in (b'II', b'MM'):
+        return 1
+    order = '<' if tiff[:2] == b'II' else '>'
+    offset = struct.unpack(order + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return 1
+    count = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+    for entry in range(offset + 2, min(offset + 2 + count * 12, len(tiff) - 11), 12):
+        tag, kind = struct.unpack(order + 'HH', tiff[entry:entry + 4])
+        if tag == 0x0112 and kind == 3:
+            return struct.unpack(order + 'H', tiff[entry + 8:entry + 10])[0]
+    return 1
+
+
+def _jpeg_size(f):
+    """Walk the JPEG segments after SOI to the frame header; f is positioned after SOI."""
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        # Markers without a segment
+        if code in (0x00, 0x01) or 0xD0 <= code <= 0xD8:
+            continue
+        if code in (0xD9, 0xDA):
+            return None
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack('>H', header)[0]
+        if length < 2:
+            return None
+        if code in _SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            if orientation in _TRANSPOSED:
+                width, height = height, width
+            return width, height
+        if code == 0xE1:
+            data = f.read(length - 2)
+            if data.startswith(b'Exif\x00\x00'):
+                orientation = _exif_orientation(data)
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path):
+    """Return (width, height) of a PNG, GIF, WebP or JPEG file from its header; None otherwise."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(30)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) == 30:
+                chunk = head[12:16]
+                if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+                    width, height = struct.unpack('<HH', head[26:30])
+                    return width & 0x3FFF, height & 0x3FFF
+                if chunk == b'VP8L' and head[20] == 0x2F:
+                    bits = struct.unpack('<I', head[21:25])[0]
+                    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                if chunk == b'VP8X':
+                    return (int.from_bytes(head[24:27], 'little') + 1,
+                            int.from_bytes(head[27:30], 'little') + 1)
+                return None
+            if head[:2] == b'\xff\xd8':
+                f.seek(2)
+                return _jpeg_size(f)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def public_file(src, public_dir):
+    """Return the file under public_dir that an image src is served from, or None.
+
+    Site-relative paths and links to this site map into public_dir;
+    anything else, and paths that would leave public_dir, do not.
+    """
+    if not src:
+        return None
+    location = site_path(src)
+    if location is None:
+        return None
+    root = os.path.abspath(public_dir)
+    path = os.path.normpath(os.path.join(root, unquote(location[0]).lstrip('/')))
+    if not path.startswith(root + os.sep):
+        return None
+    return path
+
+
+def block_images(markdown):
+    """Return the src of every markdown image that stands alone on its line."""
+    return [match.group(2) for match in _BLOCK_IMAGE_RE.finditer(markdown)]
+
+
+def _attribute(text):
+    return text.replace('&', '&amp;').replace('"', '&quot;')
+
+
+def figure_jsx(src, alt, size):
+    """The figure of an image with its width and height, as the site's img component renders it."""
+    width, height = size
+    return (f'<div className="{FIGURE_CLASS}"><img src="{_attribute(src)}" alt="{_attribute(alt)}" '
+            f'width={{{width}}} height={{{height}}} className="{IMAGE_CLASS}" /></div>')
+
+
+def size_images(markdown, sizes):
+    """Give every image of markdown alone on its line whose size is in sizes a sized figure."""
+    def replace(match):
+        size = sizes.get(match.group(2))
+        if size is None:
+            return match.group(0)
+        return figure_jsx(match.group(2), match.group(1), size)
+
+    return _BLOCK_IMAGE_RE.sub(replace, markdown)
+
+
+def _stat(path):
+    """Return the memo key of path: (path, mtime_ns, size), or None if it is not a file."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return path, st.st_mtime_ns, st.st_size
+
+
+# Sizes probed by this process, by memo key; None for files that are no image
+_sizes = {}
+_pool = None
+_pool_pid = None
+
+
+def _executor():
+    """This process's probe threads; a forked worker process starts its own."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ThreadPoolExecutor(max_workers=PROBE_THREADS, thread_name_prefix='image-probe')
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def probe_images(srcs, public_dir, cache=None):
+    """Return {src: (width, height)} for the srcs that are images in public_dir.
+
+    Files are stat'ed and, when neither this process nor cache, a
+    ConversionCache, knows their size, read concurrently. Sources outside
+    public_dir, missing files and unknown formats are left out.
+    """
+    paths = {}
+    for src in dict.fromkeys(srcs):
+        path = public_file(src, public_dir)
+        if path:
+            paths[src] = path
+    if not paths:
+        return {}
+
+    pool = _executor()
+    keys = dict(zip(paths, pool.map(_stat, paths.values())))
+    missing = []
+    for key in set(keys.values()):
+        if key is None or key in _sizes:
+            continue
+        size = cache.get_image_size(*key) if cache else None
+        if size:
+            _sizes[key] = size
+        else:
+            missing.append(key)
+    for key, size in zip(missing, pool.map(read_image_size, [key[0] for key in missing])):
+        _sizes[key] = size
+        if size and cache:
+            cache.put_image_size(*key, *size)
+
+    return {src: _sizes[key] for src, key in keys.items() if key and _sizes.get(key)}
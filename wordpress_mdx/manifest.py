@@ -0,0 +1,81 @@
+"""The manifest incremental runs use to skip unchanged posts."""
+
+import hashlib
+import json
+import os
+
+from .export import post_fields
+
+
+MANIFEST_NAME = 'conversion_manifest.json'
+
+
+def manifest_entry(fields, converter, asset_key=None):
+    """Describe everything a post's page.mdx is generated from."""
+    content = fields.get('Content') or ''
+    entry = post_fields(fields)
+    del entry['id']
+    entry['content_hash'] = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    entry['converter'] = converter
+    if asset_key:
+        entry['assets'] = asset_key(fields)
+    return entry
+
+
+def load_manifest(manifest_path):
+    """Load the manifest of a previous run: posts keyed by id and known orphans."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}, []
+    return manifest.get('posts', {}), manifest.get('orphans', [])
+
+
+def save_manifest(manifest_path, posts, orphans):
+    """Write the manifest, replacing the previous one only once it is complete."""
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'posts': posts, 'orphans': orphans}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def iter_changed_posts(records, previous, current, target_dir, converter, indexed=None,
+                       asset_key=None, skipped=None):
+    """Yield only the records whose page.mdx is missing or out of date.
+
+    The manifest entry of every record is stored in current, keyed by post
+    id. Unchanged posts are skipped before any conversion work is done.
+    indexed, when given, holds the ids found in every index the run
+    updates; an unchanged post missing from it is converted again to get
+    its index entries. asset_key, when given, describes the local copies
+    of a record's images, so a post is converted again once an image of it
+    has been copied. skipped, when given, is called with the id of each
+    record that is skipped.
+    """
+    for fields in records:
+        post_id = fields.get('id', 'unknown')
+        entry = manifest_entry(fields, converter, asset_key)
+        current[post_id] = entry
+        if previous.get(post_id) == entry and os.path.exists(
+                os.path.join(target_dir, entry['slug'], 'page.mdx')) \
+                and (indexed is None or post_id in indexed):
+            if skipped:
+                skipped(post_id)
+            continue
+        yield fields
+
+
+def find_orphans(previous, known_orphans, current, target_dir):
+    """Return slugs of earlier runs whose directories no post in the export writes anymore.
+
+    Orphans are kept in the manifest and reported on every run until the
+    directory is removed or a post claims the slug again.
+    """
+    slugs = {entry['slug'] for entry in current.values()}
+    candidates = set(known_orphans)
+    candidates.update(entry.get('slug') for entry in previous.values())
+    return sorted(
+        slug for slug in candidates
+        if slug and slug not in slugs and os.path.isdir(os.path.join(target_dir, slug))
+    )
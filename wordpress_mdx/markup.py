@@ -0,0 +1,260 @@
+"""HTML helpers shared by the regex and tokenizer engines."""
+
+import re
+from bisect import bisect_left
+
+
+_QUOTE_RE = re.compile(r'["\']')
+_CELL_SPAN_RE = re.compile(r'\b(colspan|rowspan)\s*=\s*["\']?(\d+)', re.IGNORECASE)
+
+IFRAME_SRC_RE = re.compile(r'src=["\']([^"\']+)["\']')
+
+TABLE_SECTIONS = ('thead', 'tbody', 'tfoot')
+
+# Stands in for one space of sub-list indentation until whitespace cleanup has
+# collapsed runs of spaces; XML text can never contain it.
+LIST_INDENT = '\x00'
+
+
+class TableGrid:
+    """Lays table cells out row by row, expanding colspan and rowspan.
+
+    Cell values are opaque, so both engines can share the layout rules: the
+    first <thead> row, or a leading row of only <th> cells, becomes the
+    header; spanned positions are filled with the fill value.
+    """
+
+    def __init__(self, fill):
+        self.fill = fill
+        self.section = None
+        self.header = None
+        self.rows = []
+        self.row = None
+        self.row_in_head = False
+        self.row_all_th = True
+        self.spans = {}
+
+    def start_row(self):
+        self.end_row()
+        self.row = []
+        self.row_in_head = self.section == 'thead'
+        self.row_all_th = True
+
+    def _fill_spanned(self, until=0):
+        """Fill positions covered by a rowspan from an earlier row."""
+        while self.spans:
+            col = len(self.row)
+            if col in self.spans:
+                self.spans[col] -= 1
+                if not self.spans[col]:
+                    del self.spans[col]
+            elif col >= until:
+                return
+            self.row.append(self.fill)
+
+    def add_cell(self, value, attrs='', header=False):
+        if self.row is None:
+            self.start_row()
+        if self.spans:
+            self._fill_spanned()
+        self.row.append(value)
+        self.row_all_th = self.row_all_th and header
+        if 'span' not in attrs.lower():
+            return
+        spans = {name.lower(): max(1, min(int(count), 1000)) for name, count in _CELL_SPAN_RE.findall(attrs)}
+        colspan = spans.get('colspan', 1)
+        rowspan = spans.get('rowspan', 1)
+        col = len(self.row) - 1
+        self.row.extend([self.fill] * (colspan - 1))
+        if rowspan > 1:
+            for spanned in range(col, col + colspan):
+                self.spans[spanned] = rowspan - 1
+
+    def end_row(self):
+        if self.row is None:
+            return
+        if self.spans:
+            self._fill_spanned(until=max(self.spans) + 1)
+        if self.row:
+            if self.header is None and not self.rows and (self.row_in_head or self.row_all_th):
+                self.header = self.row
+            else:
+                self.rows.append(self.row)
+        self.row = None
+
+    def layout(self):
+        """Finish the table; return (header, rows, width) with rows padded to width.
+
+        Returns None for a table without any cells.
+        """
+        self.end_row()
+        rows = self.rows if self.header is None else [self.header] + self.rows
+        if not rows:
+            return None
+        width = max(len(row) for row in rows)
+        rows = [row + [self.fill] * (width - len(row)) for row in rows]
+        if self.header is None:
+            return None, rows, width
+        return rows[0], rows[1:], width
+
+
+def attr_value(attrs, name, empty=False):
+    """Return the quoted value of the last name= in attrs, or None.
+
+    Finds what a greedy ``.*name=["']([^"']+)["']`` would, by searching
+    backwards for the name instead of backtracking over the attributes.
+    """
+    lowered = attrs.lower()
+    key = name + '='
+    end = len(attrs)
+    while True:
+        at = lowered.rfind(key, 0, end)
+        if at < 0:
+            return None
+        start = at + len(key)
+        if attrs[start:start + 1] in ('"', "'"):
+            close = _QUOTE_RE.search(attrs, start + 1)
+            if close and (empty or close.start() > start + 1):
+                return attrs[start + 1:close.start()]
+        end = start - 1
+
+
+def iframe_link(attrs, inner):
+    src = IFRAME_SRC_RE.search(attrs) or IFRAME_SRC_RE.search(inner)
+    if src:
+        url = src.group(1)
+        if 'youtube' in url or 'vimeo' in url:
+            return f'\n[Watch Video]({url})\n'
+        return f'\n[Embedded Content]({url})\n'
+    return ''
+
+
+def image_markdown(attrs):
+    """Return the markdown for an <img> with these attributes, or None without a src."""
+    src = attr_value(attrs, 'src')
+    if src is None:
+        return None
+    return f"![{attr_value(attrs, 'alt', empty=True) or ''}]({src})"
+
+
+def list_marker(tag, index):
+    return '- ' if tag == 'ul' else f'{index + 1}. '
+
+
+def remove_comments(content, opening_re):
+    """Remove comments like a non-greedy ``<!--...-->`` rule, in one forward scan.
+
+    opening_re matches the start of a comment, which ends at the first
+    '-->' after it. Once no '-->' follows an opening, none follows the
+    later ones either, so the scan stops instead of searching the rest of
+    the post again from each of them.
+    """
+    out = []
+    pos = 0
+    while True:
+        match = opening_re.search(content, pos)
+        if not match:
+            break
+        end = content.find('-->', match.end())
+        if end < 0:
+            break
+        out.append(content[pos:match.start()])
+        pos = end + 3
+    out.append(content[pos:])
+    return ''.join(out)
+
+
+def _line_breaks(content):
+    """Return crosses(start, end): whether content[start:end] holds a line break.
+
+    The breaks are found once, so checking every tag of a long line costs
+    a bisection rather than a search from where its element opened.
+    """
+    breaks = [match.start() for match in re.finditer('\n', content)]
+
+    def crosses(start, end):
+        at = bisect_left(breaks, start)
+        return at < len(breaks) and breaks[at] < end
+
+    return crosses
+
+
+def replace_elements(content, tag_re, opens, render, single_line=False):
+    """Replace elements in one forward scan, like a non-greedy ``<tag>(.*?)</tag>`` rule.
+
+    tag_re matches opening tags, capturing their attributes in group 1, and
+    closing tags, for which group 1 is None. opens(attrs) returns what
+    render(state, inner) needs, or None for an opening tag that is not
+    converted. An element ends at the first closing tag and one that is
+    never closed is left untouched. With single_line, an element may not
+    span lines, as without re.DOTALL.
+    """
+    out = []
+    pos = 0
+    state = None
+    start = inner = 0
+    crosses = _line_breaks(content) if single_line else None
+
+    for match in tag_re.finditer(content):
+        attrs = match.group(1)
+        if attrs is not None:
+            # An open element that cannot close on its line gives way to this one
+            if state is None or (crosses and crosses(inner, match.start())):
+                state = opens(attrs)
+                start, inner = match.start(), match.end()
+        elif state is not None:
+            if not (crosses and crosses(inner, match.start())):
+                out.append(content[pos:start])
+                out.append(render(state, content[inner:match.start()]))
+                pos = match.end()
+            state = None
+
+    out.append(content[pos:])
+    return ''.join(out)
+
+
+def wrap_elements(content, tag_re, markers, single_line=False):
+    """Convert several kinds of inline element to markdown markers in one scan.
+
+    tag_re matches opening tags with the tag name in group 1 and closing
+    tags with the name in group 2. Each kind is paired up on its own,
+    exactly as a separate non-greedy ``<tag>(.*?)</tag>`` rule would: an
+    element ends at its first closing tag, and nested tags of the same name
+    and elements never closed are left as they are. With single_line, an
+    element may not span lines, as without re.DOTALL. markers maps a
+    lowercase tag name to the markdown written in place of its opening and
+    its closing tag.
+    """
+    edits = []
+    opened = {}
+    crosses = _line_breaks(content) if single_line else None
+
+    for match in tag_re.finditer(content):
+        name = match[match.lastindex]
+        if name not in markers:
+            name = name.lower()
+        if match.lastindex == 1:
+            # An open element that cannot close on its line gives way to this one
+            if name not in opened or (
+                    crosses and crosses(opened[name][1], match.start())):
+                opened[name] = match.span()
+        elif name in opened:
+            start, end = opened.pop(name)
+            if not (crosses and crosses(end, match.start())):
+                open_marker, close_marker = markers[name]
+                edits.append((start, end, open_marker))
+                edits.append((match.start(), match.end(), close_marker))
+
+    if not edits:
+        return content
+
+    # Elements of different kinds overlap, so their edits are sorted first
+    edits.sort()
+    out = []
+    pos = 0
+    for start, end, marker in edits:
+        out.append(content[pos:start])
+        out.append(marker)
+        pos = end
+    out.append(content[pos:])
+    return ''.join(out)
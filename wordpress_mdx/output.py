@@ -0,0 +1,192 @@
+"""Writing page.mdx and index files: staged in a temporary tree, then published together.
+
+Nothing in the target directory changes until a run has converted every
+post, so an interrupted run leaves the previous output as it was. Files
+are then moved into place with atomic renames, and files whose bytes are
+already on disk are not rewritten at all. A writer given its own staging
+directory keeps it when interrupted, for a resumed run to publish.
+"""
+
+import os
+import shutil
+import tempfile
+
+
+def _fsync_path(path):
+    """Flush a file or directory to disk; directories cannot be opened on every OS."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _same_bytes(path, data):
+    """Whether the file at path exists and holds exactly data."""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+class OutputWriter:
+    """Stages <slug>/page.mdx and other files for target_dir and publishes them on publish().
+
+    Staged files live in a hidden directory next to target_dir, on the same
+    file system, so publishing is a rename per file. fsync_batch > 0 flushes
+    staged files to disk every fsync_batch files, and the published
+    directories once at the end; 0 leaves flushing to the OS. With dry_run
+    nothing is written and stage only reports what would change.
+
+    Use as a context manager: whatever was staged but not published is
+    discarded on exit. With staging_dir, the staging tree is that directory
+    instead of a temporary one, and it is kept when the block is left by an
+    exception, such as Ctrl-C; a writer given the same directory later can
+    adopt the files staged in it.
+    """
+
+    def __init__(self, target_dir, fsync_batch=0, dry_run=False, staging_dir=None):
+        self.target_dir = target_dir
+        self.fsync_batch = fsync_batch
+        self.dry_run = dry_run
+        self.staging_dir = staging_dir
+        self.keep = staging_dir is not None
+        self.staged = {}
+        self.unsynced = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None and self.keep:
+            return
+        self.discard()
+
+    def stage(self, slug, text):
+        """Stage the page of slug; return (final path, 'created', 'updated' or 'unchanged')."""
+        return self.stage_file(os.path.join(slug, 'page.mdx'), text)
+
+    def stage_file(self, relative, text):
+        """Stage any file at a path relative to target_dir, like stage; text may be bytes."""
+        final_path = os.path.join(self.target_dir, relative)
+        data = text if isinstance(text, bytes) else text.encode('utf-8')
+
+        if _same_bytes(final_path, data):
+            # A file staged earlier in this run for the same path is superseded
+            self.staged.pop(relative, None)
+            return final_path, 'unchanged'
+        status = 'updated' if os.path.exists(final_path) else 'created'
+        if self.dry_run:
+            return final_path, status
+
+        staged_path = self._staging_path(relative)
+        with open(staged_path, 'wb') as f:
+            f.write(data)
+        self._staged(relative, staged_path)
+        return final_path, status
+
+    def stage_stream(self, relative, chunks):
+        """Stage a file from an iterable of bytes, like stage_file, never holding all of it.
+
+        The chunks are compared with the file on disk as they are written,
+        so an unchanged file is neither kept in memory nor published.
+        """
+        final_path = os.path.join(self.target_dir, relative)
+        try:
+            existing = open(final_path, 'rb')
+        except OSError:
+            existing = None
+        staged_path = None if self.dry_run else self._staging_path(relative)
+        f = open(staged_path, 'wb') if staged_path else None
+        same = existing is not None
+        try:
+            for chunk in chunks:
+                if f:
+                    f.write(chunk)
+                if same and existing.read(len(chunk)) != chunk:
+                    same = False
+            same = same and not existing.read(1)
+        finally:
+            for opened in (f, existing):
+                if opened:
+                    opened.close()
+
+        if same:
+            if staged_path:
+                os.remove(staged_path)
+            self.staged.pop(relative, None)
+            return final_path, 'unchanged'
+        status = 'created' if existing is None else 'updated'
+        if staged_path:
+            self._staged(relative, staged_path)
+        return final_path, status
+
+    def adopt(self, relative):
+        """Publish a file an earlier writer staged in staging_dir; return whether it is there."""
+        staged_path = os.path.join(self.staging_dir, relative)
+        if not os.path.isfile(staged_path):
+            return False
+        self._staged(relative, staged_path)
+        return True
+
+    def _staging_path(self, relative):
+        """Where relative is staged; the staging tree is made on first use."""
+        if self.staging_dir is None:
+            parent = os.path.dirname(os.path.abspath(self.target_dir))
+            os.makedirs(parent, exist_ok=True)
+            name = os.path.basename(os.path.abspath(self.target_dir))
+            self.staging_dir = tempfile.mkdtemp(prefix=f'.{name}-staging-', dir=parent)
+        staged_path = os.path.join(self.staging_dir, relative)
+        os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+        return staged_path
+
+    def _staged(self, relative, staged_path):
+        self.staged[relative] = staged_path
+        if self.fsync_batch > 0:
+            self.unsynced.append(staged_path)
+            if len(self.unsynced) >= self.fsync_batch:
+                self.flush()
+
+    def flush(self):
+        """fsync the files staged since the last flush."""
+        for path in self.unsynced:
+            _fsync_path(path)
+        self.unsynced = []
+
+    def publish(self):
+        """Move every staged file into target_dir; return how many were published."""
+        if self.fsync_batch > 0:
+            self.flush()
+
+        directories = set()
+        for relative, staged_path in self.staged.items():
+            final_path = os.path.join(self.target_dir, relative)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(staged_path, final_path)
+            directories.add(os.path.dirname(final_path))
+
+        if self.fsync_batch > 0:
+            for directory in sorted(directories):
+                _fsync_path(directory)
+            _fsync_path(self.target_dir)
+
+        published = len(self.staged)
+        self.staged = {}
+        self.discard()
+        return published
+
+    def discard(self):
+        """Remove the staging tree and everything still in it."""
+        if self.staging_dir is not None:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self.staging_dir = None
+        self.staged = {}
+        self.unsynced = []
@@ -0,0 +1,378 @@
+"""Converting, writing and reporting posts, in one process or across a pool."""
+
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from .assets import asset_map, localize
+from .audit import find_html_tags
+from .blog_index import build_index_files, index_entry, stale_index_files
+from .cache import cache_key, open_cache
+from .engines import ENGINES, PARITY_ENGINES
+from .export import extract_post, iter_posts, post_fields
+from .images import block_images, probe_images, size_images
+from .profiling import profile_conversion
+from .redirects import load_redirects
+from .search_index import index_document
+from .templates import AUTHOR_IMAGE, DESCRIPTIONS, reading_stats, render_mdx
+
+
+def compare_engines(xml_file, names=PARITY_ENGINES):
+    """Convert every post with each named engine and report posts whose output differs."""
+    mismatches = []
+
+    for fields in iter_posts(xml_file):
+        post_id = fields.get('id', 'unknown')
+        content = fields.get('Content') or ''
+        outputs = {name: ENGINES[name](content) for name in names}
+        if len(set(outputs.values())) == 1:
+            print(f"✓ Engines agree: {post_id}")
+            continue
+        mismatches.append(post_id)
+        print(f"✗ Engines differ: {post_id}")
+        reference = outputs[names[0]]
+        for name, output in outputs.items():
+            if output == reference:
+                continue
+            offset = next(
+                (i for i, (a, b) in enumerate(zip(reference, output)) if a != b),
+                min(len(reference), len(output))
+            )
+            print(f"    {name} diverges at offset {offset}: "
+                  f"{reference[offset:offset + 40]!r} != {output[offset:offset + 40]!r}")
+
+    print(f"\n{len(mismatches)} post(s) with differing output")
+    return mismatches
+
+
+@contextmanager
+def time_budget(seconds):
+    """Raise TimeoutError inside the block once seconds have passed.
+
+    Uses SIGALRM, which also interrupts a long regex match. Where that is
+    unavailable (Windows, or outside the main thread) the block runs
+    without a budget.
+    """
+    if not seconds or not hasattr(signal, 'setitimer') \
+            or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise TimeoutError(f"exceeded the {seconds:g}s time budget")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def convert_post(fields, engine, template='blog-layout', profile=False, timeout=0, cache=None,
+                 redirects=None, public_dir=None, assets=None, refresh=False):
+    """Convert, check and render one post.
+
+    Runs in worker processes with --jobs, so it only returns data: the
+    page text is in result['mdx'] for the parent process to write, and all
+    reporting happens in report_post. A post whose conversion takes longer
+    than timeout seconds is quarantined and the result says so.
+
+    cache is the path of a conversion cache file. When it holds the
+    post's Content converted with the same engine and rules, the
+    engine is not run at all. With refresh the cache is only filled, so
+    every post is converted again.
+
+    redirects is a tuple of redirect files; the links of the converted
+    markdown are pointed at the final destination of their redirects.
+
+    public_dir is the site's public/ directory. The featured image, the
+    author's avatar and the images alone on their line that are served
+    from it are written with their width and height.
+
+    assets is the path of an asset map; the featured image and the images
+    of the markdown that have a local copy are pointed at it.
+
+    The result also says how many bytes of Content went in, how many bytes
+    of page came out and how many seconds the post took, for the event log.
+    """
+    started = time.perf_counter()
+    result = {
+        'id': fields.get('id', 'unknown'),
+        'title': None,
+        'slug': None,
+        'date': None,
+        'mdx': None,
+        'mdx_file': None,
+        'write': None,
+        'index': None,
+        'search': None,
+        'links_rewritten': 0,
+        'assets_localized': 0,
+        'images_sized': 0,
+        'html_tags': [],
+        'error': None,
+        'quarantined': False,
+        'cached': False,
+        'profile': None,
+        'bytes_in': len((fields.get('Content') or '').encode('utf-8')),
+        'bytes_out': 0,
+        'seconds': 0.0
+    }
+
+    convert = ENGINES[engine]
+    if profile:
+        def convert(html_content, engine_convert=convert):
+            markdown, result['profile'] = profile_conversion(engine_convert, html_content)
+            return markdown
+
+    # Profiling measures the conversion rules, so it never reads the cache
+    conversion_cache = open_cache(cache) if cache and not profile else None
+    if conversion_cache:
+        key = cache_key(fields.get('Content') or '', engine, template)
+        cached = None if refresh else conversion_cache.get(key)
+        if cached:
+            post = post_fields(fields)
+            post['content'], post['description'] = cached
+            result['cached'] = True
+
+    try:
+        if not result['cached']:
+            with time_budget(timeout):
+                post = extract_post(fields, convert)
+                post['description'] = DESCRIPTIONS[template](post['content'])
+            if conversion_cache:
+                conversion_cache.put(key, engine, template, post['content'], post['description'])
+    except TimeoutError as e:
+        post = post_fields(fields)
+        result['title'] = post['title']
+        result['slug'] = post['slug']
+        result['error'] = f"Quarantined post {result['id']}: conversion {e}"
+        result['quarantined'] = True
+        result['seconds'] = time.perf_counter() - started
+        return result
+    except Exception as e:
+        result['error'] = f"Error processing post {result['id']}: {str(e)}"
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    result['title'] = post['title']
+    result['slug'] = post['slug']
+    result['date'] = post['date']
+
+    # Images first, before the redirects of the old site could claim their URLs
+    if assets:
+        local = asset_map(assets)
+        post['content'], result['assets_localized'] = localize(post['content'], local)
+        if post['featured_image'] in local:
+            post['featured_image'] = local[post['featured_image']]
+            result['assets_localized'] += 1
+
+    # Cached markdown keeps the old links, so a change to the redirects
+    # never invalidates the cache
+    if redirects:
+        post['content'], result['links_rewritten'] = load_redirects(redirects).rewrite(post['content'])
+
+    # Check the markdown for leftover tags before it is written, rather than
+    # reading the file back; the template around it contains none
+    result['html_tags'] = find_html_tags(post['content'])
+
+    try:
+        # Counted once for the index and the page, before figures add markup
+        post['word_count'], post['reading_time'] = reading_stats(post)
+        result['index'] = index_entry(post, template)
+        result['search'] = index_document(post['title'], post['content'])
+        # The figures of sized images are markup, so the indexes read the markdown before them
+        if public_dir:
+            inline = block_images(post['content'])
+            sizes = probe_images([post['featured_image'], AUTHOR_IMAGE] + inline, public_dir,
+                                 open_cache(cache) if cache else None)
+            post['image_sizes'] = sizes
+            post['content'] = size_images(post['content'], sizes)
+            result['images_sized'] = sum(1 for src in dict.fromkeys(inline) if src in sizes)
+        result['mdx'] = render_mdx(post, template)
+        result['bytes_out'] = len(result['mdx'].encode('utf-8'))
+    except Exception as e:
+        result['error'] = f"Error creating MDX for {post['slug']}: {str(e)}"
+
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def convert_chunk(chunk, engine, template, profile=False, timeout=0, cache=None, redirects=None,
+                  public_dir=None, assets=None, refresh=False):
+    """Convert a list of posts; the unit of work sent to a worker process."""
+    return [convert_post(fields, engine, template, profile, timeout, cache, redirects, public_dir,
+                         assets, refresh)
+            for fields in chunk]
+
+
+def iter_chunks(records, size):
+    """Group records into lists of at most size items."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_results(records, engine, template='blog-layout', jobs=1, chunk_size=8, profile=False,
+                 timeout=0, cache=None, redirects=None, public_dir=None, assets=None,
+                 refresh=False):
+    """Yield convert_post results in export order, optionally across processes.
+
+    Posts are sent to the pool in chunks to keep IPC overhead per post low,
+    and at most two chunks per worker are in flight so the streamed export
+    is never read far ahead of what has been written.
+    """
+    if jobs <= 1:
+        for fields in records:
+            yield convert_post(fields, engine, template, profile, timeout, cache, redirects,
+                               public_dir, assets, refresh)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for chunk in iter_chunks(records, chunk_size):
+            pending.append(pool.submit(convert_chunk, chunk, engine, template, profile, timeout,
+                                       cache, redirects, public_dir, assets, refresh))
+            if len(pending) >= jobs * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_result(result, writer):
+    """Hand the rendered page of a converted post to an OutputWriter."""
+    if result['mdx'] is None:
+        return
+    try:
+        result['mdx_file'], result['write'] = writer.stage(result['slug'], result['mdx'])
+    except OSError as e:
+        result['error'] = f"Error creating MDX for {result['slug']}: {str(e)}"
+    result['mdx'] = None
+
+
+def stage_blog_index(writer, keep, index, related=None, index_name=None, shard_size=0,
+                     summary=None):
+    """Stage the blog index of the posts whose id is in keep; return its files.
+
+    index maps post ids to their entries; entries of posts not in keep are
+    dropped. With related, a RelatedPosts, the neighbours of changed posts
+    are scored first and every entry lists the slugs of its neighbours;
+    the related posts state is left to the caller. The posts indexed and
+    the lists scored are recorded in summary.
+    """
+    summary = {} if summary is None else summary
+    entries = [entry for post_id, entry in index.items() if post_id in keep]
+    summary['indexed'] = len(entries)
+    if related is not None:
+        related.prune(keep)
+        summary['related_scored'] = related.compute()
+        slugs = {entry['id']: entry['slug'] for entry in entries}
+        for entry in entries:
+            entry['related'] = related.slugs(entry['id'], slugs)
+    index_files = build_index_files(entries, index_name, shard_size)
+    for relative, text in index_files.items():
+        writer.stage_file(relative, text)
+    return index_files
+
+
+def stage_search_index(writer, keep, search, summary=None):
+    """Stage the changed files of a SearchIndexBuilder, without the documents not in keep."""
+    summary = {} if summary is None else summary
+    search.prune(keep)
+    summary['searchable'] = len(search.docs)
+    for name, data in search.files().items():
+        writer.stage_file(name, data)
+
+
+def remove_stale_indexes(target_dir, index_files=None, index_name=None, search=None):
+    """Remove the blog index shards and search chunks that published indexes left behind."""
+    if index_files is not None:
+        for name in stale_index_files(target_dir, index_files, index_name):
+            os.remove(os.path.join(target_dir, name))
+    if search is not None:
+        for name in search.stale_files():
+            os.remove(os.path.join(search.index_dir, name))
+
+
+# Log verbs for what OutputWriter.stage did, or would do in a dry run
+WRITE_VERBS = {
+    'created': ('Created', 'Would create'),
+    'updated': ('Updated', 'Would update'),
+    'unchanged': ('Unchanged', 'Unchanged'),
+}
+
+
+def report_post(result, summary):
+    """Print the log lines for one post and record it in the run summary."""
+    if result['profile'] is not None:
+        summary['profiles'].append(dict(result['profile'], id=result['id'], slug=result['slug']))
+
+    if result['title'] is None:
+        summary['errors'].append({'id': result['id'], 'title': None, 'error': result['error']})
+        print(f"✗ {result['error']}")
+        return
+
+    if result['quarantined']:
+        summary['quarantined'].append({
+            'id': result['id'],
+            'title': result['title'],
+            'slug': result['slug'],
+            'reason': result['error']
+        })
+        print(f"⚠ {result['error']}")
+        return
+
+    summary['processed'] += 1
+    if result['cached']:
+        summary['cache_hits'] += 1
+    if result.get('resumed'):
+        summary['resumed'] += 1
+        print(f"✓ Resumed post: {result['title']} (ID: {result['id']})")
+    else:
+        print(f"✓ Extracted post: {result['title']} (ID: {result['id']})")
+    if result['links_rewritten']:
+        summary['links_rewritten'] += result['links_rewritten']
+        print(f"✓ Pointed {result['links_rewritten']} link(s) past their redirects")
+    if result['assets_localized']:
+        summary['assets_localized'] += result['assets_localized']
+        print(f"✓ Pointed {result['assets_localized']} image(s) at their local copies")
+    if result['images_sized']:
+        summary['images_sized'] += result['images_sized']
+        print(f"✓ Sized {result['images_sized']} image(s) from public/")
+
+    if result['error']:
+        summary['errors'].append({'id': result['id'], 'title': result['title'], 'error': result['error']})
+        print(f"✗ {result['error']}")
+        return
+
+    mdx_file = result['mdx_file']
+    summary['writes'][result['write']] += 1
+    summary['created_posts'].append({
+        'id': result['id'],
+        'title': result['title'],
+        'slug': result['slug'],
+        'date': result['date'],
+        'path': mdx_file
+    })
+    if result['html_tags']:
+        summary['html_check_errors'].append({
+            'file': mdx_file,
+            'tags': result['html_tags']
+        })
+        print(f"⚠ WARNING: HTML tags found in {mdx_file}")
+        for tag in result['html_tags'][:5]:  # Show first 5
+            print(f"    {tag}")
+    else:
+        verb = WRITE_VERBS[result['write']][summary['dry_run']]
+        print(f"✓ {verb} clean MDX: {result['slug']}/page.mdx")
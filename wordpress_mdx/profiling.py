@@ -0,0 +1,98 @@
+"""Per-rule profiling of the conversion engines.
+
+Engines route every rule through sub_rule/step_rule; when a conversion runs
+under profile_conversion, each application is timed and counted.
+"""
+
+import re
+import time
+
+
+# Per-rule statistics of the post being converted; None unless profiling
+_rule_profile = None
+
+
+def record_rule(rule, seconds, matches, before, after):
+    """Add one rule application to the active profile."""
+    stats = _rule_profile.setdefault(
+        rule, {'seconds': 0.0, 'matches': 0, 'bytes_in': 0, 'bytes_out': 0}
+    )
+    stats['seconds'] += seconds
+    stats['matches'] += matches
+    stats['bytes_in'] += len(before.encode('utf-8'))
+    stats['bytes_out'] += len(after.encode('utf-8'))
+
+
+def sub_rule(rule, pattern, repl, content, flags=0):
+    """re.sub that records time, matches and bytes per rule when profiling.
+
+    pattern may be compiled already, in which case flags is ignored.
+    """
+    if isinstance(pattern, str):
+        pattern = re.compile(pattern, flags)
+    if _rule_profile is None:
+        return pattern.sub(repl, content)
+    start = time.perf_counter()
+    result, matches = pattern.subn(repl, content)
+    record_rule(rule, time.perf_counter() - start, matches, content, result)
+    return result
+
+
+def step_rule(rule, func, content):
+    """Apply a non-regex rule, recording it like sub_rule when profiling."""
+    if _rule_profile is None:
+        return func(content)
+    start = time.perf_counter()
+    result = func(content)
+    record_rule(rule, time.perf_counter() - start, int(result != content), content, result)
+    return result
+
+
+def enabled():
+    """Whether the conversion running in this process is being profiled."""
+    return _rule_profile is not None
+
+
+def profile_conversion(convert, html_content):
+    """Run one conversion with rule profiling on; return (markdown, profile)."""
+    global _rule_profile
+    _rule_profile = {}
+    started = time.perf_counter()
+    try:
+        markdown = convert(html_content)
+    finally:
+        rules, _rule_profile = _rule_profile, None
+    return markdown, {
+        'seconds': time.perf_counter() - started,
+        'bytes_in': len((html_content or '').encode('utf-8')),
+        'bytes_out': len(markdown.encode('utf-8')),
+        'rules': rules
+    }
+
+
+def build_profile_report(engine, profiles):
+    """Combine per-post profiles into a report with totals per rule."""
+    rules = {}
+    for post in profiles:
+        for rule, stats in post['rules'].items():
+            total = rules.setdefault(
+                rule, {'seconds': 0.0, 'matches': 0, 'bytes_in': 0, 'bytes_out': 0}
+            )
+            for key, value in stats.items():
+                total[key] += value
+    return {
+        'engine': engine,
+        'posts': sorted(profiles, key=lambda post: post['seconds'], reverse=True),
+        'rules': dict(sorted(rules.items(), key=lambda item: item[1]['seconds'], reverse=True))
+    }
+
+
+def print_profile_summary(report, limit=5):
+    """Print the slowest posts and rules of a profile report."""
+    print("\nSlowest posts:")
+    for post in report['posts'][:limit]:
+        print(f"  - {post['slug'] or post['id']}: {post['seconds'] * 1000:.1f} ms "
+              f"({post['bytes_in']} → {post['bytes_out']} bytes)")
+    print("\nSlowest rules:")
+    for rule, stats in list(report['rules'].items())[:limit]:
+        print(f"  - {rule}: {stats['seconds'] * 1000:.1f} ms, {stats['matches']} matches")
@@ -0,0 +1,249 @@
+"""Pointing the links of converted posts at the final destination of the site's redirects.
+
+Posts link to pages of the old site that now redirect, sometimes more than
+once. The redirect rules are read from the files the site configures them
+in and kept in a trie of path segments, each rule resolved to the URL its
+chain of redirects ends at. One scan of a post finds every link target;
+each is then looked up in the trie, so rewriting costs the same with
+thousands of rules as with ten.
+"""
+
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+
+# Hosts whose links are links to this site
+SITE_HOSTS = frozenset({'crexpressinc.com', 'www.crexpressinc.com'})
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The redirects of the migration, the blog and the new site, in the order
+# rules override each other
+DEFAULT_REDIRECTS = (
+    os.path.join(REPO_ROOT, 'Rules', '301_Redirect_Configuration.md'),
+    os.path.join(REPO_ROOT, 'blog-redirects.json'),
+    os.path.join(REPO_ROOT, 'next.config.mjs'),
+)
+
+# Longest chain of redirects followed before giving up on a link
+MAX_HOPS = 10
+
+# Apache Redirect lines; commented lines do not match
+_APACHE_RE = re.compile(r'^[ \t]*Redirect(?:Permanent|[ \t]+(?:301|permanent))[ \t]+(\S+)[ \t]+(\S+)',
+                        re.MULTILINE)
+
+# source/destination pairs of a Next.js redirects() list
+_NEXT_RE = re.compile(r'''source:\s*(['"])(.*?)\1\s*,\s*destination:\s*(['"])(.*?)\3''')
+
+# Markdown link and image targets, up to the closing parenthesis or a title
+_LINK_TARGET_RE = re.compile(r'\]\(([^()\s]+)')
+
+# Key of the rule of a trie node; path segments are never None
+_RULE = None
+
+
+def parse_redirects(path):
+    """Return the (source, destination, prefix) rules of a redirect file.
+
+    .json files are lists of {source, destination} objects; .js, .mjs and
+    .ts files are read for the source/destination pairs of a Next.js
+    config; anything else for Apache Redirect lines, such as the code
+    blocks of a markdown document. Apache rules also match the paths below
+    their source, so prefix is True for them. Next.js sources with
+    parameters or wildcards are skipped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        pairs = [(rule['source'], rule['destination']) for rule in json.loads(text)]
+    elif extension in ('.js', '.mjs', '.ts'):
+        pairs = [(match.group(2), match.group(4)) for match in _NEXT_RE.finditer(text)]
+    else:
+        return [(source, destination, True) for source, destination in _APACHE_RE.findall(text)]
+    return [(source, destination, False) for source, destination in pairs
+            if not any(char in source for char in ':*()')]
+
+
+def site_path(url):
+    """Split a link to this site into (path, query and fragment); None for any other link."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('', 'http', 'https') or (parts.netloc and parts.netloc.lower() not in SITE_HOSTS):
+        return None
+    if not parts.path.startswith('/') or (parts.scheme and not parts.netloc):
+        return None
+    suffix = ('?' + parts.query if parts.query else '') + ('#' + parts.fragment if parts.fragment else '')
+    return parts.path, suffix
+
+
+def _segments(path):
+    return [segment for segment in path.split('/') if segment]
+
+
+class RedirectMap:
+    """Redirect rules in a trie of path segments.
+
+    A trailing slash does not matter to a rule. Rules added later replace
+    earlier rules for the same source.
+    """
+
+    def __init__(self, rules=()):
+        self.root = {}
+        self.rules = {}
+        self.resolved = {}
+        for source, destination, prefix in rules:
+            self.add(source, destination, prefix)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, source, destination, prefix=False):
+        """Redirect source to destination; with prefix, also every path below source."""
+        node = self.root
+        for segment in _segments(source):
+            node = node.setdefault(segment, {})
+        node[_RULE] = (destination, prefix)
+        self.rules['/' + '/'.join(_segments(source))] = (destination, prefix)
+        self.resolved = {}
+
+    def remove(self, source):
+        """Drop the rule for source, if there is one."""
+        node = self.root
+        for segment in _segments(source):
+            node = node.get(segment)
+            if node is None:
+                return
+        node.pop(_RULE, None)
+        self.rules.pop('/' + '/'.join(_segments(source)), None)
+        self.resolved = {}
+
+    def lookup(self, path):
+        """Return where one redirect sends path, or None when no rule matches it."""
+        node = self.root
+        match = None
+        segments = _segments(path)
+        for depth, segment in enumerate(segments):
+            rule = node.get(_RULE)
+            if rule and rule[1]:
+                match = rule, depth
+            node = node.get(segment)
+            if node is None:
+                break
+        else:
+            if _RULE in node:
+                match = node[_RULE], len(segments)
+        if match is None:
+            return None
+        (destination, _), depth = match
+        rest = segments[depth:]
+        if rest:
+            destination = destination.rstrip('/') + '/' + '/'.join(rest)
+        return destination
+
+    def resolve(self, path):
+        """Follow the redirects of path to the URL they end at; None if no rule matches.
+
+        A chain that loops or runs longer than MAX_HOPS resolves to None,
+        so such links are left alone.
+        """
+        if path in self.resolved:
+            return self.resolved[path]
+        seen = {'/'.join(_segments(path))}
+        target = None
+        current = path
+        for _ in range(MAX_HOPS):
+            destination = self.lookup(current)
+            if destination is None:
+                break
+            target = destination
+            location = site_path(destination)
+            if location is None:
+                break
+            current = location[0]
+            key = '/'.join(_segments(current))
+            if key in seen:
+                target = None
+                break
+            seen.add(key)
+        else:
+            target = None
+        self.resolved[path] = target
+        return target
+
+    def rewrite_url(self, url):
+        """Return the final destination of a link, or the link itself if it does not redirect.
+
+        Links that end on this site become site-relative, without the
+        trailing slash the site would redirect away from.
+        """
+        location = site_path(url)
+        if location is None:
+            return url
+        path, suffix = location
+        target = self.resolve(path)
+        if target is None:
+            return url
+        final = site_path(target)
+        if final is None:
+            return target + ('' if '?' in target or '#' in target else suffix)
+        final_path = final[0].rstrip('/') or '/'
+        return final_path + (final[1] or suffix)
+
+    def rewrite(self, markdown):
+        """Point every markdown link of a post at its final destination; return (markdown, links rewritten)."""
+        rewritten = 0
+
+        def replace(match):
+            nonlocal rewritten
+            url = match.group(1)
+            new_url = self.rewrite_url(url)
+            if new_url == url:
+                return match.group(0)
+            rewritten += 1
+            return '](' + new_url
+
+        return _LINK_TARGET_RE.sub(replace, markdown), rewritten
+
+    def digest(self):
+        """A hash of the rules, which changes whenever a rewritten link could."""
+        data = json.dumps(sorted(self.rules.items()), separators=(',', ':'))
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()[:12]
+
+
+def _same_destination(first, second):
+    """Whether two destinations are the same URL, however each spells this site's links."""
+    first_location, second_location = site_path(first), site_path(second)
+    if first_location is None or second_location is None:
+        return first == second
+    return (_segments(first_location[0]) == _segments(second_location[0])
+            and first_location[1] == second_location[1])
+
+
+@lru_cache(maxsize=None)
+def load_redirects(paths):
+    """Read the redirect files of paths, a tuple, into one RedirectMap; once per process.
+
+    Each file overrides the files before it. A page that a later file
+    redirects to is served, so the rules of earlier files that redirect
+    away from it are dropped; otherwise the old site's rules and the new
+    site's would send such a page back and forth. A later rule that only
+    repeats an earlier one, to the same destination, keeps the paths below
+    its source that the earlier rule redirects.
+    """
+    redirects = RedirectMap()
+    for path in paths:
+        rules = parse_redirects(path)
+        for _, destination, _ in rules:
+            location = site_path(destination)
+            if location:
+                redirects.remove(location[0])
+        for source, destination, prefix in rules:
+            earlier = redirects.rules.get('/' + '/'.join(_segments(source)))
+            if earlier and _same_destination(earlier[0], destination):
+                prefix = prefix or earlier[1]
+            redirects.add(source, destination, prefix)
+    return redirects
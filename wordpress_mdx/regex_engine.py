@@ -0,0 +1,368 @@
+"""The regex engine: converts HTML to markdown with a cascade of rules."""
+
+import re
+from html import unescape
+
+from .markup import (LIST_INDENT, TABLE_SECTIONS, TableGrid, attr_value, iframe_link,
+                     image_markdown, list_marker, remove_comments, replace_elements,
+                     wrap_elements)
+from .profiling import step_rule, sub_rule
+
+
+_LINK_TAG_RE = re.compile(r'<a(\s[^<>]*)>|</a>', re.IGNORECASE)
+_IMG_TAG_RE = re.compile(r'<img(\s[^<>]*)>', re.IGNORECASE)
+_LIST_TAG_RE = re.compile(r'<(/?)(ul|ol|li)\b([^>]*)>', re.IGNORECASE)
+_TABLE_TAG_RE = re.compile(r'<(/?)(table|thead|tbody|tfoot|tr|th|td)\b([^>]*)>', re.IGNORECASE)
+_WP_COMMENT_RE = re.compile(r'<!--\s*wp:')
+_WP_CLOSING_COMMENT_RE = re.compile(r'<!--\s*/wp:')
+_CELL_BREAK_RE = re.compile(r'<p\b[^>]*>|</p>|<br\s*/?>|\n', re.IGNORECASE)
+
+
+def _format_cell(html):
+    """Keep a cell on one table line: block breaks become spaces, pipes are escaped."""
+    if '<' in html or '\n' in html:
+        html = _CELL_BREAK_RE.sub(' ', html)
+    if '|' in html:
+        html = html.replace('|', '\\|')
+    return html.strip()
+
+
+def _format_table(grid):
+    layout = grid.layout()
+    if layout is None:
+        return ''
+    header, rows, width = layout
+    lines = []
+    if header is not None:
+        lines.append('| ' + ' | '.join(header) + ' |')
+        lines.append('| ' + ' | '.join(['---'] * width) + ' |')
+    lines.extend('| ' + ' | '.join(row) + ' |' for row in rows)
+    return '\n' + '\n'.join(lines) + '\n'
+
+
+def convert_tables(content):
+    """Convert every HTML table to markdown in a single forward scan.
+
+    Each table tag is visited once, so the cost grows linearly with the
+    size of the tables. Nested tables stay raw inside the enclosing cell and
+    an unclosed table is left untouched.
+    """
+    out = []
+    pos = 0
+    depth = 0
+    table_start = None
+    grid = None
+    cell_start = None
+    cell_attrs = ''
+    cell_header = False
+
+    for match in _TABLE_TAG_RE.finditer(content):
+        closing = match.group(1)
+        tag = match.group(2).lower()
+
+        if tag == 'table':
+            if not closing:
+                if not depth:
+                    out.append(content[pos:match.start()])
+                    table_start = match.start()
+                    grid = TableGrid('')
+                    cell_start = None
+                depth += 1
+                continue
+            if not depth:
+                continue
+            depth -= 1
+            if depth:
+                continue
+        elif depth != 1:
+            continue
+
+        if cell_start is not None:
+            grid.add_cell(_format_cell(content[cell_start:match.start()]), cell_attrs, cell_header)
+            cell_start = None
+
+        if tag == 'table':
+            out.append(_format_table(grid))
+            pos = match.end()
+        elif tag in TABLE_SECTIONS:
+            grid.end_row()
+            grid.section = None if closing else tag
+        elif tag == 'tr':
+            if closing:
+                grid.end_row()
+            else:
+                grid.start_row()
+        elif not closing:
+            cell_start = match.end()
+            cell_attrs = match.group(3)
+            cell_header = tag == 'th'
+
+    out.append(content[table_start:] if depth else content[pos:])
+    return ''.join(out)
+
+
+def convert_links(content):
+    """Convert <a href> links to markdown."""
+    return replace_elements(
+        content, _LINK_TAG_RE,
+        lambda attrs: attr_value(attrs, 'href'),
+        lambda href, text: f'[{text}]({href})'
+    )
+
+
+def _element_rule(name, render):
+    """Compile a ``<name[^>]*>(.*?)</name>`` rule applied with replace_elements.
+
+    render(attrs, inner) returns the replacement. Like the pattern, name
+    also matches longer tag names it is a prefix of.
+    """
+    tag_re = re.compile(rf'<{name}([^<>]*)>|</{name}>', re.IGNORECASE)
+    return lambda content: replace_elements(content, tag_re, lambda attrs: attrs, render)
+
+
+def convert_images(content):
+    """Convert <img> tags with a src to markdown images."""
+    return _IMG_TAG_RE.sub(lambda m: image_markdown(m.group(1)) or m.group(0), content)
+
+
+def _strip_parts(parts):
+    """Strip whitespace from the ends of text split into parts, without joining it."""
+    start, end = 0, len(parts)
+    while start < end and (not parts[start] or parts[start].isspace()):
+        start += 1
+    while end > start and (not parts[end - 1] or parts[end - 1].isspace()):
+        end -= 1
+    parts = parts[start:end]
+    if parts:
+        parts[0] = parts[0].lstrip()
+        parts[-1] = parts[-1].rstrip()
+    return parts
+
+
+class _ListLevel:
+    """An open <ul>/<ol> while convert_lists scans.
+
+    Items are kept as lists of text parts, so a sub-list's output is not
+    copied again at every enclosing level.
+    """
+
+    def __init__(self, tag, start, indent):
+        self.tag = tag
+        self.start = start
+        self.indent = indent
+        self.items = []
+        self.item = None
+
+    def start_item(self):
+        self.end_item()
+        self.item = []
+
+    def end_item(self):
+        if self.item is not None:
+            self.items.append(_strip_parts(self.item))
+            self.item = None
+
+    def nest(self):
+        """Return the indent of a sub-list opened in the current item.
+
+        A sub-list outside any <li> continues the previous item.
+        """
+        if self.item is None:
+            self.item = self.items.pop() if self.items else []
+        return self.indent + LIST_INDENT * len(list_marker(self.tag, len(self.items)))
+
+    def render(self):
+        """Return the list's markdown as text parts."""
+        self.end_item()
+        parts = ['\n']
+        for i, item in enumerate(self.items):
+            if i:
+                parts.append('\n')
+            parts.append(self.indent + list_marker(self.tag, i))
+            parts.extend(item)
+        parts.append('\n')
+        return parts
+
+
+def convert_lists(content):
+    """Convert ul/ol lists to markdown in a single forward scan.
+
+    Open lists are kept on a stack, so nested lists become indented
+    sub-lists and the cost stays linear in the nesting depth. A new <li>
+    ends the previous item, text outside items is dropped and an unclosed
+    list is left untouched.
+    """
+    out = []
+    pos = 0
+    levels = []
+
+    for match in _LIST_TAG_RE.finditer(content):
+        closing = match.group(1)
+        tag = match.group(2).lower()
+        if not levels:
+            if closing or tag == 'li':
+                continue
+            out.append(content[pos:match.start()])
+        elif levels[-1].item is not None:
+            levels[-1].item.append(content[pos:match.start()])
+        pos = match.end()
+
+        if closing:
+            if match.group(3):
+                continue
+            if tag == 'li':
+                depth = next((d for d in range(len(levels) - 1, -1, -1)
+                              if levels[d].item is not None), None)
+            else:
+                depth = next((d for d in range(len(levels) - 1, -1, -1)
+                              if levels[d].tag == tag), None)
+            if depth is None:
+                continue
+            if depth + 1 < len(levels):
+                # Lists opened inside the closed element were never closed
+                levels[depth].item.append(content[levels[depth + 1].start:match.start()])
+                del levels[depth + 1:]
+            if tag == 'li':
+                levels[depth].end_item()
+                continue
+            parts = levels.pop().render()
+            if levels:
+                levels[-1].item.extend(parts)
+            else:
+                out.extend(parts)
+        elif tag == 'li':
+            levels[-1].start_item()
+        else:
+            indent = levels[-1].nest() if levels else ''
+            levels.append(_ListLevel(tag, match.start(), indent))
+
+    out.append(content[levels[0].start:] if levels else content[pos:])
+    return ''.join(out)
+
+
+def _heading(level):
+    return lambda attrs, inner: f"{'#' * level} {inner.strip()}\n"
+
+
+# Inline elements converted together by wrap_elements: tag name -> markdown
+# for the opening and closing tag. Every name starts with a different
+# letter, so each opening tag (strong..., b..., em..., i...) belongs to
+# exactly one of them.
+INLINE_MARKERS = {'strong': ('**', '**'), 'b': ('**', '**'), 'em': ('*', '*'), 'i': ('*', '*')}
+
+_INLINE_TAG_RE = re.compile(
+    '<({0})[^<>]*>|</({0})>'.format('|'.join(INLINE_MARKERS)), re.IGNORECASE
+)
+
+# Tags dropped or replaced once every element rule has run, in one pass:
+# rule name -> (pattern, replacement). The alternatives are tried in this
+# order at each position, which gives the same result as applying them
+# one after another unless a tag contains a '<'; remaining_tags catches
+# every other tag.
+TAG_RULES = {
+    'figure_open': (r'<figure[^>]*>', ''),
+    'figure_close': (r'</figure>', ''),
+    'code_open': (r'<code[^>]*>', '`'),
+    'code_close': (r'</code>', '`'),
+    'pre_open': (r'<pre[^>]*>', '\n```\n'),
+    'pre_close': (r'</pre>', '\n```\n'),
+    'p_open': (r'<p[^>]*>', '\n'),
+    'p_close': (r'</p>', '\n'),
+    'br': (r'<br\s*/?>', '\n'),
+    'div_open': (r'<div[^>]*>', ''),
+    'div_close': (r'</div>', ''),
+    'span_open': (r'<span[^>]*>', ''),
+    'span_close': (r'</span>', ''),
+    'remaining_tags': (r'<[^>]+>', ''),
+}
+
+# Every pattern starts with '<'; factoring it out of the alternation lets
+# re skip straight to the next '<' instead of trying each rule everywhere
+_TAG_RE = re.compile(
+    '<(?:' + '|'.join(f'(?P<{rule}>{pattern[1:]})' for rule, (pattern, _) in TAG_RULES.items()) + ')',
+    re.IGNORECASE
+)
+_TAG_REPLACEMENTS = {rule: repl for rule, (_, repl) in TAG_RULES.items()}
+
+
+def remove_tags(content):
+    """Apply TAG_RULES: the tags left once every element rule has run.
+
+    Every tag ends with a '>', so nothing after the last one is searched;
+    up to there each '<' either starts a tag or fails at once, where an
+    unclosed one would otherwise be searched to the end of the post.
+    """
+    end = content.rfind('>') + 1
+    return _TAG_RE.sub(lambda m: _TAG_REPLACEMENTS[m.lastgroup], content[:end]) + content[end:]
+
+
+# The cascade, compiled once: (rule name, pattern, replacement) applied in
+# order, or (rule name, None, function) for rules that are not a single
+# substitution. A new tag only needs an entry in INLINE_MARKERS or
+# TAG_RULES, not another pass over the post.
+RULES = [
+    # Remove WordPress block comments
+    ('wp_comments', None, lambda c: remove_comments(c, _WP_COMMENT_RE)),
+    ('wp_closing_comments', None, lambda c: remove_comments(c, _WP_CLOSING_COMMENT_RE)),
+
+    # Remove CDATA markers
+    ('cdata', None, lambda c: c.replace('<![CDATA[', '').replace(']]>', '')),
+
+    # Convert headings (h1-h6) to markdown
+    *[(f'h{i}', None, _element_rule(f'h{i}', _heading(i))) for i in range(1, 7)],
+
+    # Convert strong/bold and em/italic tags
+    ('inline', None, lambda c: wrap_elements(c, _INLINE_TAG_RE, INLINE_MARKERS)),
+
+    # Convert links to markdown
+    ('link', None, convert_links),
+
+    # Convert blockquotes
+    ('blockquote', None, _element_rule(
+        'blockquote', lambda attrs, inner: '\n> ' + inner.strip().replace('\n', '\n> ') + '\n'
+    )),
+
+    # Convert lists, nested ones to indented sub-lists
+    ('list', None, convert_lists),
+
+    # Convert tables to markdown
+    ('table', None, convert_tables),
+
+    # Convert iframes to links
+    ('iframe', None, _element_rule('iframe', iframe_link)),
+
+    # Convert images to markdown
+    ('image', None, convert_images),
+
+    # Remove figure captions and superscript citations with their content;
+    # no other tag rule touches these tags, so they run before the tag pass
+    ('figcaption', None, _element_rule('figcaption', lambda attrs, inner: '')),
+    ('sup_citation', re.compile(r'<sup[^>]*>\[?\d+\]?</sup>', re.IGNORECASE), ''),
+    ('sup', None, _element_rule('sup', lambda attrs, inner: '')),
+
+    # Remove figure/code/pre/p/br/div/span and any remaining tags
+    ('tags', _TAG_RE, lambda m: _TAG_REPLACEMENTS[m.lastgroup]),
+
+    # Unescape HTML entities
+    ('unescape', None, unescape),
+
+    # Clean up whitespace
+    ('blank_lines', re.compile(r'\n{3,}'), '\n\n'),
+    ('spaces', re.compile(r' +'), ' '),
+    ('list_indent', None, lambda c: c.replace(LIST_INDENT, ' ')),
+]
+
+
+def clean_html_to_markdown(html_content):
+    """Convert HTML to clean markdown with NO HTML tags remaining."""
+    if not html_content:
+        return ""
+
+    content = html_content.strip()
+    for rule, pattern, repl in RULES:
+        if pattern is None:
+            content = step_rule(rule, repl, content)
+        else:
+            content = sub_rule(rule, pattern, repl, content)
+
+    return content.strip()
@@ -0,0 +1,241 @@
+"""Related posts: the posts most like each post, computed at conversion time.
+
+Each post is a vector of the terms the search index uses, weighted by
+TF-IDF (1 + log of the term's count, times log of the posts over the posts
+with the term) and scaled to unit length; posts are related by the cosine
+of their vectors. The products are sparse: postings list, for each term,
+the posts that have it, and a batch of posts is scored against every other
+post by walking the postings of the batch's terms once. Terms in most
+posts add little to a score but much to the walk, so they are left out.
+Beyond EXACT_POSTS posts only the heaviest QUERY_TERMS terms of a post are
+walked, which finds the candidates; the best of them are then scored on
+their whole vectors.
+
+The term counts of every post and its neighbours are kept in a state file,
+so an incremental run only scores the posts that changed, the posts whose
+neighbours changed, and puts changed posts into the lists of the posts they
+now beat. Scores between unchanged posts keep the weights of the run that
+computed them; --force recomputes every list.
+"""
+
+import gzip
+import heapq
+import json
+import math
+from collections import defaultdict
+
+
+RELATED_NAME = 'related-posts.json.gz'
+
+# Bump whenever a change to the weights or the vectors changes the scores,
+# so a state file of an earlier version is recomputed instead of updated
+FORMAT_VERSION = 1
+
+DEFAULT_RELATED = 5
+
+# Terms in more than this fraction of the posts are left out of the
+# postings, once there are at least MIN_POSTS posts to tell them apart by
+MAX_DF = 0.5
+MIN_POSTS = 10
+
+# Posts scored with one walk of the postings
+BATCH_SIZE = 64
+
+# Posts up to which every term of a post is walked, so lists are exact;
+# beyond, the terms of a post whose postings are walked for candidates,
+# and the candidates per neighbour scored on their whole vectors
+EXACT_POSTS = 500
+QUERY_TERMS = 32
+CANDIDATES = 4
+
+
+def term_counts(document):
+    """Return {term: count} of a post as returned by index_document."""
+    return {term: len(positions) for term, positions in document['terms'].items()}
+
+
+class RelatedPosts:
+    """The term counts and the k nearest neighbours of every post, kept in the file at path.
+
+    A missing or unreadable state file, or one of another format or k,
+    starts empty, so every post is scored again.
+    """
+
+    def __init__(self, path, k=DEFAULT_RELATED):
+        self.path = path
+        self.k = k
+        self.docs = {}
+        self.related = {}
+        self.changed = set()
+        # Document frequencies, vectors and postings, built on the first compute
+        self.df = None
+        self.vectors = None
+        self.postings = None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return
+        if state.get('format') != FORMAT_VERSION or state.get('k') != k:
+            return
+        self.docs = state['docs']
+        self.related = state['related']
+
+    def update(self, doc_id, counts):
+        """Set the term counts of a post; a post whose counts changed is scored again."""
+        if self.docs.get(doc_id) != counts:
+            self._retire(doc_id)
+            self.docs[doc_id] = counts
+            if self.df is not None:
+                self._count(counts, 1)
+            self.changed.add(doc_id)
+
+    def prune(self, keep):
+        """Drop every post whose id is not in keep."""
+        for doc_id in [doc_id for doc_id in self.docs if doc_id not in keep]:
+            self._retire(doc_id)
+            del self.docs[doc_id]
+            self.related.pop(doc_id, None)
+            self.changed.add(doc_id)
+
+    def _count(self, counts, step):
+        for term in counts:
+            self.df[term] += step
+            if not self.df[term]:
+                del self.df[term]
+
+    def _retire(self, doc_id):
+        """Take the vector of a post out of the postings before its counts change."""
+        if self.df is None or doc_id not in self.docs:
+            return
+        self._count(self.docs[doc_id], -1)
+        for term in self.vectors.pop(doc_id, {}):
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+
+    def _vectorize(self, doc_id):
+        """Weigh the counts of a post by the current document frequencies and add it to the postings."""
+        total = len(self.docs)
+        limit = MAX_DF * total if total >= MIN_POSTS else total
+        weights = {term: (1 + math.log(count)) * math.log(total / self.df[term])
+                   for term, count in sorted(self.docs[doc_id].items())
+                   if self.df[term] <= limit and self.df[term] < total}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        vector = {term: weight / norm for term, weight in weights.items()} if norm else {}
+        self.vectors[doc_id] = vector
+        for term, weight in vector.items():
+            self.postings[term][doc_id] = weight
+
+    def _vectors(self):
+        """Bring the unit TF-IDF vectors and the postings up to date with the counts.
+
+        The first call weighs every post. Later calls, in a process that keeps
+        this object, only weigh the posts that changed since, so the weights of
+        the others keep the document frequencies of when they were computed.
+        """
+        if self.df is None:
+            self.df = defaultdict(int)
+            for counts in self.docs.values():
+                self._count(counts, 1)
+            self.vectors = {}
+            self.postings = defaultdict(dict)
+            pending = self.docs
+        else:
+            pending = [doc_id for doc_id in self.changed if doc_id in self.docs]
+        for doc_id in pending:
+            self._vectorize(doc_id)
+
+    def _score_batch(self, batch):
+        """Return {post: {candidate: cosine}} for each post of batch, walking each posting list once."""
+        vectors = self.vectors
+        exact = len(vectors) <= EXACT_POSTS
+        queries = defaultdict(list)
+        for doc_id in batch:
+            vector = vectors[doc_id]
+            # Ties are broken by term, so the terms walked do not depend on the order of counts
+            terms = vector if exact else heapq.nlargest(
+                QUERY_TERMS, vector, key=lambda term: (vector[term], term))
+            for term in terms:
+                queries[term].append((doc_id, vector[term]))
+        # Terms are walked in order, so each sum adds its products in the order
+        # of the whole-vector scores below and comes to the same float
+        partial = {doc_id: defaultdict(float) for doc_id in batch}
+        for term in sorted(queries):
+            posting = self.postings[term].items()
+            for doc_id, weight in queries[term]:
+                accumulator = partial[doc_id]
+                for other, other_weight in posting:
+                    accumulator[other] += weight * other_weight
+
+        scores = {}
+        for doc_id in batch:
+            accumulator = partial[doc_id]
+            accumulator.pop(doc_id, None)
+            if exact:
+                scores[doc_id] = dict(accumulator)
+                continue
+            vector = vectors[doc_id]
+            scores[doc_id] = {}
+            candidates = heapq.nlargest(
+                self.k * CANDIDATES, accumulator, key=lambda other: (accumulator[other], other))
+            for other in candidates:
+                other_vector = vectors[other]
+                if len(other_vector) < len(vector):
+                    small, large = other_vector, vector
+                else:
+                    small, large = vector, other_vector
+                scores[doc_id][other] = sum(weight * large[term]
+                                            for term, weight in sorted(small.items()) if term in large)
+        return scores
+
+    def _top(self, scores):
+        """The k best of {post: score}, best first; ties go to the lower id."""
+        best = heapq.nsmallest(self.k, ((-score, doc_id) for doc_id, score in scores.items()
+                                        if score > 0))
+        return [[doc_id, round(-score, 6)] for score, doc_id in best]
+
+    def compute(self):
+        """Score the posts that need it; return how many neighbour lists were recomputed."""
+        changed = self.changed
+        stale = [doc_id for doc_id in self.docs
+                 if doc_id in changed or doc_id not in self.related
+                 or any(other in changed for other, _ in self.related[doc_id])]
+        stale.sort()
+        if not stale:
+            self.changed = set()
+            return 0
+
+        self._vectors()
+        stale_set = set(stale)
+        for start in range(0, len(stale), BATCH_SIZE):
+            batch = stale[start:start + BATCH_SIZE]
+            for doc_id, scores in self._score_batch(batch).items():
+                self.related[doc_id] = self._top(scores)
+                if doc_id not in changed:
+                    continue
+                # Cosines are symmetric: a changed post enters the lists it now beats
+                for other, score in scores.items():
+                    if other in stale_set or score <= 0:
+                        continue
+                    neighbours = self.related[other]
+                    if len(neighbours) < self.k or score > neighbours[-1][1]:
+                        scored = {neighbour: value for neighbour, value in neighbours}
+                        scored[doc_id] = score
+                        self.related[other] = self._top(scored)
+        self.changed = set()
+        return len(stale)
+
+    def slugs(self, doc_id, slugs):
+        """The slugs of a post's neighbours, given {id: slug}."""
+        return [slugs[other] for other, _ in self.related.get(doc_id, []) if other in slugs]
+
+    def dump(self):
+        """Return the bytes of the state file."""
+        text = json.dumps({'format': FORMAT_VERSION, 'k': self.k, 'docs': self.docs,
+                           'related': self.related},
+                          ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        # mtime=0 keeps the bytes of an unchanged state the same across runs
+        return gzip.compress(text.encode('utf-8'), compresslevel=6, mtime=0)
+
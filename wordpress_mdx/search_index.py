@@ -0,0 +1,481 @@
+"""Full-text search index of the converted posts, built at conversion time.
+
+The index is a directory of static files that a client-side search loads
+on demand. It is written under the site's public/ directory, by default
+to public/search-index, so the frontend fetches /search-index/index.json
+first, then the chunks of the terms of a query:
+
+    index.json           format, the documents and the term count of every chunk
+    <prefix>.json.gz     postings of the terms that start with prefix
+    terms.json.gz        the terms of each document, read only by incremental builds
+
+Terms are lowercased words without stop words, reduced to their stem with
+the Porter algorithm, which has ports in most languages so a client can
+stem queries the same way. Postings map each term to the documents that
+contain it and the word positions at which it occurs, delta encoded, so
+phrases can be matched.
+
+A term's postings are in the chunk of the longest prefix of the term that
+index.json lists, so a query only loads the chunks of its own terms.
+Chunks start at PREFIX_LENGTH letters; one that grows past CHUNK_BYTES is
+split into chunks one letter longer, which keeps chunks small however
+unevenly the vocabulary spreads over prefixes.
+"""
+
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+from functools import lru_cache
+from itertools import accumulate
+
+
+SEARCH_DIR = 'search-index'
+
+# Bump whenever a change to tokenize or stem changes the terms, so existing
+# indexes are rebuilt instead of updated
+FORMAT_VERSION = 1
+
+# Letters of the shortest chunk prefixes, and the size of uncompressed
+# postings above which a chunk is split
+PREFIX_LENGTH = 2
+CHUNK_BYTES = 128 * 1024
+
+# Lucene's English stop words, plus pronouns that carry no meaning in a query
+STOP_WORDS = frozenset('''
+a an and are as at be but by for if in into is it no not of on or such that the their then
+there these they this to was will with i me my we our you your he him his she her its them
+'''.split())
+
+_WORD_RE = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+
+# Link and image targets are not text, so they are not indexed
+_LINK_TARGET_RE = re.compile(r'\]\([^)]*\)')
+
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+
+
+def _is_consonant(word, i):
+    letter = word[i]
+    if letter in 'aeiou':
+        return False
+    if letter == 'y':
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem):
+    """Porter's m: the number of vowel-consonant sequences in stem."""
+    m = 0
+    vowel = False
+    for i in range(len(stem)):
+        consonant = _is_consonant(stem, i)
+        if vowel and consonant:
+            m += 1
+        vowel = not consonant
+    return m
+
+
+def _has_vowel(stem):
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _double_consonant(word):
+    return len(word) > 1 and word[-1] == word[-2] and _is_consonant(word, len(word) - 1)
+
+
+def _cvc(word):
+    """Whether word ends consonant-vowel-consonant, the last not w, x or y."""
+    return (len(word) > 2 and _is_consonant(word, len(word) - 3)
+            and not _is_consonant(word, len(word) - 2)
+            and _is_consonant(word, len(word) - 1) and word[-1] not in 'wxy')
+
+
+# Suffix rules of steps 2 to 4; where suffixes overlap the longer comes
+# first, because only the longest matching suffix of a step is considered
+_STEP2 = (
+    ('ational', 'ate'), ('tional', 'tion'), ('enci', 'ence'), ('anci', 'ance'), ('izer', 'ize'),
+    ('abli', 'able'), ('alli', 'al'), ('entli', 'ent'), ('eli', 'e'), ('ousli', 'ous'),
+    ('ization', 'ize'), ('ation', 'ate'), ('ator', 'ate'), ('alism', 'al'), ('iveness', 'ive'),
+    ('fulness', 'ful'), ('ousness', 'ous'), ('aliti', 'al'), ('iviti', 'ive'), ('biliti', 'ble'),
+)
+_STEP3 = (
+    ('icate', 'ic'), ('ative', ''), ('alize', 'al'), ('iciti', 'ic'), ('ical', 'ic'),
+    ('ful', ''), ('ness', ''),
+)
+_STEP4 = (
+    'ement', 'ance', 'ence', 'able', 'ible', 'ment', 'ant', 'ent', 'ion', 'ism', 'ate', 'iti',
+    'ous', 'ive', 'ize', 'al', 'er', 'ic', 'ou',
+)
+
+
+def _replace_suffix(word, rules, min_measure):
+    for suffix, replacement in rules:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if _measure(stem) > min_measure:
+                return stem + replacement
+            return word
+    return word
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Reduce a lowercase word to its stem with the Porter algorithm."""
+    if len(word) <= 2 or not word.isalpha() or not word.isascii():
+        return word
+
+    # Step 1a: plurals
+    if word.endswith('sses') or word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+
+    # Step 1b: past tenses and gerunds
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ('ed', 'ing'):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(('at', 'bl', 'iz')):
+                    word += 'e'
+                elif _double_consonant(word) and word[-1] not in 'lsz':
+                    word = word[:-1]
+                elif _measure(word) == 1 and _cvc(word):
+                    word += 'e'
+                break
+
+    # Step 1c
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        word = word[:-1] + 'i'
+
+    word = _replace_suffix(word, _STEP2, 0)
+    word = _replace_suffix(word, _STEP3, 0)
+
+    # Step 4: remove a suffix from a stem of measure 2 or more
+    for suffix in _STEP4:
+        if word.endswith(suffix):
+            stem_ = word[:-len(suffix)]
+            if _measure(stem_) > 1 and (suffix != 'ion' or stem_.endswith(('s', 't'))):
+                word = stem_
+            break
+
+    # Step 5: a final e, and a double l
+    if word.endswith('e'):
+        stem_ = word[:-1]
+        m = _measure(stem_)
+        if m > 1 or (m == 1 and not _cvc(stem_)):
+            word = stem_
+    if word.endswith('ll') and _measure(word) > 1:
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def _term(word):
+    """The term of a word as it appears in text, or None for a stop word."""
+    word = word.casefold().replace('’', "'")
+    if word.endswith("'s"):
+        word = word[:-2]
+    word = word.replace("'", '')
+    return None if word in STOP_WORDS else stem(word)
+
+
+def tokenize(text):
+    """Yield (position, term) for each word of text that is not a stop word.
+
+    Positions count every word, stop words included, so that a phrase
+    matches only where its words stand at the same distances.
+    """
+    for position, word in enumerate(_WORD_RE.findall(text)):
+        term = _term(word)
+        if term is not None:
+            yield position, term
+
+
+def index_document(title, markdown):
+    """Return the length and the {term: positions} of a post, title first."""
+    terms = {}
+    offset = 0
+    length = 0
+    for text in (title or '', _LINK_TARGET_RE.sub(']', markdown)):
+        last = -1
+        for last, term in tokenize(text):
+            terms.setdefault(term, []).append(offset + last)
+            length += 1
+        # Leave a gap so that no phrase runs from the title into the text
+        offset += last + 2
+    return {'length': length, 'terms': terms}
+
+
+def chunk_prefix(chunks, term):
+    """Return the longest prefix of term in chunks, or None."""
+    for length in range(len(term), 0, -1):
+        if term[:length] in chunks:
+            return term[:length]
+    return None
+
+
+# The names chunk_name gives chunks; stale_files leaves every other file alone
+_CHUNK_NAME_RE = re.compile(r'(?:[a-z0-9]+|x-(?:[0-9a-f]{2})+)\.json\.gz')
+
+
+def chunk_name(prefix):
+    """File name of the chunk of prefix; prefixes that are not plain ASCII are hex encoded."""
+    if prefix.isascii() and prefix.isalnum():
+        return f'{prefix}.json.gz'
+    return 'x-' + prefix.encode('utf-8').hex() + '.json.gz'
+
+
+def _encode_positions(positions):
+    return [positions[0]] + [b - a for a, b in zip(positions, positions[1:])]
+
+
+def _decode_positions(deltas):
+    return accumulate(deltas)
+
+
+def _dump_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def _compress(text):
+    # mtime=0 keeps the bytes of an unchanged chunk the same across runs
+    return gzip.compress(text.encode('utf-8'), compresslevel=6, mtime=0)
+
+
+def _load_compressed(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_manifest(index_dir):
+    """Return index.json of index_dir if it exists and has the current format, else None."""
+    try:
+        with open(os.path.join(index_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+class SearchIndexBuilder:
+    """The index in index_dir, updated one document at a time.
+
+    An existing index is read back so that only changed posts need to be
+    indexed again; a missing, unreadable or outdated one starts empty.
+    Chunks are loaded from disk only when a document adds or removes one
+    of their terms, and files() returns only the chunks that changed.
+    Chunks are never merged again, so an index that was updated many times
+    can have more, smaller chunks than a fresh build of the same posts.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.docs = {}
+        self.chunks = {}
+        self.doc_terms = {}
+        self.loaded = {}
+        self.dirty = set()
+
+        manifest = _load_manifest(index_dir)
+        if manifest is None:
+            return
+        try:
+            doc_terms = _load_compressed(os.path.join(index_dir, 'terms.json.gz'))
+        except (OSError, ValueError, EOFError):
+            return
+        self.docs = manifest['docs']
+        self.chunks = manifest['chunks']
+        self.doc_terms = doc_terms
+
+    def _chunk(self, term):
+        """The postings of the chunk of term, read from disk the first time they are needed.
+
+        A term that no chunk prefixes starts a new chunk of PREFIX_LENGTH letters.
+        """
+        prefix = chunk_prefix(self.chunks, term)
+        if prefix is None:
+            prefix = term[:PREFIX_LENGTH]
+            self.chunks[prefix] = 0
+        if prefix not in self.loaded:
+            postings = {}
+            if self.chunks[prefix]:
+                try:
+                    postings = _load_compressed(os.path.join(self.index_dir, chunk_name(prefix)))
+                except (OSError, ValueError, EOFError):
+                    postings = {}
+            self.loaded[prefix] = postings
+        self.dirty.add(prefix)
+        return self.loaded[prefix]
+
+    def remove(self, doc_id):
+        """Drop a document and its postings."""
+        for term in self.doc_terms.pop(doc_id, []):
+            postings = self._chunk(term)
+            documents = postings.get(term, {})
+            documents.pop(doc_id, None)
+            if not documents:
+                postings.pop(term, None)
+        self.docs.pop(doc_id, None)
+
+    def update(self, doc_id, slug, title, document):
+        """Index a document as returned by index_document, replacing its earlier version."""
+        self.remove(doc_id)
+        terms = document['terms']
+        for term, positions in terms.items():
+            postings = self._chunk(term)
+            postings.setdefault(term, {})[doc_id] = _encode_positions(positions)
+        self.doc_terms[doc_id] = sorted(terms)
+        self.docs[doc_id] = {'slug': slug, 'title': title, 'length': document['length']}
+
+    def prune(self, keep):
+        """Drop every document whose id is not in keep."""
+        for doc_id in [doc_id for doc_id in self.docs if doc_id not in keep]:
+            self.remove(doc_id)
+
+    def _split(self, prefix):
+        """Move the longer terms of a chunk into chunks one letter longer; return their prefixes.
+
+        No such chunk exists yet, or its terms would not be in this one.
+        """
+        postings = self.loaded[prefix]
+        children = set()
+        for term in [term for term in postings if len(term) > len(prefix)]:
+            child = term[:len(prefix) + 1]
+            self.loaded.setdefault(child, {})[term] = postings.pop(term)
+            children.add(child)
+        return sorted(children)
+
+    def files(self):
+        """Return {file name: bytes} for index.json, terms.json.gz and every changed chunk."""
+        files = {}
+        pending = sorted(self.dirty)
+        while pending:
+            prefix = pending.pop()
+            postings = self.loaded[prefix]
+            text = _dump_json(postings)
+            if len(text) > CHUNK_BYTES and any(len(term) > len(prefix) for term in postings):
+                children = self._split(prefix)
+                for child in children:
+                    self.chunks[child] = 0
+                pending.extend(children)
+                text = _dump_json(postings)
+            if postings:
+                self.chunks[prefix] = len(postings)
+                files[chunk_name(prefix)] = _compress(text)
+            else:
+                self.chunks.pop(prefix, None)
+        self.dirty = set()
+
+        files['terms.json.gz'] = _compress(_dump_json(self.doc_terms))
+        files['index.json'] = (_dump_json({
+            'format': FORMAT_VERSION,
+            'docs': self.docs,
+            'chunks': dict(sorted(self.chunks.items())),
+        }) + '\n').encode('utf-8')
+        return files
+
+    def stale_files(self):
+        """Return the chunk files in index_dir that are not part of the index anymore.
+
+        Only files named the way chunk_name names chunks are returned, so
+        other files that share the directory are never deleted.
+        """
+        keep = {chunk_name(prefix) for prefix in self.chunks} | {'terms.json.gz'}
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return []
+        return sorted(name for name in names
+                      if _CHUNK_NAME_RE.fullmatch(name) and name not in keep)
+
+
+class SearchIndex:
+    """Queries against the index in index_dir, loading chunks as terms need them."""
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        manifest = _load_manifest(index_dir)
+        if manifest is None:
+            raise ValueError(f"No search index in {index_dir}")
+        self.docs = manifest['docs']
+        self.chunks = manifest['chunks']
+        self.loaded = {}
+        lengths = [doc['length'] for doc in self.docs.values()]
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0
+
+    def postings(self, term):
+        """Return {doc id: delta encoded positions} of a term."""
+        prefix = chunk_prefix(self.chunks, term)
+        if prefix is None:
+            return {}
+        if prefix not in self.loaded:
+            self.loaded[prefix] = _load_compressed(os.path.join(self.index_dir, chunk_name(prefix)))
+        return self.loaded[prefix].get(term, {})
+
+    @staticmethod
+    def _phrase_matches(phrase, postings, doc_id):
+        """Whether the (position, term) pairs of a phrase occur at the same distances in a document."""
+        start, first = phrase[0]
+        rest = [(offset - start, set(_decode_positions(postings[term][doc_id])))
+                for offset, term in phrase[1:]]
+        for position in _decode_positions(postings[first][doc_id]):
+            if all(position + distance in positions for distance, positions in rest):
+                return True
+        return False
+
+    def search(self, query, limit=10):
+        """Return up to limit documents matching every word and "quoted phrase" of query.
+
+        Results are ranked by BM25 and carry the document's id, slug,
+        title and score.
+        """
+        phrases = [list(tokenize(text)) for text in _PHRASE_RE.findall(query)]
+        phrases = [phrase for phrase in phrases if phrase]
+        terms = {term for _, term in tokenize(_PHRASE_RE.sub(' ', query))}
+        terms.update(term for phrase in phrases for _, term in phrase)
+        if not terms:
+            return []
+
+        postings = {term: self.postings(term) for term in terms}
+        # Intersect the rarest terms first
+        candidates = None
+        for term in sorted(terms, key=lambda term: len(postings[term])):
+            found = postings[term].keys()
+            candidates = set(found) if candidates is None else candidates & found
+            if not candidates:
+                return []
+
+        total = len(self.docs)
+        idf = {term: math.log(1 + (total - len(postings[term]) + 0.5) / (len(postings[term]) + 0.5))
+               for term in terms}
+        ranked = []
+        for doc_id in candidates:
+            doc = self.docs[doc_id]
+            norm = self.K1 * (1 - self.B + self.B * doc['length'] / (self.average_length or 1))
+            score = 0.0
+            for term in terms:
+                frequency = len(postings[term][doc_id])
+                score += idf[term] * frequency * (self.K1 + 1) / (frequency + norm)
+            ranked.append((-round(score, 4), doc['slug'], doc_id))
+
+        # Phrases are checked best match first, and only until limit documents have them
+        heapq.heapify(ranked)
+        results = []
+        while ranked and len(results) < limit:
+            score, slug, doc_id = heapq.heappop(ranked)
+            if all(self._phrase_matches(phrase, postings, doc_id) for phrase in phrases):
+                results.append({'id': doc_id, 'slug': slug, 'title': self.docs[doc_id]['title'],
+                                'score': -score})
+        return results
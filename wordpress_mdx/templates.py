@@ -0,0 +1,307 @@
+"""MDX output templates.
+
+A template turns a converted post into the text of its page.mdx. Both
+layouts the site has used are available: "blog-layout" renders through the
+BlogLayout component, "article" exports an article object.
+"""
+
+import math
+import os
+import re
+from datetime import datetime
+
+from .images import figure_jsx
+
+
+# The avatar blog-layout pages show for the CR Express team
+AUTHOR_IMAGE = '/team/cr-express-team.jpg'
+
+
+def escape_frontmatter_string(text):
+    """Escape backslashes and apostrophes in frontmatter strings, and put them on one line."""
+    if not text:
+        return ""
+    # Escape backslashes, then single quotes
+    text = text.replace('\\', '\\\\').replace("'", "\\'")
+    # Remove newlines
+    text = text.replace('\n', ' ').replace('\r', ' ')
+    # Clean up multiple spaces
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+# Characters generate_description drops, and the marks that end its first sentence
+_MARKDOWN_SYNTAX_RE = re.compile(r'[#*`\[\]()]')
+_SENTENCE_END_RE = re.compile(r'[.!?]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Links extract_description replaces by their text, and the symbols it drops
+_LINK_RE = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+_SYMBOL_RE = re.compile(r'[*_`#]')
+# The start of a link that more text after the end of the string could complete
+_OPEN_LINK_RE = re.compile(r'\[(?:[^\]]*|[^\]]+\](?:\([^)]*)?)\Z')
+
+# Characters of the content the description extractors read first; when
+# that is not enough, they read on, SCAN_CHUNK or twice as many at a time
+SCAN_CHUNK = 512
+
+WORDS_PER_MINUTE = 200
+
+# Link and image targets, image alt text and the HTML tags left in the
+# markdown are not read, so they do not count as words
+_LINK_TARGET_RE = re.compile(r'\]\([^)]*\)')
+_IMAGE_ALT_RE = re.compile(r'!\[[^\]]*\]')
+_TAG_RE = re.compile(r'</?[a-zA-Z][^<>]*>')
+_WORD_RE = re.compile(r"\w[\w'’-]*")
+
+# Characters of markdown whose words are listed at once when counting them
+COUNT_CHUNK = 16384
+
+
+def generate_description(content, max_length=150):
+    """Generate a clean description from content.
+
+    Only reads the content up to the end of its first sentence, or up to
+    max_length characters into it, SCAN_CHUNK characters at a time. The
+    description is plain text on one line; templates escape it for the
+    frontmatter.
+    """
+    desc = ''
+    for start in range(0, len(content), SCAN_CHUNK):
+        # Remove markdown syntax
+        desc = (desc + _MARKDOWN_SYNTAX_RE.sub('', content[start:start + SCAN_CHUNK])).lstrip()
+        end = _SENTENCE_END_RE.search(desc)
+        # The rest of the content cannot change the first sentence, nor
+        # the first max_length characters of a longer one
+        if (end and end.start()) or len(desc.rstrip()) > max_length:
+            break
+    desc = desc.strip()
+
+    # Get first sentence or max_length chars
+    end = _SENTENCE_END_RE.search(desc)
+    if end and end.start():
+        desc = desc[:end.start()].strip()
+
+    if len(desc) > max_length:
+        desc = desc[:max_length].rsplit(' ', 1)[0] + '...'
+
+    return _WHITESPACE_RE.sub(' ', desc).strip()
+
+
+def _cuts_link(text):
+    """Whether text ends inside a link that extract_description would replace by its text."""
+    tail = 0
+    for match in _LINK_RE.finditer(text):
+        tail = match.end()
+    start = text.find('[', tail)
+    while start >= 0:
+        if _OPEN_LINK_RE.match(text, start):
+            return True
+        start = text.find('[', start + 1)
+    return False
+
+
+def extract_description(content, max_length=200):
+    """
+    Extract first paragraph or first N characters as description
+
+    Of a long first paragraph, only reads as much as the first max_length
+    characters of the description take, and no link is cut short.
+    """
+    # Get first paragraph (text before first double newline)
+    end = content.find('\n\n')
+    if end < 0:
+        end = len(content)
+
+    size = SCAN_CHUNK
+    while True:
+        first_para = content[:min(size, end)]
+        # Remove markdown formatting for description
+        desc = _LINK_RE.sub(r'\1', first_para)  # Remove links
+        desc = _SYMBOL_RE.sub('', desc)  # Remove markdown symbols
+        desc = desc.strip()
+        if size >= end or (len(desc) > max_length and not _cuts_link(first_para)):
+            break
+        size *= 2
+
+    # Truncate if too long
+    if len(desc) > max_length:
+        desc = desc[:max_length].rsplit(' ', 1)[0] + '...'
+
+    return desc
+
+
+def count_words(markdown):
+    """Count the words of converted markdown, leaving out link targets and markup.
+
+    The markdown is not copied: its words are counted in pieces of about
+    COUNT_CHUNK characters cut at spaces, which no word has, and the
+    words of its link targets, image alt text and HTML tags taken off.
+    """
+    words = 0
+    start = 0
+    while start < len(markdown):
+        end = markdown.find(' ', start + COUNT_CHUNK)
+        if end < 0:
+            end = len(markdown)
+        words += len(_WORD_RE.findall(markdown, start, end))
+        start = end
+    for markup_re in (_LINK_TARGET_RE, _IMAGE_ALT_RE, _TAG_RE):
+        for match in markup_re.finditer(markdown):
+            words -= len(_WORD_RE.findall(markdown, match.start(), match.end()))
+    return words
+
+
+def reading_time(word_count):
+    """Minutes to read word_count words, rounded up; at least one."""
+    return max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+
+
+def reading_stats(post_data):
+    """Return (word count, minutes to read) of a post, counting its words unless it has them."""
+    word_count = post_data.get('word_count')
+    if word_count is None:
+        word_count = count_words(post_data['content'])
+    return word_count, reading_time(word_count)
+
+
+def image_props(src, sizes):
+    """The image object of the metadata: src, with width and height when they are known."""
+    size = sizes.get(src)
+    if size is None:
+        return f"{{ src: '{src}' }}"
+    return f"{{ src: '{src}', width: {size[0]}, height: {size[1]} }}"
+
+
+def blog_layout_mdx(post_data):
+    """Render a post as a page that wraps itself in BlogLayout."""
+    title = post_data['title']
+    content = post_data['content']
+    date = post_data['date']
+    featured_image = post_data['featured_image']
+    word_count, minutes = reading_stats(post_data)
+    # Width and height of the images in public/, by src
+    sizes = post_data.get('image_sizes', {})
+
+    # Use the SEOPress description, or generate one from content
+    description = escape_frontmatter_string(
+        post_data.get('seo_description') or post_data.get('description')
+        or generate_description(content))
+
+    # Escape title for frontmatter
+    escaped_title = escape_frontmatter_string(title)
+
+    # Images of known size get a figure with their width and height
+    if featured_image in sizes:
+        featured = figure_jsx(featured_image, title, sizes[featured_image])
+    else:
+        featured = f"![{escaped_title}]({featured_image})"
+
+    # Format date
+    try:
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+        formatted_date = date_obj.strftime('%Y-%m-%d')
+    except:
+        formatted_date = date
+
+    return f"""import {{ BlogLayout }} from '@/components/BlogLayout'
+
+export const metadata = {{
+  title: '{escaped_title}',
+  description: '{description}',
+  author: {{
+    name: 'CR Express',
+    role: 'Logistics Team',
+    image: {image_props(AUTHOR_IMAGE, sizes)}
+  }},
+  date: '{formatted_date}',
+  wordCount: {word_count},
+  readingTime: {minutes}
+}}
+
+export default (props) => <BlogLayout metadata={{metadata}} {{...props}} />
+
+{featured}
+
+{content}
+"""
+
+
+def article_mdx(post_data):
+    """Render a post as a page exporting an article object and its metadata."""
+    title = post_data['title']
+    date = post_data['date']
+    content = post_data['content']
+    description = (post_data.get('seo_description') or post_data.get('description')
+                   or extract_description(content))
+    featured_image = post_data['featured_image']
+    seo_title = post_data.get('seo_title')
+    word_count, minutes = reading_stats(post_data)
+
+    # Escape title and description for their string literals
+    title_escaped = escape_frontmatter_string(title)
+    description_escaped = escape_frontmatter_string(description)
+
+    # The page title only differs from the article's when SEOPress sets one
+    if seo_title and seo_title != title:
+        metadata_title = "'" + escape_frontmatter_string(seo_title) + "'"
+    else:
+        metadata_title = 'article.title'
+
+    mdx_content = f"""export const article = {{
+  date: '{date}',
+  title: '{title_escaped}',
+  description: '{description_escaped}',
+  author: {{
+    name: 'CR Express',
+    role: 'Logistics Team',
+  }},
+}}
+
+export const metadata = {{
+  title: {metadata_title},
+  description: article.description,
+  wordCount: {word_count},
+  readingTime: {minutes},
+}}
+
+"""
+
+    # Add featured image if available
+    if featured_image:
+        size = post_data.get('image_sizes', {}).get(featured_image)
+        if size:
+            mdx_content += figure_jsx(featured_image, title, size) + "\n\n"
+        else:
+            mdx_content += f"![{title}]({featured_image})\n\n"
+
+    return mdx_content + content
+
+
+TEMPLATES = {
+    'blog-layout': blog_layout_mdx,
+    'article': article_mdx,
+}
+
+# How each template derives a description from the content when SEOPress has none
+DESCRIPTIONS = {
+    'blog-layout': generate_description,
+    'article': extract_description,
+}
+
+
+def render_mdx(post_data, template='blog-layout'):
+    """Return the page.mdx text of a post with the named template."""
+    return TEMPLATES[template](post_data)
+
+
+def create_mdx_file(post_data, target_dir, template='blog-layout'):
+    """Write a post to <target_dir>/<slug>/page.mdx with the named template."""
+    post_dir = os.path.join(target_dir, post_data['slug'])
+    os.makedirs(post_dir, exist_ok=True)
+
+    mdx_file = os.path.join(post_dir, 'page.mdx')
+    with open(mdx_file, 'w', encoding='utf-8') as f:
+        f.write(render_mdx(post_data, template))
+
+    return mdx_file
@@ -0,0 +1,33 @@
+"""Fixtures shared by the tests of the converter."""
+
+import os
+from xml.sax.saxutils import escape
+
+import pytest
+
+from wordpress_mdx.redirects import REPO_ROOT
+
+
+BUNDLED_EXPORT = os.path.join(REPO_ROOT, 'Rules', 'Posts Export Oct 16 2025.xml')
+
+
+@pytest.fixture
+def bundled_export():
+    """The WordPress export the repository ships with."""
+    if not os.path.exists(BUNDLED_EXPORT):
+        pytest.skip('the bundled export is not in this checkout')
+    return BUNDLED_EXPORT
+
+
+@pytest.fixture
+def write_export(tmp_path):
+    """Write posts, each a dict of child tags to text, as a WordPress export; return its path."""
+    def write(posts, name='export.xml'):
+        body = ''.join(
+            '<post>' + ''.join(f'<{tag}>{escape(text)}</{tag}>' for tag, text in fields.items()) + '</post>\n'
+            for fields in posts
+        )
+        path = tmp_path / name
+        path.write_text(f'<?xml version="1.0" encoding="UTF-8"?>\n<data>\n{body}</data>\n', encoding='utf-8')
+        return str(path)
+    return write
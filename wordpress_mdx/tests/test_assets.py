@@ -0,0 +1,98 @@
+"""Copying the images of the old site, against a local HTTP server."""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from wordpress_mdx.assets import AssetError, copy_new_assets, download, load_asset_map, localize
+
+
+PNG = b'\x89PNG\r\n\x1a\n\0\0\0\rIHDR\0\0\0\x02\0\0\0\x03\x08\x06\0\0\0'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith('/img'):
+            self.respond(200, PNG, 'image/png')
+        elif self.path == '/page':
+            self.respond(200, b'<html></html>', 'text/html; charset=utf-8')
+        elif self.path == '/here':
+            self.redirect('/img-moved.png')
+        elif self.path == '/away':
+            self.redirect('http://elsewhere.example/img.png')
+        elif self.path == '/loop':
+            self.redirect('/loop')
+        else:
+            self.respond(404, b'missing', 'text/plain')
+
+    def respond(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def redirect(self, location):
+        self.send_response(301)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """The base URL and host of a local server of images."""
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    host = f'127.0.0.1:{httpd.server_address[1]}'
+    yield f'http://{host}', host
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_follows_redirects_on_asset_hosts(server):
+    base, host = server
+    assert download(f'{base}/img.png', {host}, timeout=5) == (PNG, 'image/png')
+    assert download(f'{base}/here', {host}, timeout=5) == (PNG, 'image/png')
+
+
+@pytest.mark.parametrize('path, reason', [
+    ('/page', 'not an image: text/html'),
+    ('/away', 'redirect to elsewhere.example, not an asset host'),
+])
+def test_download_rejects(server, path, reason):
+    base, host = server
+    with pytest.raises(AssetError, match=reason):
+        download(base + path, {host}, timeout=5)
+
+
+def test_copy_new_assets(server, tmp_path):
+    base, host = server
+    asset_dir = str(tmp_path / 'images')
+    path = str(tmp_path / 'assets.json')
+    urls = [f'{base}/img.png', f'{base}/img-copy.png', f'{base}/page', f'{base}/loop', f'{base}/missing']
+
+    copied, failed = copy_new_assets(urls, asset_dir, '/images/', path, {host}, concurrency=2, timeout=5)
+    assert sorted(copied) == sorted(urls[:2])
+    # The same bytes are stored once
+    assert copied[urls[0]] == copied[urls[1]]
+    assert os.listdir(asset_dir) == [copied[urls[0]].rsplit('/', 1)[-1]]
+    assert sorted(failed) == sorted(urls[2:])
+    assert failed[f'{base}/missing'].startswith('HTTP Error 404')
+    assert load_asset_map(path) == copied
+
+    copied, failed = copy_new_assets(urls[:2], asset_dir, '/images/', path, {host}, timeout=5)
+    assert (copied, failed) == ({}, {})
+
+
+def test_localize_points_images_at_their_copies():
+    assets = {'https://www.crexpressinc.com/a.png': '/images/blog-post/0123.png'}
+    markdown = '![A](https://www.crexpressinc.com/a.png) [link](https://www.crexpressinc.com/a.png)'
+    assert localize(markdown, assets) == (
+        '![A](/images/blog-post/0123.png) [link](https://www.crexpressinc.com/a.png)', 1)
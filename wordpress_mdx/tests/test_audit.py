@@ -0,0 +1,50 @@
+"""Finding leftover HTML tags, but not JSX, in markdown and page.mdx files."""
+
+import os
+
+import pytest
+
+from wordpress_mdx.audit import audit_file, find_html_tags, iter_mdx_files
+from wordpress_mdx.redirects import REPO_ROOT
+
+
+@pytest.mark.parametrize('text', [
+    '<div className="relative my-10">\n  <img\n    src="/a.png"\n    alt="a > b"\n    className="absolute"\n  />\n</div>',
+    '<Image src={image} alt="" />',
+    '<iframe\n  src="https://www.youtube.com/embed/x"\n  allowFullScreen\n></iframe>',
+    '<video controls={true}>\n  Your browser does not play videos.\n</video>',
+    'Mail <someone@example.com> for details.',
+    'No tags, only a comparison: 1 < 2.',
+])
+def test_jsx_is_not_html(text):
+    assert find_html_tags(text) == []
+
+
+@pytest.mark.parametrize('text, tags', [
+    ('<p>Left over</p>', ['<p>', '</p>']),
+    ('<span style="color: red">x</span>', ['<span style="color: red">', '</span>']),
+    ('<div className="a"><br></div>', ['<br>']),
+    ('</div>', ['</div>']),
+    ('<div className="a">\n  <img src="/a.png" />\n</div>', ['<img src="/a.png" />']),
+])
+def test_leftover_html(text, tags):
+    assert find_html_tags(text) == tags
+
+
+def test_audit_file_reports_line_numbers_past_metadata(tmp_path):
+    page = tmp_path / 'page.mdx'
+    page.write_text(
+        "import { Layout } from '@/components/Layout'\n"
+        "export const article = {\n  title: '<b>not a tag</b>',\n}\n"
+        '\n'
+        '<div className="figure">\n  <img src="/a.png" className="w-full" />\n</div>\n'
+        'Some <em>text</em>.\n', encoding='utf-8')
+    assert audit_file(str(page)) == [(9, '<em>'), (9, '</em>')]
+
+
+def test_hand_written_posts_pass_the_audit():
+    blog = os.path.join(REPO_ROOT, 'src', 'app', 'blog')
+    pages = list(iter_mdx_files(blog))
+    if not pages:
+        pytest.skip('the blog is not in this checkout')
+    assert {page: audit_file(page) for page in pages if audit_file(page)} == {}
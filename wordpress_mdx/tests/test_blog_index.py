@@ -0,0 +1,102 @@
+"""The blog index of every post's listing metadata."""
+
+import json
+import os
+
+from wordpress_mdx.blog_index import (INDEX_NAME, build_index_files, index_entry, load_index,
+                                      sort_entries, stale_index_files)
+from wordpress_mdx.cli import main
+from wordpress_mdx.templates import render_mdx
+
+
+def converted(post_id, slug, date='2025-10-10', **fields):
+    post = {'id': post_id, 'slug': slug, 'title': slug.title(), 'date': date,
+            'content': "It's a post about C:\\freight. More text.", 'featured_image': '/a.png'}
+    post.update(fields)
+    return post
+
+
+def entry(post_id, slug, date):
+    return {'id': post_id, 'slug': slug, 'date': date}
+
+
+def run(write_export, tmp_path, posts, *options):
+    argv = ['--xml', write_export(posts), '--target-dir', str(tmp_path / 'blog'),
+            '--public-dir', str(tmp_path / 'public'), '--no-redirects', '--no-image-sizes',
+            '--no-feeds', '--no-progress', '--no-cache', '--jobs', '1', '--related', '0']
+    return main(argv + list(options))
+
+
+def export_post(post_id, title, content='<p>Text.</p>', date='2025-10-10 09:00:00'):
+    slug = title.lower().replace("'", '').replace(' ', '-')
+    return {'id': post_id, 'Title': title, 'Content': content, 'Date': date,
+            'Permalink': f'https://www.crexpressinc.com/{slug}/'}
+
+
+def test_index_entry_keeps_the_raw_description():
+    post = converted('1', 'a')
+    assert index_entry(post, 'blog-layout')['description'] == "It's a post about C:\\freight"
+    assert index_entry(post, 'article')['description'] == "It's a post about C:\\freight. More text."
+    # Only the page escapes it
+    assert "description: 'It\\'s a post about C:\\\\freight'" in render_mdx(post, 'blog-layout')
+
+
+def test_index_entry_prefers_the_seo_description():
+    post = converted('1', 'a', seo_description="Don't \\' change me", word_count=400)
+    item = index_entry(post, 'blog-layout')
+    assert item['description'] == "Don't \\' change me"
+    assert (item['word_count'], item['reading_time']) == (400, 2)
+    assert item == {'id': '1', 'slug': 'a', 'title': 'A', 'date': '2025-10-10',
+                    'description': "Don't \\' change me", 'featured_image': '/a.png',
+                    'word_count': 400, 'reading_time': 2}
+
+
+def test_entries_are_sorted_newest_first_then_by_slug():
+    entries = [entry('1', 'b', '2025-01-01'), entry('2', 'a', '2025-01-01'),
+               entry('3', 'c', '2025-06-01')]
+    assert [item['slug'] for item in sort_entries(entries)] == ['c', 'a', 'b']
+
+
+def test_sharded_index_round_trip(tmp_path):
+    entries = [entry(str(n), f'post-{n}', f'2025-01-{n:02d}') for n in range(1, 6)]
+    files = build_index_files(entries, shard_size=2)
+    assert sorted(files) == ['blog-index-0001.json', 'blog-index-0002.json',
+                             'blog-index-0003.json', INDEX_NAME]
+    index = json.loads(files[INDEX_NAME])
+    assert index['total'] == 5 and index['shard_size'] == 2
+    assert [item['slug'] for item in json.loads(files['blog-index-0001.json'])['posts']] == \
+        ['post-5', 'post-4']
+
+    for name, text in files.items():
+        (tmp_path / name).write_text(text, encoding='utf-8')
+    (tmp_path / 'blog-index-0004.json').write_text('{}', encoding='utf-8')
+    assert load_index(str(tmp_path)) == {item['id']: item for item in entries}
+    assert stale_index_files(str(tmp_path), build_index_files(entries, shard_size=3)) == \
+        ['blog-index-0003.json', 'blog-index-0004.json']
+
+
+def test_unreadable_index_loads_as_none(tmp_path):
+    assert load_index(str(tmp_path)) is None
+    (tmp_path / INDEX_NAME).write_text('{"posts": [', encoding='utf-8')
+    assert load_index(str(tmp_path)) is None
+
+
+def test_runs_keep_the_index_up_to_date(write_export, tmp_path, capsys):
+    posts = [export_post('1', "Shipper's guide", "<p>It's about C:\\freight.</p>"),
+             export_post('2', 'Second post', date='2025-10-11 09:00:00')]
+    run(write_export, tmp_path, posts)
+    index = load_index(str(tmp_path / 'blog'))
+    assert index['1']['description'] == "It's about C:\\freight"
+    assert [item['slug'] for item in sort_entries(index.values())] == ['second-post', 'shippers-guide']
+
+    # Skipped posts keep their entries; removed posts lose theirs
+    posts = posts[:1] + [export_post('3', 'Third post')]
+    assert run(write_export, tmp_path, posts)['processed'] == 1
+    assert sorted(load_index(str(tmp_path / 'blog'))) == ['1', '3']
+
+    run(write_export, tmp_path, posts, '--index-shard-size', '1')
+    assert os.path.exists(tmp_path / 'blog' / 'blog-index-0002.json')
+    run(write_export, tmp_path, posts[:1])
+    assert not os.path.exists(tmp_path / 'blog' / 'blog-index-0001.json')
+    assert sorted(load_index(str(tmp_path / 'blog'))) == ['1']
+    capsys.readouterr()
@@ -0,0 +1,109 @@
+"""The conversion cache, and the runs that read and fill it."""
+
+import pytest
+
+from wordpress_mdx import cache as cache_module
+from wordpress_mdx.cache import ConversionCache, cache_key
+from wordpress_mdx.cli import cache_main
+from wordpress_mdx.engines import ENGINES
+from wordpress_mdx.pipeline import convert_post
+
+
+POST = {'id': '1', 'Title': 'A post', 'Content': '<p>Some <strong>text</strong></p>',
+        'Date': '2025-10-10 09:00:00'}
+
+
+@pytest.fixture
+def counted_engine(monkeypatch):
+    """Count the calls to the regex engine."""
+    calls = []
+    convert = ENGINES['regex']
+
+    def counting(html_content):
+        calls.append(html_content)
+        return convert(html_content)
+
+    monkeypatch.setitem(ENGINES, 'regex', counting)
+    return calls
+
+
+def test_cache_key_changes_with_content_engine_template_and_rules(monkeypatch):
+    key = cache_key('<p>x</p>', 'regex', 'blog-layout')
+    assert cache_key('<p>x</p>', 'regex', 'blog-layout') == key
+    assert cache_key('<p>y</p>', 'regex', 'blog-layout') != key
+    assert cache_key('<p>x</p>', 'tokenizer', 'blog-layout') != key
+    assert cache_key('<p>x</p>', 'regex', 'article') != key
+    monkeypatch.setattr(cache_module, 'RULES_VERSION', 'next')
+    assert cache_key('<p>x</p>', 'regex', 'blog-layout') != key
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'sub' / 'cache.sqlite'))
+    assert cache.get('missing') is None
+    cache.put('k', 'regex', 'blog-layout', 'Some **text**', 'Some text')
+    assert tuple(cache.get('k')) == ('Some **text**', 'Some text')
+    stats = cache.stats()
+    assert stats['entries'] == 1 and stats['hits'] == 1
+    assert stats['size'] == len('Some **text**') + len('Some text')
+    cache.close()
+
+
+def test_prune_evicts_least_recently_used_first(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache.sqlite'))
+    for key in ('old', 'middle', 'new'):
+        cache.put(key, 'regex', 'blog-layout', 'x' * 100, '')
+    cache.db.execute("UPDATE entries SET last_used = CASE key WHEN 'old' THEN 1 "
+                     "WHEN 'middle' THEN 2 ELSE 3 END")
+    assert cache.prune(max_size=250) == 1
+    assert cache.get('old') is None
+    assert cache.get('middle') and cache.get('new')
+    assert cache.prune(max_size=300) == 0
+    cache.close()
+
+
+def test_prune_stale_removes_other_rules_versions(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache.sqlite'))
+    cache.put('current', 'regex', 'blog-layout', 'x', '')
+    cache.put('stale', 'regex', 'blog-layout', 'y', '')
+    cache.db.execute("UPDATE entries SET rules_version = 'old' WHERE key = 'stale'")
+    assert cache.prune(stale=True) == 1
+    assert cache.get('current') and cache.get('stale') is None
+    cache.close()
+
+
+def test_cache_command_prunes_and_clears(tmp_path, capsys):
+    path = str(tmp_path / 'cache.sqlite')
+    assert cache_main(['--cache', path]) is None
+
+    cache = ConversionCache(path)
+    cache.put('a', 'regex', 'blog-layout', 'x' * 1024, '')
+    cache.put('b', 'regex', 'article', 'y', '')
+    cache.close()
+
+    assert cache_main(['--cache', path])['entries'] == 2
+    assert cache_main(['--cache', path, 'prune', '--max-size', '0.0005'])['entries'] == 1
+    assert cache_main(['--cache', path, 'clear'])['entries'] == 0
+    assert 'Evicted 1 entries' in capsys.readouterr().out
+
+
+def test_warm_cache_skips_the_engine(tmp_path, counted_engine):
+    path = str(tmp_path / 'cache.sqlite')
+    cold = convert_post(POST, 'regex', cache=path)
+    assert not cold['cached'] and len(counted_engine) == 1
+
+    warm = convert_post(POST, 'regex', cache=path)
+    assert warm['cached'] and len(counted_engine) == 1
+    assert warm['mdx'] == cold['mdx']
+
+    # Another template reuses nothing
+    assert not convert_post(POST, 'regex', template='article', cache=path)['cached']
+    assert len(counted_engine) == 2
+
+
+def test_refresh_converts_again_and_still_fills_the_cache(tmp_path, counted_engine):
+    path = str(tmp_path / 'cache.sqlite')
+    assert not convert_post(POST, 'regex', cache=path, refresh=True)['cached']
+    assert not convert_post(POST, 'regex', cache=path, refresh=True)['cached']
+    assert len(counted_engine) == 2
+    assert convert_post(POST, 'regex', cache=path)['cached']
+    assert len(counted_engine) == 2
@@ -0,0 +1,51 @@
+"""The two conversion scripts share the package's command line."""
+
+import importlib.util
+import json
+import os
+
+from wordpress_mdx.cli import main, parse_args
+from wordpress_mdx.redirects import REPO_ROOT
+
+
+POST = {'id': '1', 'Title': 'A post', 'Date': '2025-10-10 09:00:00',
+        'Content': '<!-- wp:paragraph --><p>Some <strong>text</strong>.</p><!-- /wp:paragraph -->'}
+
+
+def load_script(path):
+    spec = importlib.util.spec_from_file_location('migrate_blog_posts', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_defaults_point_into_the_repository():
+    args = parse_args([])
+    assert args.xml == os.path.join(REPO_ROOT, 'Rules', 'Posts Export Oct 16 2025.xml')
+    assert args.target_dir == os.path.join(REPO_ROOT, 'src', 'app', 'blog')
+    assert (args.engine, args.template) == ('regex', 'blog-layout')
+
+
+def options(xml, tmp_path):
+    return ['--xml', xml, '--target-dir', str(tmp_path / 'blog'), '--public-dir', str(tmp_path / 'public'),
+            '--no-redirects', '--no-image-sizes', '--no-feeds', '--no-progress', '--no-cache', '--jobs', '1']
+
+
+def test_convert_script_writes_blog_layout_pages(write_export, tmp_path, capsys):
+    summary = main(options(write_export([POST]), tmp_path))
+    assert [post['slug'] for post in summary['created_posts']] == ['a-post']
+    page = (tmp_path / 'blog' / 'a-post' / 'page.mdx').read_text(encoding='utf-8')
+    assert 'export const metadata' in page
+    assert 'Some **text**.' in page
+    capsys.readouterr()
+
+
+def test_migrate_script_writes_article_pages_and_a_summary(write_export, tmp_path, capsys):
+    script = load_script(os.path.join(REPO_ROOT, 'Rules', 'migrate_blog_posts.py'))
+    script.main(options(write_export([POST]), tmp_path))
+    page = (tmp_path / 'blog' / 'a-post' / 'page.mdx').read_text(encoding='utf-8')
+    assert 'export const article' in page
+    assert 'Some **text**.' in page
+    summary = json.loads((tmp_path / 'blog' / 'migration_summary.json').read_text(encoding='utf-8'))
+    assert summary['total_created'] == 1 and summary['total_issues'] == 0
+    assert 'Summary saved to:' in capsys.readouterr().out
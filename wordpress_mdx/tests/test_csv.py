@@ -0,0 +1,74 @@
+"""Reading the CSV export and joining its SEO columns to the XML posts."""
+
+import os
+
+import pytest
+
+from wordpress_mdx.cli import main
+from wordpress_mdx.export import SEO_COLUMNS, iter_csv_posts, iter_posts, join_seo, load_seo_index
+from wordpress_mdx.redirects import REPO_ROOT
+
+
+BUNDLED_CSV = os.path.join(REPO_ROOT, 'Rules', 'Posts Export Oct 23 2025 (1).csv')
+
+CSV = ('﻿id,Title,Content,_seopress_titles_title,_seopress_titles_desc,Permalink\n'
+       '1,One,"<p>First line</p>\n\n<p>A ""quoted"" line</p>",SEO one,Described one,'
+       'https://www.crexpressinc.com/one/\n'
+       '2,Two,<p>Two</p>,,,https://www.crexpressinc.com/two/\n'
+       '9,Nine,<p>Nine</p>,,,https://www.crexpressinc.com/nine/\n')
+
+
+@pytest.fixture
+def csv_export(tmp_path):
+    path = tmp_path / 'export.csv'
+    path.write_text(CSV, encoding='utf-8')
+    return str(path)
+
+
+def test_rows_span_lines_inside_quotes(csv_export):
+    rows = list(iter_csv_posts(csv_export))
+    assert [row['id'] for row in rows] == ['1', '2', '9']
+    assert rows[0]['Content'] == '<p>First line</p>\n\n<p>A "quoted" line</p>'
+
+
+def test_seo_index_keeps_only_the_seo_columns(csv_export):
+    index = load_seo_index(csv_export)
+    assert set(index) == {'1', '2', '9'}
+    assert index['1'] == {'_seopress_titles_title': 'SEO one', '_seopress_titles_desc': 'Described one',
+                          'Permalink': 'https://www.crexpressinc.com/one/'}
+    assert all(set(row) == set(SEO_COLUMNS) for row in index.values())
+
+
+def test_join_prefers_non_empty_csv_values_and_leaves_unmatched_rows(csv_export):
+    index = load_seo_index(csv_export)
+    records = [{'id': '1', '_seopress_titles_title': 'XML title'},
+               {'id': '2', '_seopress_titles_desc': 'XML description'},
+               {'id': '3', 'Title': 'Only in XML'}]
+    joined = list(join_seo(records, index))
+    assert joined[0]['_seopress_titles_title'] == 'SEO one'
+    assert joined[1]['_seopress_titles_desc'] == 'XML description'
+    assert joined[1]['Permalink'] == 'https://www.crexpressinc.com/two/'
+    assert joined[2] is records[2]
+    assert list(index) == ['9']
+
+
+def test_bundled_exports_join_by_id(bundled_export):
+    if not os.path.exists(BUNDLED_CSV):
+        pytest.skip('the bundled CSV export is not in this checkout')
+    index = load_seo_index(BUNDLED_CSV)
+    ids = [fields['id'] for fields in iter_posts(bundled_export)]
+    assert set(ids) <= set(index)
+    joined = list(join_seo(iter_posts(bundled_export), index))
+    assert any(fields.get('_seopress_titles_desc') for fields in joined)
+
+
+def test_csv_option_uses_the_seo_description(write_export, csv_export, tmp_path, capsys):
+    xml = write_export([{'id': '1', 'Title': 'One', 'Content': '<p>Body text of the post.</p>'}])
+    main(['--xml', xml, '--csv', csv_export, '--target-dir', str(tmp_path / 'blog'),
+          '--public-dir', str(tmp_path / 'public'), '--no-redirects', '--no-image-sizes', '--no-feeds',
+          '--no-progress', '--no-cache', '--jobs', '1'])
+    page = (tmp_path / 'blog' / 'one' / 'page.mdx').read_text(encoding='utf-8')
+    assert "description: 'Described one'" in page
+    out = capsys.readouterr().out
+    assert 'These CSV rows have no post in the XML export' in out
+    assert '- ID 9: https://www.crexpressinc.com/nine/' in out
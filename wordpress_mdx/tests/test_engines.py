@@ -0,0 +1,122 @@
+"""The regex and tokenizer engines produce the same markdown."""
+
+import random
+import time
+
+import pytest
+
+from wordpress_mdx.engines import ENGINES, PARITY_ENGINES
+from wordpress_mdx.export import iter_posts
+from wordpress_mdx.pipeline import compare_engines
+
+
+def test_engines_agree_on_every_post_of_the_bundled_export(bundled_export):
+    posts = list(iter_posts(bundled_export))
+    assert posts
+    for fields in posts:
+        content = fields.get('Content') or ''
+        outputs = {name: ENGINES[name](content) for name in PARITY_ENGINES}
+        assert len(set(outputs.values())) == 1, fields.get('id')
+
+
+def test_compare_engines_reports_no_mismatches(bundled_export, capsys):
+    assert compare_engines(bundled_export) == []
+    assert '0 post(s) with differing output' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('html', [
+    '<p>Plain <strong>bold</strong> and <em>italic</em> text.</p>',
+    '<h2>Heading</h2><p>See <a href="https://example.com/a?b=1&amp;c=2">the link</a>.</p>',
+    '<ul><li>One<ul><li>Nested</li></ul></li><li>Two</li></ul>',
+    '<ol><li>First</li><li>Second</li></ol>',
+    '<table><tr><th>A</th><th>B</th></tr><tr><td>1</td><td>2</td></tr></table>',
+    '<figure><img src="/images/a.png" alt="An image"><figcaption>Caption</figcaption></figure>',
+    '<!-- wp:paragraph --><p>Block &amp; entities &#8217; &nbsp;</p><!-- /wp:paragraph -->',
+    '<blockquote><p>Quoted</p></blockquote><hr><p>After</p>',
+])
+def test_engines_agree_on_common_markup(html):
+    outputs = {name: ENGINES[name](html) for name in PARITY_ENGINES}
+    assert len(set(outputs.values())) == 1, outputs
+
+
+@pytest.mark.parametrize('html', [
+    # Elements of different rules that overlap, as first-close pairing makes them
+    '<blockquote><ul><li>a.b<blockquote>foo</blockquote></li></ul></blockquote>',
+    '<blockquote><ol><li>&amp; x<h2>a.b</h2></li></ol></blockquote>',
+    '<p><em><strong><em>foo</em></strong></em></p>',
+    '<ul><li><a href="/a">one<ul><li>two</a></li></ul></li></ul>',
+    '<blockquote><p>a</p><table><tr><td>x<blockquote>y</blockquote></td></tr></table></blockquote>',
+    '<h2><strong>a</h2></strong><h2>b</h2>',
+    '<ol><li>a<ol><li>b</li></ol><li>c</ul></li></ol>',
+    '<table><tr><td>a|b<br>c</td><td><ul><li>x</li></ul></td></tr></table>',
+    '<sup>[1]</sup><sup>2<sup>3</sup></sup><sup class="c">[4]</sup>',
+    # Prefixes the patterns also match: <br> opens a b element, <img> an i element
+    'x<br>y<b>z</b> <img src="/a.png">c<i>d</i>',
+    # Newlines inside a quoted tag, a stray '<' and tags never closed
+    '<blockquote>a<img\nsrc="x">b</blockquote>',
+    'a < b <em>c</em> d > e',
+    '<ul><li>open<blockquote>quote<em>never closed',
+])
+def test_engines_agree_on_nested_blocks_and_inline_markup(html):
+    outputs = {name: ENGINES[name](html) for name in PARITY_ENGINES}
+    assert len(set(outputs.values())) == 1, outputs
+
+
+WORDS = ['a.b', 'foo', '&amp; x', 'bar baz', 'fox', '10 | 20', 'x\ny', '[1]']
+BLOCKS = ['p', 'blockquote', 'ul', 'ol', 'h2', 'h3', 'div', 'table', 'figure', 'pre']
+INLINE = ['em', 'strong', 'b', 'i', 'a', 'code', 'span', 'sup', 'br', 'img']
+
+
+def _inline(rng, depth):
+    out = []
+    for _ in range(rng.randint(1, 3)):
+        tag = rng.choice(INLINE)
+        if rng.random() < 0.5 or depth > 3:
+            out.append(rng.choice(WORDS))
+        elif tag == 'br':
+            out.append('<br>')
+        elif tag == 'img':
+            out.append(f'<img src="/i{rng.randint(1, 9)}.png" alt="{rng.choice(WORDS[:4])}">')
+        elif tag == 'a':
+            out.append(f'<a href="/p{rng.randint(1, 9)}">{_inline(rng, depth + 1)}</a>')
+        else:
+            out.append(f'<{tag}>{_inline(rng, depth + 1)}</{tag}>')
+    return ''.join(out)
+
+
+def _block(rng, depth):
+    tag = rng.choice(BLOCKS) if depth < 4 else 'p'
+    if tag in ('ul', 'ol'):
+        items = ''.join(
+            f'<li>{_inline(rng, depth) if rng.random() < 0.6 else _block(rng, depth + 1)}'
+            f'{_block(rng, depth + 1) if rng.random() < 0.3 else ""}</li>'
+            for _ in range(rng.randint(1, 3))
+        )
+        return f'<{tag}>{items}</{tag}>'
+    if tag == 'table':
+        rows = ''.join('<tr>' + ''.join(f'<td>{_inline(rng, depth)}</td>' for _ in range(2)) + '</tr>'
+                       for _ in range(2))
+        return f'<table><tbody>{rows}</tbody></table>'
+    if tag in ('blockquote', 'div', 'figure'):
+        inner = ''.join(_block(rng, depth + 1) if rng.random() < 0.5 else _inline(rng, depth)
+                        for _ in range(rng.randint(1, 3)))
+        return f'<{tag}>{inner}</{tag}>'
+    if tag == 'pre':
+        return f'<pre><code>{rng.choice(WORDS)}</code></pre>'
+    return f'<{tag}>{_inline(rng, depth)}</{tag}>'
+
+
+def test_engines_agree_on_generated_posts():
+    for seed in range(500):
+        rng = random.Random(seed)
+        html = '\n'.join(_block(rng, 0) for _ in range(rng.randint(1, 6)))
+        outputs = {name: ENGINES[name](html) for name in PARITY_ENGINES}
+        assert len(set(outputs.values())) == 1, (seed, html)
+
+
+@pytest.mark.parametrize('repeated', ['<img src="a" ', '<a href="x">', '<li x ', '<p ', '<!-- wp:x '])
+def test_tokenizer_converts_unclosed_tags_in_linear_time(repeated):
+    # The attributes of every unclosed tag used to be searched to the end of the post
+    started = time.perf_counter()
+    ENGINES['tokenizer'](repeated * 20000)
+    assert time.perf_counter() - started < 5
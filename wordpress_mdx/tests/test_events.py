@@ -0,0 +1,176 @@
+"""The event log, checkpoints, and resuming an interrupted run."""
+
+import os
+from collections import deque
+
+import pytest
+
+from wordpress_mdx import cli
+from wordpress_mdx.events import (EVENTS_NAME, Checkpoints, EventLog, interrupted_run, merge_resumed,
+                                  read_events, resume_posts)
+from wordpress_mdx.output import OutputWriter
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_read_events_skips_a_torn_line(tmp_path):
+    path = str(tmp_path / EVENTS_NAME)
+    with EventLog(path) as log:
+        log.write('run', staging='s')
+        log.write('post', id='1', status='converted')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "post", "id": "2", "sta')
+    assert [record.get('id') for record in read_events(path)] == [None, '1']
+    assert list(read_events(str(tmp_path / 'missing.ndjson'))) == []
+
+
+def test_interrupted_run(tmp_path):
+    path = str(tmp_path / EVENTS_NAME)
+    with EventLog(path) as log:
+        log.write('run', staging='first')
+        log.write('post', id='1', status='converted')
+        log.write('done')
+        log.write('run', staging='second')
+        log.write('post', id='2', status='converted')
+        log.write('post', id='3', status='failed')
+    run, completed = interrupted_run(path)
+    assert run['staging'] == 'second'
+    assert sorted(completed) == ['2']
+
+    # A resumed run carries on the run it resumes
+    with EventLog(path, append=True) as log:
+        log.write('run', staging='second', resumed=True)
+        log.write('post', id='2', status='resumed')
+        log.write('post', id='4', status='converted')
+    run, completed = interrupted_run(path)
+    assert run['resumed'] and sorted(completed) == ['2', '4']
+
+    with EventLog(path, append=True) as log:
+        log.write('done')
+    assert interrupted_run(path) == (None, {})
+
+
+def test_checkpoints_round_trip(tmp_path):
+    staging = str(tmp_path / 'staging')
+    with Checkpoints(staging) as checkpoints:
+        checkpoints.save({'id': '1', 'slug': 'a', 'mdx': 'page'}, {'slug': 'a', 'v': 1})
+        checkpoints.save({'id': '1', 'slug': 'a', 'mdx': 'page'}, {'slug': 'a', 'v': 2})
+        checkpoints.save({'id': '2', 'slug': 'b', 'mdx': 'page'}, {'slug': 'b'})
+    with open(checkpoints.path, 'ab') as f:
+        f.write(b'{"id": "3", "manif')
+
+    checkpoints = Checkpoints(staging)
+    assert checkpoints.load('1') == {'id': '1', 'manifest': {'slug': 'a', 'v': 2},
+                                     'result': {'id': '1', 'slug': 'a', 'mdx': None}}
+    assert checkpoints.load('2')['manifest'] == {'slug': 'b'}
+    assert checkpoints.load('3') is None
+
+
+def test_staged_files_are_kept_for_a_resumed_writer(tmp_path):
+    target_dir = str(tmp_path / 'blog')
+    staging = str(tmp_path / '.blog-staging')
+    with pytest.raises(Interrupted):
+        with OutputWriter(target_dir, staging_dir=staging) as writer:
+            writer.stage('a', 'page a')
+            raise Interrupted
+    assert not os.path.exists(target_dir)
+
+    with OutputWriter(target_dir, staging_dir=staging) as writer:
+        assert writer.adopt(os.path.join('a', 'page.mdx'))
+        assert not writer.adopt(os.path.join('b', 'page.mdx'))
+        assert writer.publish() == 1
+    with open(os.path.join(target_dir, 'a', 'page.mdx'), encoding='utf-8') as f:
+        assert f.read() == 'page a'
+    assert not os.path.exists(staging)
+
+
+class FakeWriter:
+    def __init__(self, staged):
+        self.staged = staged
+
+    def adopt(self, relative):
+        return relative.split(os.sep)[0] in self.staged
+
+
+class FakeCheckpoints:
+    def __init__(self, checkpoints):
+        self.checkpoints = checkpoints
+
+    def load(self, post_id):
+        return self.checkpoints.get(post_id)
+
+
+def checkpoint(post_id, write='created'):
+    return {'id': post_id, 'manifest': {'slug': post_id},
+            'result': {'id': post_id, 'slug': post_id, 'write': write}}
+
+
+@pytest.mark.parametrize('read_ahead', [0, 1, 3, 100])
+def test_resume_keeps_the_order_of_the_export(read_ahead):
+    ids = [str(n) for n in range(12)]
+    records = [{'id': post_id} for post_id in ids]
+    current = {post_id: {'slug': post_id} for post_id in ids}
+    # 5 changed since it was converted; 7 is no longer staged; 9 was unchanged on disk
+    done = ['0', '1', '4', '5', '7', '9', '10', '11']
+    saved = {post_id: checkpoint(post_id, 'unchanged' if post_id == '9' else 'created') for post_id in done}
+    saved['5']['manifest'] = {'slug': 'old'}
+    completed = {post_id: {'id': post_id} for post_id in done}
+    writer = FakeWriter({'0', '1', '4', '5', '10', '11'})
+
+    restored = deque()
+    converting = deque()
+    records = resume_posts(iter(records), completed, FakeCheckpoints(saved), current, writer, restored,
+                           converting)
+
+    def results():
+        # Like a worker pool, read records ahead of the results returned
+        pending = deque()
+        for fields in records:
+            pending.append({'id': fields['id']})
+            if len(pending) > read_ahead:
+                yield pending.popleft()
+        yield from pending
+
+    merged = list(merge_resumed(results(), restored, converting))
+    assert [result['id'] for result in merged] == ids
+    assert [result['id'] for result in merged if result.get('resumed')] == ['0', '1', '4', '9', '10', '11']
+
+
+# The interrupted run leaves its event log and checkpoints open, as a killed process would
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnraisableExceptionWarning')
+def test_resumed_run_matches_an_uninterrupted_one(bundled_export, tmp_path, monkeypatch, capsys):
+    def argv(target_dir):
+        return ['--xml', bundled_export, '--target-dir', str(target_dir),
+                '--public-dir', str(tmp_path / 'public'), '--no-redirects', '--no-image-sizes',
+                '--no-feeds', '--no-progress', '--jobs', '1']
+
+    fresh = cli.main(argv(tmp_path / 'fresh'))
+
+    write_result = cli.write_result
+    written = []
+
+    def interrupt_after_five(result, writer):
+        if len(written) == 5:
+            raise Interrupted
+        written.append(result['id'])
+        return write_result(result, writer)
+
+    monkeypatch.setattr(cli, 'write_result', interrupt_after_five)
+    with pytest.raises(Interrupted):
+        cli.main(argv(tmp_path / 'blog'))
+    monkeypatch.setattr(cli, 'write_result', write_result)
+    assert not os.path.exists(tmp_path / 'blog' / 'conversion_manifest.json')
+
+    resumed = cli.main(argv(tmp_path / 'blog') + ['--resume'])
+    assert resumed['resumed'] == 5
+    assert resumed['processed'] == fresh['processed']
+    for post in fresh['created_posts']:
+        slug = post['slug']
+        with open(tmp_path / 'fresh' / slug / 'page.mdx', encoding='utf-8') as expected, \
+                open(tmp_path / 'blog' / slug / 'page.mdx', encoding='utf-8') as actual:
+            assert actual.read() == expected.read(), slug
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.blog-staging-')]
+    assert interrupted_run(str(tmp_path / 'blog' / EVENTS_NAME)) == (None, {})
+    capsys.readouterr()
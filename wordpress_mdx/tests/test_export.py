@@ -0,0 +1,64 @@
+"""Streaming the posts of a WordPress export."""
+
+import io
+import tracemalloc
+
+from wordpress_mdx.export import count_posts, iter_posts
+
+
+class CountingFile(io.FileIO):
+    """A file that counts the bytes read from it."""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        count = super().readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+
+def posts(count, content_size=1000):
+    return [{'id': str(i), 'Title': f'Post {i}', 'Content': f'<p>{"x" * content_size}</p>'}
+            for i in range(count)]
+
+
+def test_records_map_child_tags_to_their_text(tmp_path):
+    path = tmp_path / 'export.xml'
+    path.write_text('<data><post><id>1</id><Title>One</Title><Slug/><Title>Second</Title></post>'
+                    '<post><id>2</id></post></data>', encoding='utf-8')
+    assert list(iter_posts(str(path))) == [
+        {'id': '1', 'Title': 'One', 'Slug': None},
+        {'id': '2'},
+    ]
+
+
+def test_first_post_is_yielded_before_the_export_is_read(write_export):
+    path = write_export(posts(2000))
+    with CountingFile(path) as f:
+        records = iter_posts(f)
+        assert next(records)['id'] == '0'
+        assert f.bytes_read < len(open(path, 'rb').read()) / 10
+
+
+def test_memory_does_not_grow_with_the_export(write_export):
+    path = write_export(posts(4000))
+    tracemalloc.start()
+    try:
+        for _ in iter_posts(path):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The whole tree of this 4 MB export would take several times its size
+    assert peak < 1024 * 1024
+
+
+def test_count_posts_counts_tags_across_chunk_boundaries(write_export):
+    path = write_export(posts(50, content_size=10))
+    assert count_posts(path, chunk_size=7) == 50
+    assert count_posts(path) == 50
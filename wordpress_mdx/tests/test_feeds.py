@@ -0,0 +1,117 @@
+"""The RSS and Atom feeds and the sitemap of the blog."""
+
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from wordpress_mdx.feeds import (ATOM_NAME, FEED_ENTRIES, RSS_NAME, SITEMAP_NAME, post_datetime,
+                                 stage_feeds, stale_feed_files)
+from wordpress_mdx.output import OutputWriter
+
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+SITEMAP = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+SITE = 'https://www.example.com'
+
+
+def entry(number, date=None):
+    return {'id': str(number), 'slug': f'post-{number}', 'title': f'Post {number} & more',
+            'date': date or f'2025-01-{number:02d} 08:30:00', 'description': f'About <{number}>'}
+
+
+def stage(feeds_dir, entries, **options):
+    with OutputWriter(str(feeds_dir)) as writer:
+        statuses = stage_feeds(writer, entries, SITE, **options)
+        writer.publish()
+    return statuses
+
+
+def parse(path):
+    return ET.parse(str(path)).getroot()
+
+
+def test_feeds_list_the_newest_posts_first(tmp_path):
+    entries = [entry(number) for number in range(1, FEED_ENTRIES + 6)]
+    statuses = stage(tmp_path, reversed(entries), path='/feeds')
+    assert statuses == {RSS_NAME: 'created', ATOM_NAME: 'created'}
+    assert not os.path.exists(tmp_path / SITEMAP_NAME)
+
+    channel = parse(tmp_path / RSS_NAME).find('channel')
+    items = channel.findall('item')
+    assert len(items) == FEED_ENTRIES
+    assert [item.findtext('link') for item in items[:2]] == [
+        f'{SITE}/blog/post-{FEED_ENTRIES + 5}', f'{SITE}/blog/post-{FEED_ENTRIES + 4}']
+    assert items[0].findtext('title') == f'Post {FEED_ENTRIES + 5} & more'
+    assert items[0].findtext('description') == f'About <{FEED_ENTRIES + 5}>'
+    assert items[0].findtext('pubDate') == 'Sat, 25 Jan 2025 08:30:00 +0000'
+    assert channel.find(f'{ATOM}link').get('href') == f'{SITE}/feeds/{RSS_NAME}'
+
+    feed = parse(tmp_path / ATOM_NAME)
+    assert feed.findtext(f'{ATOM}updated') == '2025-01-25T08:30:00Z'
+    assert [link.get('href') for link in feed.findall(f'{ATOM}link')] == [
+        f'{SITE}/blog', f'{SITE}/feeds/{ATOM_NAME}']
+    entries = feed.findall(f'{ATOM}entry')
+    assert len(entries) == FEED_ENTRIES
+    assert entries[0].findtext(f'{ATOM}id') == f'{SITE}/blog/post-{FEED_ENTRIES + 5}'
+
+
+def test_unchanged_feeds_are_not_rewritten(tmp_path):
+    entries = [entry(1), entry(2)]
+    stage(tmp_path, entries)
+    assert stage(tmp_path, entries) == {RSS_NAME: 'unchanged', ATOM_NAME: 'unchanged'}
+    assert stage(tmp_path, entries + [entry(3)])[RSS_NAME] == 'updated'
+
+
+def test_empty_feeds_are_valid(tmp_path):
+    stage(tmp_path, [], sitemap=True)
+    assert parse(tmp_path / RSS_NAME).find('channel').findall('item') == []
+    assert parse(tmp_path / ATOM_NAME).findtext(f'{ATOM}updated') == '1970-01-01T00:00:00Z'
+    assert parse(tmp_path / SITEMAP_NAME).findall(f'{SITEMAP}url') == []
+
+
+def test_sitemap_lists_every_post_oldest_first(tmp_path):
+    entries = [entry(3), entry(1), entry(2, 'not a date')]
+    statuses = stage(tmp_path, entries, sitemap=True)
+    assert statuses[SITEMAP_NAME] == 'created'
+
+    urls = parse(tmp_path / SITEMAP_NAME).findall(f'{SITEMAP}url')
+    assert [url.findtext(f'{SITEMAP}loc') for url in urls] == [
+        f'{SITE}/blog/post-1', f'{SITE}/blog/post-3', f'{SITE}/blog/post-2']
+    assert [url.findtext(f'{SITEMAP}lastmod') for url in urls] == ['2025-01-01', '2025-01-03', None]
+
+
+def test_sitemap_past_the_limit_is_sharded(tmp_path):
+    entries = [entry(number) for number in range(1, 6)]
+    statuses = stage(tmp_path, entries, sitemap=True, sitemap_limit=2, path='/feeds')
+    shards = ['sitemap-blog-0001.xml', 'sitemap-blog-0002.xml', 'sitemap-blog-0003.xml']
+    assert sorted(statuses) == sorted(shards + [SITEMAP_NAME, RSS_NAME, ATOM_NAME])
+
+    index = parse(tmp_path / SITEMAP_NAME)
+    assert index.tag == f'{SITEMAP}sitemapindex'
+    assert [sitemap.findtext(f'{SITEMAP}loc') for sitemap in index] == [
+        f'{SITE}/feeds/{shard}' for shard in shards]
+    assert [sitemap.findtext(f'{SITEMAP}lastmod') for sitemap in index] == [
+        '2025-01-02', '2025-01-04', '2025-01-05']
+    assert [len(parse(tmp_path / shard)) for shard in shards] == [2, 2, 1]
+
+    # Fewer posts need fewer shards; the shards left over are stale
+    statuses = stage(tmp_path, entries[:3], sitemap=True, sitemap_limit=2, path='/feeds')
+    assert stale_feed_files(str(tmp_path), statuses) == ['sitemap-blog-0003.xml']
+    statuses = stage(tmp_path, entries[:3], sitemap=True, path='/feeds')
+    assert stale_feed_files(str(tmp_path), statuses) == shards
+    assert stale_feed_files(str(tmp_path / 'missing'), statuses) == []
+
+
+@pytest.mark.parametrize('date, expected', [
+    ('2025-10-10', '2025-10-10T00:00:00+00:00'),
+    ('2025-10-10 09:15', '2025-10-10T09:15:00+00:00'),
+    ('2025-10-10T09:15:30', '2025-10-10T09:15:30+00:00'),
+])
+def test_post_datetime(date, expected):
+    assert post_datetime(date).isoformat() == expected
+
+
+@pytest.mark.parametrize('date', [None, '', 'October 10, 2025', '2025-13-45'])
+def test_post_datetime_of_anything_else_is_none(date):
+    assert post_datetime(date) is None
@@ -0,0 +1,96 @@
+"""Reading image sizes from file headers, and the figures sized images get."""
+
+import struct
+
+import pytest
+
+from wordpress_mdx.audit import find_html_tags
+from wordpress_mdx.images import public_file, read_image_size, size_images
+
+
+def png(width, height):
+    return (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR'
+            + struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0) + b'\0' * 4)
+
+
+def gif(width, height, version=b'GIF89a'):
+    return version + struct.pack('<HH', width, height) + b'\0' * 20
+
+
+def webp(chunk, payload):
+    payload = payload.ljust(18, b'\0')
+    return b'RIFF' + struct.pack('<I', 4 + 8 + len(payload)) + b'WEBP' + chunk \
+        + struct.pack('<I', len(payload)) + payload
+
+
+def exif(orientation, order=b'II'):
+    """An APP1 Exif segment holding only an orientation tag."""
+    fmt = '<' if order == b'II' else '>'
+    tiff = (order + struct.pack(fmt + 'HI', 42, 8) + struct.pack(fmt + 'H', 1)
+            + struct.pack(fmt + 'HHIH', 0x0112, 3, 1, orientation) + b'\0\0'
+            + struct.pack(fmt + 'I', 0))
+    data = b'Exif\0\0' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(data) + 2) + data
+
+
+def jpeg(width, height, segments=b''):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\0\x01\x01\0\0\x01\0\x01\0\0'
+    sof = b'\xff\xc0' + struct.pack('>HBHHB', 17, 8, height, width, 3) + b'\x01\x22\0\x02\x11\x01\x03\x11\x01'
+    return b'\xff\xd8' + app0 + segments + sof + b'\xff\xda' + b'\0' * 16 + b'\xff\xd9'
+
+
+@pytest.mark.parametrize('data, size', [
+    (png(640, 480), (640, 480)),
+    (gif(12, 34), (12, 34)),
+    (gif(12, 34, b'GIF87a'), (12, 34)),
+    (webp(b'VP8 ', b'\0\0\0\x9d\x01\x2a' + struct.pack('<HH', 0x4000 | 300, 200)), (300, 200)),
+    (webp(b'VP8L', b'\x2f' + struct.pack('<I', (1023 - 1) | (767 - 1) << 14)), (1023, 767)),
+    (webp(b'VP8X', b'\x10\0\0\0' + (4000 - 1).to_bytes(3, 'little') + (3000 - 1).to_bytes(3, 'little')),
+     (4000, 3000)),
+    (jpeg(800, 600), (800, 600)),
+    (jpeg(800, 600, exif(1)), (800, 600)),
+    (jpeg(800, 600, exif(6)), (600, 800)),
+    (jpeg(800, 600, exif(8, b'MM')), (600, 800)),
+    (jpeg(800, 600, exif(3, b'MM')), (800, 600)),
+], ids=['png', 'gif89a', 'gif87a', 'webp-vp8', 'webp-vp8l', 'webp-vp8x', 'jpeg', 'jpeg-exif-1',
+        'jpeg-exif-6', 'jpeg-exif-8-big-endian', 'jpeg-exif-3'])
+def test_read_image_size(tmp_path, data, size):
+    path = tmp_path / 'image'
+    path.write_bytes(data)
+    assert read_image_size(str(path)) == size
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'<svg xmlns="http://www.w3.org/2000/svg"/>',
+    png(1, 1)[:20],
+    jpeg(800, 600)[:26],
+    b'\xff\xd8\xff\xda' + b'\0' * 40,
+    webp(b'VP8 ', b'\0' * 10)[:24],
+], ids=['empty', 'svg', 'short-png', 'short-jpeg', 'jpeg-without-frame', 'short-webp'])
+def test_read_image_size_of_anything_else_is_none(tmp_path, data):
+    path = tmp_path / 'image'
+    path.write_bytes(data)
+    assert read_image_size(str(path)) is None
+
+
+def test_read_image_size_of_missing_file_is_none(tmp_path):
+    assert read_image_size(str(tmp_path / 'missing.png')) is None
+
+
+def test_public_file_stays_inside_public_dir(tmp_path):
+    public = str(tmp_path)
+    assert public_file('/images/a%20b.png', public) == str(tmp_path / 'images' / 'a b.png')
+    assert public_file('https://www.crexpressinc.com/images/a.png', public) == str(tmp_path / 'images' / 'a.png')
+    assert public_file('https://example.com/images/a.png', public) is None
+    assert public_file('/../secret.png', public) is None
+    assert public_file('', public) is None
+
+
+def test_sized_figures_are_not_reported_as_html():
+    markdown = 'Intro\n\n![An "image"](/images/a.png)\n\nText with ![inline](/images/a.png) image.\n'
+    sized = size_images(markdown, {'/images/a.png': (640, 480)})
+    assert 'width={640} height={480}' in sized
+    assert 'alt="An &quot;image&quot;"' in sized
+    assert 'Text with ![inline](/images/a.png) image.' in sized
+    assert find_html_tags(sized) == []
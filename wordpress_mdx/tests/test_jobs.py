@@ -0,0 +1,38 @@
+"""Converting across a process pool with --jobs keeps the export order."""
+
+from wordpress_mdx.cli import main
+from wordpress_mdx.export import iter_posts
+from wordpress_mdx.pipeline import iter_chunks, iter_results
+
+
+def test_iter_chunks_groups_records():
+    assert list(iter_chunks(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_chunks([], 3)) == []
+
+
+def test_pool_results_come_back_in_export_order(bundled_export):
+    records = list(iter_posts(bundled_export))[:12]
+
+    def converted(jobs):
+        return [(result['id'], result['mdx'])
+                for result in iter_results(records, 'regex', jobs=jobs, chunk_size=2)]
+
+    serial = converted(1)
+    assert [post_id for post_id, _ in serial] == [fields['id'] for fields in records]
+    assert converted(3) == serial
+
+
+def test_log_and_pages_do_not_depend_on_the_number_of_jobs(bundled_export, tmp_path, capsys):
+    def run(jobs):
+        target = tmp_path / f'jobs-{jobs}'
+        summary = main(['--xml', bundled_export, '--target-dir', str(target / 'blog'),
+                        '--public-dir', str(target / 'public'), '--no-redirects', '--no-image-sizes',
+                        '--no-feeds', '--no-progress', '--no-cache', '--jobs', str(jobs),
+                        '--chunk-size', '3'])
+        log = [line for line in capsys.readouterr().out.splitlines() if line.startswith(('✓', '✗', '⚠'))]
+        pages = {path.relative_to(target): path.read_bytes() for path in (target / 'blog').rglob('page.mdx')}
+        return summary['processed'], log, pages
+
+    serial = run(1)
+    assert serial[0] > 0
+    assert run(4) == serial
@@ -0,0 +1,45 @@
+"""Converting nested lists with a stack of open lists."""
+
+import time
+
+import pytest
+
+from wordpress_mdx.engines import ENGINES, PARITY_ENGINES
+
+
+@pytest.mark.parametrize('html, markdown', [
+    ('<ul><li>a<ul><li>b<ol><li>c</li><li>d</li></ol></li></ul></li><li>e</li></ul>',
+     '- a\n  - b\n    1. c\n    2. d\n- e'),
+    # Sub-lists are indented under the text of the item's marker
+    ('<ol><li>one</li><li>two<ul><li>x</li></ul></li></ol>', '1. one\n2. two\n   - x'),
+    # A sub-list outside any <li> continues the previous item
+    ('<ul><li>a</li><ul><li>sub</li></ul><li>b</li></ul>', '- a\n  - sub\n- b'),
+    # A new <li> ends the previous item; text outside items is dropped
+    ('<ul><li>a<li>b</ul>', '- a\n- b'),
+    ('<ul>junk<li>a</li> more</ul>', '- a'),
+    ('<p>before</p><ul><li>open', 'before\nopen'),
+])
+@pytest.mark.parametrize('engine', PARITY_ENGINES)
+def test_nested_lists(engine, html, markdown):
+    assert ENGINES[engine](html) == markdown
+
+
+@pytest.mark.parametrize('engine', PARITY_ENGINES)
+def test_deeply_nested_list_is_indented_at_every_level(engine):
+    depth = 12
+    html = '<ul><li>item' * depth + '</li></ul>' * depth
+    lines = ENGINES[engine](html).split('\n')
+    assert lines == ['  ' * level + '- item' for level in range(depth)]
+
+
+@pytest.mark.parametrize('engine', PARITY_ENGINES)
+def test_list_conversion_grows_linearly(engine):
+    def seconds(items):
+        html = '<ul>' + '<li>a<ul><li>b<ol><li>c</li></ol></li></ul></li>' * items + '</ul>'
+        started = time.perf_counter()
+        ENGINES[engine](html)
+        return time.perf_counter() - started
+
+    seconds(1000)
+    # Four times the items; a rescan per list would take about sixteen times as long
+    assert seconds(20000) < 8 * seconds(5000) + 0.05
@@ -0,0 +1,91 @@
+"""The manifest incremental runs skip unchanged posts with."""
+
+import os
+
+from wordpress_mdx.cli import main
+from wordpress_mdx.manifest import (MANIFEST_NAME, find_orphans, iter_changed_posts, load_manifest,
+                                    manifest_entry, save_manifest)
+
+
+def post(post_id, title='A post', content='<p>Text</p>'):
+    return {'id': post_id, 'Title': title, 'Content': content, 'Date': '2025-10-10 09:00:00',
+            'Permalink': f'https://www.crexpressinc.com/{title.lower().replace(" ", "-")}-{post_id}/'}
+
+
+def write_page(target_dir, slug):
+    os.makedirs(os.path.join(target_dir, slug))
+    with open(os.path.join(target_dir, slug, 'page.mdx'), 'w', encoding='utf-8') as f:
+        f.write('page')
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / MANIFEST_NAME)
+    posts = {'1': manifest_entry(post('1'), 'v1'), '2': manifest_entry(post('2', 'Other'), 'v1')}
+    save_manifest(path, posts, ['gone'])
+    assert load_manifest(path) == (posts, ['gone'])
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_missing_or_broken_manifest_is_empty(tmp_path):
+    assert load_manifest(str(tmp_path / 'missing.json')) == ({}, [])
+    broken = tmp_path / MANIFEST_NAME
+    broken.write_text('{"posts": ')
+    assert load_manifest(str(broken)) == ({}, [])
+
+
+def test_manifest_entry_changes_with_content_and_converter():
+    entry = manifest_entry(post('1'), 'v1')
+    assert 'id' not in entry
+    assert manifest_entry(post('1'), 'v1') == entry
+    assert manifest_entry(post('1', content='<p>Edited</p>'), 'v1') != entry
+    assert manifest_entry(post('1'), 'v2') != entry
+    assert manifest_entry(post('1'), 'v1', asset_key=lambda fields: 'copied')['assets'] == 'copied'
+
+
+def test_iter_changed_posts_skips_unchanged_posts(tmp_path):
+    target_dir = str(tmp_path)
+    records = [post('1'), post('2', 'Other'), post('3', 'Third')]
+    previous = {}
+    for fields in records:
+        previous[fields['id']] = manifest_entry(fields, 'v1')
+    write_page(target_dir, previous['1']['slug'])
+    write_page(target_dir, previous['2']['slug'])
+    records[1] = post('2', 'Other', content='<p>Edited</p>')
+
+    current = {}
+    skipped = []
+    changed = list(iter_changed_posts(records, previous, current, target_dir, 'v1', skipped=skipped.append))
+    # 2 changed; 3 has no page on disk
+    assert [fields['id'] for fields in changed] == ['2', '3']
+    assert skipped == ['1']
+    assert sorted(current) == ['1', '2', '3']
+
+    changed = iter_changed_posts(records[:1], previous, {}, target_dir, 'v1', indexed={'2'})
+    assert [fields['id'] for fields in changed] == ['1']
+
+
+def test_find_orphans(tmp_path):
+    target_dir = str(tmp_path)
+    for slug in ('kept', 'renamed', 'known'):
+        os.makedirs(os.path.join(target_dir, slug))
+    previous = {'1': {'slug': 'kept'}, '2': {'slug': 'renamed'}, '3': {'slug': 'removed'}}
+    current = {'1': {'slug': 'kept'}, '2': {'slug': 'new-name'}}
+    assert find_orphans(previous, ['known'], current, target_dir) == ['known', 'renamed']
+
+
+def test_second_run_skips_every_post(bundled_export, tmp_path, capsys):
+    argv = ['--xml', bundled_export, '--target-dir', str(tmp_path / 'blog'),
+            '--public-dir', str(tmp_path / 'public'), '--no-redirects', '--no-image-sizes',
+            '--no-feeds', '--no-progress', '--jobs', '1']
+    first = main(argv)
+    assert first['processed'] > 0 and not first['errors']
+    posts, _ = load_manifest(str(tmp_path / 'blog' / MANIFEST_NAME))
+    assert len(posts) == first['processed']
+
+    second = main(argv)
+    assert second['processed'] == 0
+    assert second['skipped'] == first['processed']
+    assert load_manifest(str(tmp_path / 'blog' / MANIFEST_NAME))[0] == posts
+
+    assert main(argv + ['--force'])['writes']['unchanged'] == first['processed']
+    capsys.readouterr()
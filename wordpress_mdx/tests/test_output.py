@@ -0,0 +1,116 @@
+"""Staging output files and publishing them with atomic renames."""
+
+import os
+
+import pytest
+
+from wordpress_mdx import output
+from wordpress_mdx.cli import main
+from wordpress_mdx.output import OutputWriter
+
+
+class Interrupted(Exception):
+    pass
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_nothing_changes_until_publish(tmp_path):
+    target_dir = str(tmp_path / 'blog')
+    with OutputWriter(target_dir) as writer:
+        path, status = writer.stage('a', 'page a')
+        assert (path, status) == (os.path.join(target_dir, 'a', 'page.mdx'), 'created')
+        writer.stage_file('index.json', b'[]')
+        assert not os.path.exists(target_dir)
+        staging = writer.staging_dir
+        assert os.path.dirname(staging) == str(tmp_path)
+        assert writer.publish() == 2
+    assert read(path) == 'page a'
+    assert read(os.path.join(target_dir, 'index.json')) == '[]'
+    assert not os.path.exists(staging)
+
+
+def test_unchanged_files_are_not_rewritten(tmp_path):
+    target_dir = str(tmp_path / 'blog')
+    with OutputWriter(target_dir) as writer:
+        writer.stage('a', 'page a')
+        writer.stage('b', 'page b')
+        writer.publish()
+    before = os.stat(os.path.join(target_dir, 'a', 'page.mdx')).st_mtime_ns
+
+    with OutputWriter(target_dir) as writer:
+        assert writer.stage('a', 'page a')[1] == 'unchanged'
+        assert writer.stage('b', 'page b, edited')[1] == 'updated'
+        assert writer.publish() == 1
+    assert os.stat(os.path.join(target_dir, 'a', 'page.mdx')).st_mtime_ns == before
+    assert read(os.path.join(target_dir, 'b', 'page.mdx')) == 'page b, edited'
+
+
+def test_restaging_the_text_on_disk_supersedes_an_earlier_stage(tmp_path):
+    target_dir = str(tmp_path / 'blog')
+    with OutputWriter(target_dir) as writer:
+        writer.stage('a', 'page a')
+        writer.publish()
+    with OutputWriter(target_dir) as writer:
+        writer.stage('a', 'draft')
+        assert writer.stage('a', 'page a')[1] == 'unchanged'
+        assert writer.publish() == 0
+    assert read(os.path.join(target_dir, 'a', 'page.mdx')) == 'page a'
+
+
+def test_interrupted_writer_leaves_the_target_as_it_was(tmp_path):
+    target_dir = str(tmp_path / 'blog')
+    with OutputWriter(target_dir) as writer:
+        writer.stage('a', 'page a')
+        writer.publish()
+
+    with pytest.raises(Interrupted):
+        with OutputWriter(target_dir) as writer:
+            writer.stage('a', 'page a, edited')
+            writer.stage('b', 'page b')
+            staging = writer.staging_dir
+            raise Interrupted
+    assert read(os.path.join(target_dir, 'a', 'page.mdx')) == 'page a'
+    assert not os.path.exists(os.path.join(target_dir, 'b'))
+    assert not os.path.exists(staging)
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    target_dir = str(tmp_path / 'blog')
+    with OutputWriter(target_dir, dry_run=True) as writer:
+        assert writer.stage('a', 'page a')[1] == 'created'
+        assert writer.staging_dir is None
+        assert writer.publish() == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_fsync_batch_flushes_every_n_files(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(output, '_fsync_path', synced.append)
+    target_dir = str(tmp_path / 'blog')
+    with OutputWriter(target_dir, fsync_batch=2) as writer:
+        for slug in 'abc':
+            writer.stage(slug, f'page {slug}')
+        assert len(synced) == 2
+        writer.publish()
+    # The last file, then each published directory and the target itself
+    assert len(synced) == 3 + 3 + 1
+    assert synced[-1] == target_dir
+
+
+def test_dry_run_of_the_command_writes_nothing(bundled_export, tmp_path, capsys):
+    argv = ['--xml', bundled_export, '--target-dir', str(tmp_path / 'blog'),
+            '--public-dir', str(tmp_path / 'public'), '--no-redirects', '--no-image-sizes',
+            '--no-feeds', '--no-progress', '--no-cache', '--jobs', '1']
+    summary = main(argv + ['--dry-run'])
+    assert summary['writes']['created'] == summary['processed'] > 0
+    assert not os.path.exists(tmp_path / 'blog')
+
+    main(argv)
+    summary = main(argv + ['--force', '--dry-run'])
+    assert summary['writes']['unchanged'] == summary['processed']
+    assert summary['writes']['created'] == summary['writes']['updated'] == 0
+    capsys.readouterr()
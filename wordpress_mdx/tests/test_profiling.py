@@ -0,0 +1,80 @@
+"""Per-rule profiling of the conversion engines."""
+
+import json
+
+import pytest
+
+from wordpress_mdx import profiling
+from wordpress_mdx.cli import main
+from wordpress_mdx.engines import ENGINES
+from wordpress_mdx.profiling import build_profile_report, print_profile_summary, profile_conversion
+
+
+HTML = ('<!-- wp:heading --><h2>One</h2><!-- /wp:heading --><h2>Two</h2>'
+        '<p>Text<sup>[1]</sup> and <strong>bold</strong></p>')
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_profiling_records_rules_without_changing_the_output(engine):
+    convert = ENGINES[engine]
+    markdown, profile = profile_conversion(convert, HTML)
+    assert markdown == convert(HTML)
+    assert profile['bytes_in'] == len(HTML.encode('utf-8'))
+    assert profile['bytes_out'] == len(markdown.encode('utf-8'))
+    assert profile['rules']
+    for stats in profile['rules'].values():
+        assert set(stats) == {'seconds', 'matches', 'bytes_in', 'bytes_out'}
+    assert not profiling.enabled()
+
+
+def test_regex_rules_count_matches_and_bytes():
+    _, profile = profile_conversion(ENGINES['regex'], HTML)
+    rules = profile['rules']
+    assert rules['sup_citation']['matches'] == 1
+    assert rules['wp_comments']['bytes_out'] < rules['wp_comments']['bytes_in']
+    # Rules that are not a single substitution count whether they changed the post
+    assert rules['h2']['matches'] == 1
+    assert rules['h3']['matches'] == 0
+
+
+def test_profiling_is_off_after_a_failed_conversion():
+    def broken(html_content):
+        raise ValueError('broken')
+
+    with pytest.raises(ValueError):
+        profile_conversion(broken, HTML)
+    assert not profiling.enabled()
+
+
+def test_report_totals_rules_and_sorts_slowest_first(capsys):
+    posts = [
+        {'id': '1', 'slug': 'fast', 'seconds': 0.1, 'bytes_in': 10, 'bytes_out': 5,
+         'rules': {'h2': {'seconds': 0.01, 'matches': 1, 'bytes_in': 10, 'bytes_out': 8}}},
+        {'id': '2', 'slug': 'slow', 'seconds': 0.5, 'bytes_in': 20, 'bytes_out': 9,
+         'rules': {'h2': {'seconds': 0.02, 'matches': 2, 'bytes_in': 20, 'bytes_out': 18},
+                   'list': {'seconds': 0.3, 'matches': 1, 'bytes_in': 18, 'bytes_out': 12}}},
+    ]
+    report = build_profile_report('regex', posts)
+    assert [post['slug'] for post in report['posts']] == ['slow', 'fast']
+    assert list(report['rules']) == ['list', 'h2']
+    assert report['rules']['h2'] == {'seconds': pytest.approx(0.03), 'matches': 3,
+                                     'bytes_in': 30, 'bytes_out': 26}
+
+    print_profile_summary(report, limit=1)
+    out = capsys.readouterr().out
+    assert '- slow: 500.0 ms (20 → 9 bytes)' in out
+    assert '- list: 300.0 ms, 1 matches' in out
+    assert 'fast' not in out
+
+
+def test_profile_option_writes_a_report(write_export, tmp_path, capsys):
+    path = write_export([{'id': '1', 'Title': 'A post', 'Content': HTML}])
+    report_path = tmp_path / 'profile.json'
+    main(['--xml', path, '--target-dir', str(tmp_path / 'blog'), '--public-dir', str(tmp_path / 'public'),
+          '--no-redirects', '--no-image-sizes', '--no-feeds', '--no-progress', '--no-cache', '--jobs', '1',
+          '--profile', str(report_path)])
+    assert 'Slowest rules:' in capsys.readouterr().out
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+    assert report['engine'] == 'regex'
+    assert [post['slug'] for post in report['posts']] == ['a-post']
+    assert 'h2' in report['rules']
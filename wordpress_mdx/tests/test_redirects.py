@@ -0,0 +1,131 @@
+"""Resolving redirect chains and rewriting the links of a post."""
+
+import json
+import os
+
+import pytest
+
+from wordpress_mdx.redirects import (DEFAULT_REDIRECTS, MAX_HOPS, RedirectMap, load_redirects,
+                                     parse_redirects, site_path)
+
+
+def test_chain_resolves_to_its_last_destination():
+    redirects = RedirectMap([('/a', '/b', False), ('/b/', '/c', False)])
+    assert redirects.resolve('/a') == '/c'
+    assert redirects.resolve('/a/') == '/c'
+    assert redirects.resolve('/c') is None
+
+
+def test_prefix_rule_carries_the_rest_of_the_path():
+    redirects = RedirectMap([('/old', '/new/', True)])
+    assert redirects.lookup('/old') == '/new/'
+    assert redirects.lookup('/old/post/1') == '/new/post/1'
+    assert redirects.lookup('/older') is None
+
+
+def test_exact_rule_wins_over_prefix_rule_above_it():
+    redirects = RedirectMap([('/blog', '/news', True), ('/blog/kept', '/kept', False)])
+    assert redirects.lookup('/blog/kept') == '/kept'
+    assert redirects.lookup('/blog/other') == '/news/other'
+
+
+def test_loop_resolves_to_none_and_link_is_left_alone():
+    redirects = RedirectMap([('/a', '/b', False), ('/b', '/c', False), ('/c', '/a/', False)])
+    assert redirects.resolve('/a') is None
+    markdown = 'See [this](/a) and [that](/b).'
+    assert redirects.rewrite(markdown) == (markdown, 0)
+
+
+def test_self_redirect_is_a_loop():
+    redirects = RedirectMap([('/a', 'https://www.crexpressinc.com/a/', False)])
+    assert redirects.resolve('/a') is None
+
+
+def test_chain_longer_than_max_hops_resolves_to_none():
+    hops = [(f'/p{n}', f'/p{n + 1}', False) for n in range(MAX_HOPS + 1)]
+    assert RedirectMap(hops).resolve('/p0') is None
+    assert RedirectMap(hops[:MAX_HOPS - 1]).resolve('/p0') == f'/p{MAX_HOPS - 1}'
+
+
+def test_rewrite_url_keeps_query_and_fragment():
+    redirects = RedirectMap([('/a', '/b/', False)])
+    assert redirects.rewrite_url('/a?x=1#top') == '/b?x=1#top'
+    assert redirects.rewrite_url('https://crexpressinc.com/a/') == '/b'
+
+
+def test_rewrite_url_to_another_site_keeps_destination_query():
+    redirects = RedirectMap([('/a', 'https://example.com/x?y=2', False), ('/b', 'https://example.com/z', False)])
+    assert redirects.rewrite_url('/a?x=1') == 'https://example.com/x?y=2'
+    assert redirects.rewrite_url('/b#part') == 'https://example.com/z#part'
+
+
+def test_links_to_other_sites_are_not_rewritten():
+    redirects = RedirectMap([('/a', '/b', False)])
+    assert site_path('https://example.com/a') is None
+    assert site_path('mailto:someone@example.com') is None
+    assert redirects.rewrite_url('https://example.com/a') == 'https://example.com/a'
+
+
+def test_rewrite_counts_rewritten_links():
+    redirects = RedirectMap([('/a', '/b', False)])
+    markdown, rewritten = redirects.rewrite('[one](/a) [two](/a#x) ![img](/c.png)')
+    assert markdown == '[one](/b) [two](/b#x) ![img](/c.png)'
+    assert rewritten == 2
+
+
+def test_digest_changes_with_the_rules():
+    redirects = RedirectMap([('/a', '/b', False)])
+    digest = redirects.digest()
+    assert RedirectMap([('/a/', '/b', False)]).digest() == digest
+    redirects.add('/c', '/d')
+    assert redirects.digest() != digest
+
+
+def test_parse_redirects_reads_each_format(tmp_path):
+    rules = tmp_path / 'redirects.json'
+    rules.write_text(json.dumps([{'source': '/a', 'destination': '/b'},
+                                 {'source': '/p/:slug', 'destination': '/q/:slug'}]))
+    config = tmp_path / 'next.config.mjs'
+    config.write_text("redirects: [{ source: '/c', destination: \"/d\", permanent: true }]")
+    apache = tmp_path / 'REDIRECTS.md'
+    apache.write_text('```\nRedirect 301 /e /f\nRedirectPermanent /g https://example.com/h\n```\n')
+
+    assert parse_redirects(str(rules)) == [('/a', '/b', False)]
+    assert parse_redirects(str(config)) == [('/c', '/d', False)]
+    assert parse_redirects(str(apache)) == [('/e', '/f', True), ('/g', 'https://example.com/h', True)]
+
+
+def test_later_file_drops_rules_away_from_its_destinations(tmp_path):
+    old = tmp_path / 'old.md'
+    old.write_text('Redirect 301 /blog/new /blog/old\nRedirect 301 /x /y\n')
+    new = tmp_path / 'new.json'
+    new.write_text(json.dumps([{'source': '/blog/old', 'destination': '/blog/new'}]))
+
+    redirects = load_redirects((str(old), str(new)))
+    assert redirects.resolve('/blog/old') == '/blog/new'
+    assert redirects.resolve('/blog/new') is None
+    assert redirects.resolve('/x') == '/y'
+
+
+def test_later_exact_rule_to_the_same_destination_keeps_the_prefix(tmp_path):
+    old = tmp_path / 'old.md'
+    old.write_text('Redirect 301 /warehousing https://crexpressinc.com/services/warehousing/\n'
+                   'Redirect 301 /quote https://crexpressinc.com/request-a-quote/\n')
+    new = tmp_path / 'next.config.mjs'
+    new.write_text("redirects: [{ source: '/warehousing', destination: '/services/warehousing' },\n"
+                   "            { source: '/quote', destination: '/contact' }]")
+
+    redirects = load_redirects((str(old), str(new)))
+    assert redirects.lookup('/warehousing') == '/services/warehousing'
+    assert redirects.lookup('/warehousing/foo') == '/services/warehousing/foo'
+    # A rule to another destination replaces the earlier one
+    assert redirects.lookup('/quote') == '/contact'
+    assert redirects.lookup('/quote/foo') is None
+
+
+def test_bundled_redirects_keep_apache_sub_paths():
+    if not all(os.path.exists(path) for path in DEFAULT_REDIRECTS):
+        pytest.skip('the bundled redirect files are not in this checkout')
+    redirects = load_redirects(DEFAULT_REDIRECTS)
+    assert redirects.lookup('/warehousing/foo') == '/services/warehousing/foo'
+    assert redirects.rewrite_url('/warehousing/foo/') == '/services/warehousing/foo'
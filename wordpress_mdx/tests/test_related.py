@@ -0,0 +1,138 @@
+"""Related posts: nearest neighbours by the cosine of TF-IDF vectors."""
+
+import math
+import random
+
+from wordpress_mdx import related as related_module
+from wordpress_mdx.blog_index import load_index
+from wordpress_mdx.cli import main
+from wordpress_mdx.related import RelatedPosts, term_counts
+
+
+def corpus(posts, seed=0, vocabulary=60, words=40):
+    rng = random.Random(seed)
+    terms = [f'term{n}' for n in range(vocabulary)]
+    docs = {}
+    for n in range(posts):
+        counts = {}
+        # Posts lean towards a topic, so neighbours are not all ties
+        topic = terms[(n % 6) * 10:(n % 6) * 10 + 10]
+        for _ in range(words):
+            term = rng.choice(topic if rng.random() < 0.7 else terms)
+            counts[term] = counts.get(term, 0) + 1
+        docs[f'{n:03d}'] = counts
+    return docs
+
+
+def cosines(docs):
+    """{post: {other: cosine}} by brute force, for checking the sparse scores."""
+    total = len(docs)
+    df = {}
+    for counts in docs.values():
+        for term in counts:
+            df[term] = df.get(term, 0) + 1
+    limit = related_module.MAX_DF * total if total >= related_module.MIN_POSTS else total
+    vectors = {}
+    for doc_id, counts in docs.items():
+        weights = {term: (1 + math.log(count)) * math.log(total / df[term])
+                   for term, count in counts.items() if df[term] <= limit and df[term] < total}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1
+        vectors[doc_id] = {term: weight / norm for term, weight in weights.items()}
+    return {doc_id: {other: sum(weight * vectors[other].get(term, 0) for term, weight in vector.items())
+                     for other in docs if other != doc_id}
+            for doc_id, vector in vectors.items()}
+
+
+def brute_force(docs, k):
+    lists = {}
+    for doc_id, scores in cosines(docs).items():
+        best = sorted(((-score, other) for other, score in scores.items() if score > 1e-12))[:k]
+        lists[doc_id] = [other for _, other in best]
+    return lists
+
+
+def related_ids(related):
+    return {doc_id: [other for other, _ in neighbours] for doc_id, neighbours in related.related.items()}
+
+
+def compute(docs, path, k=3):
+    related = RelatedPosts(str(path), k)
+    for doc_id, counts in docs.items():
+        related.update(doc_id, counts)
+    related.prune(docs)
+    related.compute()
+    return related
+
+
+def test_term_counts():
+    assert term_counts({'length': 3, 'terms': {'ship': [0, 2], 'port': [1]}}) == {'ship': 2, 'port': 1}
+
+
+def test_exact_lists_match_brute_force(tmp_path):
+    docs = corpus(40)
+    related = compute(docs, tmp_path / 'related.json.gz')
+    assert related_ids(related) == brute_force(docs, 3)
+
+
+def test_candidate_scores_are_exact_cosines(tmp_path, monkeypatch):
+    monkeypatch.setattr(related_module, 'EXACT_POSTS', 10)
+    monkeypatch.setattr(related_module, 'QUERY_TERMS', 4)
+    docs = corpus(60, seed=1)
+    related = compute(docs, tmp_path / 'related.json.gz')
+    exact = cosines(docs)
+    for doc_id, neighbours in related.related.items():
+        assert neighbours
+        for other, score in neighbours:
+            assert math.isclose(score, exact[doc_id][other], abs_tol=1e-6)
+
+
+def test_state_round_trip_and_unchanged_posts_are_not_scored(tmp_path):
+    path = tmp_path / 'related.json.gz'
+    docs = corpus(20)
+    first = compute(docs, path)
+    path.write_bytes(first.dump())
+
+    second = RelatedPosts(str(path), 3)
+    assert second.related == first.related
+    for doc_id, counts in docs.items():
+        second.update(doc_id, counts)
+    assert second.compute() == 0
+    assert second.dump() == first.dump()
+    # Another k starts over
+    assert RelatedPosts(str(path), 4).docs == {}
+
+
+def test_changed_and_removed_posts_update_the_lists(tmp_path):
+    path = tmp_path / 'related.json.gz'
+    docs = corpus(20)
+    path.write_bytes(compute(docs, path).dump())
+
+    related = RelatedPosts(str(path), 3)
+    for doc_id, counts in docs.items():
+        related.update(doc_id, counts)
+    # 000 becomes a copy of 005, so each is the other's nearest post
+    related.update('000', dict(docs['005']))
+    docs['000'] = dict(docs['005'])
+    removed = '001'
+    related.prune(set(docs) - {removed})
+    assert 0 < related.compute() < len(docs)
+    assert related.related['000'][0] == ['005', 1.0]
+    assert related.related['005'][0][0] == '000'
+    assert removed not in related.related
+    assert all(removed not in related_ids(related)[doc_id] for doc_id in related.related)
+    assert related.slugs('005', {'000': 'copy'}) == ['copy']
+
+
+def test_runs_list_related_slugs_in_the_index(write_export, tmp_path, capsys):
+    topics = ['hazmat placards drivers', 'warehouse storage pallets', 'hazmat drivers training',
+              'warehouse pallets racking']
+    posts = [{'id': str(n), 'Title': f'Post {n}', 'Content': f'<p>{text} shipping.</p>',
+              'Date': f'2025-10-1{n} 09:00:00', 'Permalink': f'https://www.crexpressinc.com/post-{n}/'}
+             for n, text in enumerate(topics)]
+    main(['--xml', write_export(posts), '--target-dir', str(tmp_path / 'blog'),
+          '--public-dir', str(tmp_path / 'public'), '--no-redirects', '--no-image-sizes',
+          '--no-feeds', '--no-progress', '--no-cache', '--jobs', '1', '--related', '1'])
+    index = load_index(str(tmp_path / 'blog'))
+    assert index['0']['related'] == ['post-2']
+    assert index['1']['related'] == ['post-3']
+    capsys.readouterr()
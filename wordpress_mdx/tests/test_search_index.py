@@ -0,0 +1,128 @@
+"""The full-text search index built at conversion time."""
+
+import os
+
+import pytest
+
+from wordpress_mdx import search_index
+from wordpress_mdx.cli import main, parse_args
+from wordpress_mdx.search_index import (SearchIndex, SearchIndexBuilder, chunk_name,
+                                        index_document, stem, tokenize)
+
+
+POSTS = {
+    '1': ('Hazmat shipping', 'Shipping hazardous materials needs placards and trained drivers.'),
+    '2': ('Warehousing', 'Our warehouses store freight close to the port of [Houston](/houston).'),
+    '3': ('Drayage', 'Drayage moves containers from the port to warehouses by truck.'),
+}
+
+
+def publish(builder):
+    """Write the files of builder to its directory and delete its stale chunks."""
+    os.makedirs(builder.index_dir, exist_ok=True)
+    for name, data in builder.files().items():
+        with open(os.path.join(builder.index_dir, name), 'wb') as f:
+            f.write(data)
+    for name in builder.stale_files():
+        os.remove(os.path.join(builder.index_dir, name))
+
+
+def build(index_dir, posts):
+    builder = SearchIndexBuilder(str(index_dir))
+    builder.prune(posts)
+    for doc_id, (title, markdown) in posts.items():
+        builder.update(doc_id, title.lower(), title, index_document(title, markdown))
+    publish(builder)
+    return builder
+
+
+def snapshot(index_dir):
+    return {name: (index_dir / name).read_bytes() for name in sorted(os.listdir(index_dir))}
+
+
+def test_stem_follows_porter():
+    words = ['caresses', 'ponies', 'relational', 'hopping', 'generalization', 'freight']
+    assert [stem(word) for word in words] == ['caress', 'poni', 'relat', 'hop', 'gener', 'freight']
+
+
+def test_tokenize_counts_stop_words_in_positions():
+    assert list(tokenize("The shipper's trucks are shipping freight")) == [
+        (1, 'shipper'), (2, 'truck'), (4, 'ship'), (5, 'freight')]
+
+
+def test_index_document_skips_link_targets_and_gaps_the_title():
+    document = index_document('Port', 'The [port](/houston-port) of Houston')
+    assert document['terms'] == {'port': [0, 3], 'houston': [5]}
+    assert document['length'] == 3
+
+
+def test_search_ranks_and_matches_phrases(tmp_path):
+    build(tmp_path, POSTS)
+    index = SearchIndex(str(tmp_path))
+    assert [result['id'] for result in index.search('warehouse port')] == ['2', '3']
+    assert [result['id'] for result in index.search('"port of houston"')] == ['2']
+    assert index.search('"houston port"') == []
+    assert index.search('the') == []
+    result, = index.search('shipping')
+    assert (result['id'], result['slug'], result['title']) == ('1', 'hazmat shipping', 'Hazmat shipping')
+    assert result['score'] > 0
+    with pytest.raises(ValueError):
+        SearchIndex(str(tmp_path / 'missing'))
+
+
+def test_incremental_build_matches_a_full_build(tmp_path):
+    build(tmp_path / 'incremental', POSTS)
+    edited = dict(POSTS, **{'3': ('Drayage', 'Drayage trucks haul containers.'),
+                            '4': ('Cross-docking', 'Cross-docking skips storage.')})
+    del edited['1']
+    build(tmp_path / 'incremental', edited)
+    build(tmp_path / 'full', edited)
+    assert snapshot(tmp_path / 'incremental') == snapshot(tmp_path / 'full')
+
+
+def test_large_chunks_are_split(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_index, 'CHUNK_BYTES', 64)
+    words = ' '.join(f'ship{letter}word' for letter in 'abcdefgh')
+    builder = build(tmp_path, {'1': ('Split', words)})
+    assert 'sh' not in builder.chunks
+    assert {'shipa', 'shiph'} <= set(builder.chunks)
+    assert [result['id'] for result in SearchIndex(str(tmp_path)).search('shipcword')] == ['1']
+
+
+def test_stale_files_are_only_chunks_of_the_index(tmp_path):
+    others = ['backup.tar.gz', 'Notes.json.gz', 'site-data.json.gz', 'x-zz.json.gz']
+    for name in others:
+        (tmp_path / name).write_bytes(b'kept')
+    build(tmp_path, POSTS)
+    stale = {chunk_name('dr'), chunk_name('é1')}
+    for name in stale:
+        (tmp_path / name).write_bytes(b'old')
+
+    builder = build(tmp_path, {'2': POSTS['2']})
+    assert set(os.listdir(tmp_path)).isdisjoint(stale)
+    assert chunk_name('dr') not in builder.files()
+    for name in others:
+        assert (tmp_path / name).read_bytes() == b'kept'
+
+
+def test_search_dir_must_be_its_own_directory(tmp_path, capsys):
+    public = str(tmp_path / 'public')
+    with pytest.raises(SystemExit):
+        parse_args(['--search-index', '--public-dir', public, '--search-dir', public])
+    with pytest.raises(SystemExit):
+        parse_args(['--search-index', '--public-dir', public, '--search-dir', str(tmp_path)])
+    args = parse_args(['--search-index', '--public-dir', public,
+                       '--search-dir', os.path.join(public, 'search')])
+    assert args.search_dir == os.path.join(public, 'search')
+    capsys.readouterr()
+
+
+def test_runs_write_the_search_index(write_export, tmp_path, capsys):
+    posts = [{'id': '1', 'Title': 'Hazmat shipping', 'Content': '<p>Placards for hazmat loads.</p>',
+              'Date': '2025-10-10 09:00:00', 'Permalink': 'https://www.crexpressinc.com/hazmat/'}]
+    main(['--xml', write_export(posts), '--target-dir', str(tmp_path / 'blog'),
+          '--public-dir', str(tmp_path / 'public'), '--no-redirects', '--no-image-sizes',
+          '--no-feeds', '--no-progress', '--no-cache', '--jobs', '1', '--search-index'])
+    index = SearchIndex(str(tmp_path / 'public' / 'search-index'))
+    assert [result['slug'] for result in index.search('placards')] == ['hazmat']
+    capsys.readouterr()
@@ -0,0 +1,100 @@
+"""Descriptions, reading stats and the escaping of the MDX templates."""
+
+import random
+import re
+
+import pytest
+
+from wordpress_mdx import templates
+from wordpress_mdx.templates import (count_words, escape_frontmatter_string, extract_description,
+                                     generate_description, reading_stats, reading_time, render_mdx)
+
+
+def whole_generate_description(content, max_length=150):
+    """generate_description as it was before it read a bounded prefix, unescaped."""
+    desc = re.sub(r'[#*`\[\]()]', '', content).strip()
+    sentences = re.split(r'[.!?]', desc)
+    if sentences and sentences[0]:
+        desc = sentences[0].strip()
+    if len(desc) > max_length:
+        desc = desc[:max_length].rsplit(' ', 1)[0] + '...'
+    return re.sub(r'\s+', ' ', desc).strip()
+
+
+def whole_extract_description(content, max_length=200):
+    """extract_description as it was before it read a bounded prefix."""
+    desc = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content.split('\n\n')[0])
+    desc = re.sub(r'[*_`#]', '', desc).strip()
+    if len(desc) > max_length:
+        desc = desc[:max_length].rsplit(' ', 1)[0] + '...'
+    return desc
+
+
+def random_markdown(rng):
+    pieces = ['word', 'longer words here', ' ', ' ', '\n', '\n\n', '.', '!', '**', '#', '`', '_',
+              '[link text](/some/target)', '[', ']', '(', ')', "it's", 'é']
+    return ''.join(rng.choice(pieces) for _ in range(rng.randrange(0, 200)))
+
+
+def post(content, **fields):
+    data = {'id': '1', 'slug': 'a', 'title': 'A title', 'date': '2025-10-10', 'content': content,
+            'featured_image': '/a.png'}
+    data.update(fields)
+    return data
+
+
+def test_descriptions_match_reading_the_whole_content(monkeypatch):
+    monkeypatch.setattr(templates, 'SCAN_CHUNK', 16)
+    rng = random.Random(0)
+    for _ in range(2000):
+        content = random_markdown(rng)
+        assert generate_description(content, 40) == whole_generate_description(content, 40)
+        assert extract_description(content, 40) == whole_extract_description(content, 40)
+
+
+def test_descriptions_are_plain_text():
+    assert generate_description("# Title\n\nIt's **bold** text. Second.") == "Title It's bold text"
+    assert extract_description('First [para](/x) with *em*.\n\nSecond.') == 'First para with em.'
+    assert extract_description('word ' * 100).endswith('word...')
+
+
+def test_count_words_leaves_out_markup():
+    assert count_words('Two words [and a link](/a-b-c)') == 5
+    assert count_words('![A truck at the port](/truck.png) Caption') == 1
+    heading = '<h2 id="ultimate-guide-to-hazmat" tabindex="-1" class="sb h2-sbb-cls">Hello</h2>'
+    assert count_words(heading) == 1
+    assert count_words('<a class="x y" href="/z">Our <em>own</em> fleet</a><br/>') == 3
+    assert count_words("It's a well-known 3-step plan") == 5
+
+
+def test_count_words_counts_across_chunks(monkeypatch):
+    markdown = ' '.join(f'word{n} <span class="c">in</span> [a link](/x/y)' for n in range(500))
+    expected = count_words(markdown)
+    monkeypatch.setattr(templates, 'COUNT_CHUNK', 7)
+    assert count_words(markdown) == expected == 2000
+
+
+def test_reading_stats():
+    assert reading_time(0) == 1
+    assert reading_time(200) == 1
+    assert reading_time(201) == 2
+    assert reading_stats(post('one two three')) == (3, 1)
+    assert reading_stats(post('ignored', word_count=450)) == (450, 3)
+
+
+def test_escape_frontmatter_string():
+    assert escape_frontmatter_string("It's C:\\dir\n\nnext  line ") == "It\\'s C:\\\\dir next line"
+    assert escape_frontmatter_string(None) == ''
+
+
+@pytest.mark.parametrize('template', ['blog-layout', 'article'])
+def test_templates_escape_titles_and_descriptions(template):
+    page = render_mdx(post('Body.', title="Shipper's \\ guide",
+                           seo_description="Line one\nIt's C:\\freight"), template)
+    assert "title: 'Shipper\\'s \\\\ guide'," in page
+    assert "description: 'Line one It\\'s C:\\\\freight'," in page
+
+
+def test_article_escapes_extracted_descriptions():
+    page = render_mdx(post("It's in C:\\freight\nand more.\n\nSecond paragraph."), 'article')
+    assert "description: 'It\\'s in C:\\\\freight and more.'," in page
@@ -0,0 +1,80 @@
+"""Finding the posts that changed between two versions of an export."""
+
+import io
+
+import pytest
+
+from wordpress_mdx.export import iter_posts
+from wordpress_mdx.watch import ExportSnapshot, IncompleteExport, iter_post_elements
+
+
+def export(*posts, encoding='UTF-8', root='data'):
+    body = ''.join(posts)
+    return f'<?xml version="1.0" encoding="{encoding}"?>\n<{root}>{body}</{root}>\n'.encode(encoding)
+
+
+def post(post_id, title, content='<p>Text</p>', attributes=''):
+    return (f'<post{attributes}><id>{post_id}</id><Title>{title}</Title>'
+            f'<Content><![CDATA[{content}]]></Content></post>\n')
+
+
+def snapshot(data):
+    snap = ExportSnapshot()
+    snap.seed(data, list(iter_posts(io.BytesIO(data))))
+    return snap
+
+
+def test_scan_finds_every_post_element():
+    data = export(post('1', 'One', content='A </post> in text'), post('2', 'Two', attributes=' kind="a"'),
+                  '<post/>', '<posts>not a post</posts>')
+    elements = list(iter_post_elements(data))
+    assert len(elements) == 3
+    assert elements[0].endswith(b'in text]]></Content></post>')
+    assert elements[2] == b'<post/>'
+
+
+def test_scan_of_an_export_being_written():
+    data = export(post('1', 'One'), post('2', 'Two'))
+    with pytest.raises(IncompleteExport):
+        list(iter_post_elements(data[:-20]))
+    with pytest.raises(IncompleteExport):
+        list(iter_post_elements(data.replace(b'</post>\n</data>', b'\n</data>')))
+
+
+@pytest.mark.parametrize('encoding', ['UTF-8', 'ISO-8859-1'])
+def test_diff_reports_changed_added_and_removed_posts(encoding):
+    snap = snapshot(export(post('1', 'One'), post('2', 'Café'), post('3', 'Three'), encoding=encoding))
+    assert snap.scan
+
+    changed, removed = snap.diff(export(post('1', 'One'), post('2', 'Café crème'), post('4', 'Four'),
+                                        encoding=encoding))
+    assert [(fields['id'], fields['Title']) for fields in changed] == [('2', 'Café crème'), ('4', 'Four')]
+    assert removed == ['3']
+    assert snap.diff(export(post('1', 'One'), post('2', 'Café crème'), post('4', 'Four'),
+                            encoding=encoding)) == ([], [])
+
+
+def test_diff_of_an_export_the_scan_cannot_read_parses_it():
+    snap = snapshot(export(post('1', 'One'), post('2', 'Two'), encoding='UTF-16'))
+    assert not snap.scan
+
+    changed, removed = snap.diff(export(post('1', 'One'), post('2', 'Deux'), encoding='UTF-16'))
+    assert [(fields['id'], fields['Title']) for fields in changed] == [('2', 'Deux')]
+    assert removed == []
+
+
+def test_incomplete_export_leaves_the_snapshot_as_it_was():
+    data = export(post('1', 'One'))
+    snap = snapshot(data)
+    with pytest.raises(IncompleteExport):
+        snap.diff(export(post('1', 'Uno'))[:-12])
+    assert snap.diff(data) == ([], [])
+
+
+def test_forgotten_post_is_changed_on_the_next_diff():
+    data = export(post('1', 'One'), post('2', 'Two'))
+    snap = snapshot(data)
+    snap.forget('2')
+    changed, removed = snap.diff(data)
+    assert [fields['id'] for fields in changed] == ['2']
+    assert removed == []
@@ -0,0 +1,70 @@
+"""Malformed posts convert in bounded time, and a post over its budget is quarantined."""
+
+import time
+
+import pytest
+
+from wordpress_mdx.engines import ENGINES
+from wordpress_mdx.pipeline import convert_post, time_budget
+
+
+# Unclosed or repeated tags the old ``<tag>(.*?)</tag>`` patterns rescanned
+# the rest of the post for, once per tag
+WORST_CASES = [
+    '<img src="a" ',
+    '<a href="x">',
+    '<a href="x" ',
+    '<blockquote>',
+    '<pre><code>',
+    '<code>',
+    '<li>',
+    '<em>',
+    '<!-- wp:x ',
+]
+
+
+@pytest.mark.parametrize('engine', ['wordpress'])
+@pytest.mark.parametrize('repeated', WORST_CASES)
+def test_unclosed_tags_convert_in_linear_time(engine, repeated):
+    # Quadratic rules take minutes here; linear ones well under a second
+    started = time.perf_counter()
+    ENGINES[engine](repeated * 20000)
+    assert time.perf_counter() - started < 5
+
+
+def test_wordpress_engine_still_converts_links_and_images():
+    html = ('<p>See <a href="https://example.com/">the site</a> and '
+            '<a class="x" href="https://example.com/other">another</a>.</p>\n'
+            '<img src="/a.png" alt="An image">\n<img src="/b.png" />\n<img src="/c.png">')
+    assert ENGINES['wordpress'](html) == (
+        'See [the site](https://example.com/) and '
+        '<a class="x" href="https://example.com/other">another</a>.\n\n'
+        '![An image](/a.png)\n![](/b.png)\n<img src="/c.png">'
+    )
+
+
+def test_time_budget_interrupts_a_long_block():
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError, match='time budget'):
+        with time_budget(0.2):
+            time.sleep(5)
+    assert time.perf_counter() - started < 2
+
+
+def test_no_time_budget_lets_the_block_finish():
+    with time_budget(0):
+        time.sleep(0.05)
+
+
+def test_a_post_over_its_budget_is_quarantined(monkeypatch):
+    def stall(html_content):
+        time.sleep(5)
+        return html_content
+
+    monkeypatch.setitem(ENGINES, 'regex', stall)
+    result = convert_post({'id': '7', 'Title': 'Slow post', 'Content': '<p>x</p>'}, 'regex',
+                          timeout=0.2)
+    assert result['quarantined']
+    assert result['error'].startswith('Quarantined post 7: conversion exceeded')
+    assert result['slug'] == 'slow-post'
+    assert result['mdx'] is None
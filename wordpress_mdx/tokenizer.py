@@ -0,0 +1,472 @@
+"""The tokenizer engine: converts HTML to markdown from a single tokenization.
+
+The post is split into text and tags once, and the element rules of
+clean_html_to_markdown then run over that token list in the same order,
+instead of searching the whole post again each time. Each rule pairs up
+its own tags exactly as its pattern does, so elements of different rules
+overlap the way they can in the cascade: a blockquote ends at the first
+</blockquote> inside it even while a list it contains is still open, and
+a <strong> may close inside an <em> that opened after it. A rule is
+skipped when the post has none of its tags and every rule visits each
+token once, so the cost stays linear in the size of the post.
+"""
+
+import re
+import time
+from collections import namedtuple
+from html import unescape
+
+from . import profiling
+from .markup import (LIST_INDENT, TABLE_SECTIONS, TableGrid, attr_value, iframe_link,
+                     image_markdown, list_marker, remove_comments)
+from .profiling import record_rule, step_rule
+from .regex_engine import remove_tags
+
+
+# A tag of the post: its lowercase name, whether it is a closing tag, its
+# attributes (everything after the name) and its text
+_Tag = namedtuple('_Tag', 'name closing attrs text')
+
+# Attributes stop at a '<' as in the element rules' ``<tag([^<>]*)>``, so a
+# '<' that starts no tag stays in the text; the tags rule, which runs last
+# on the text, removes whatever there still looks like a tag.
+_TOKEN_RE = re.compile(r'<(/?)([a-zA-Z]\w*)([^<>]*)>')
+
+_WP_COMMENT_RE = re.compile(r'<!--\s*wp:')
+_WP_CLOSING_COMMENT_RE = re.compile(r'<!--\s*/wp:')
+_CITATION_RE = re.compile(r'\[?\d+\]?')
+_CELL_BREAK_ATTRS_RE = re.compile(r'\s*/?')
+_WHITESPACE_RE = re.compile(r'\n{3,}| {2,}')
+
+# The inline rule opens an element at any tag whose name starts with one
+# of these, tried in this order as in ``<(strong|b|em|i)[^<>]*>``, so a
+# <br> opens a b element and an <img> an i element
+_INLINE_MARKERS = {'strong': '**', 'b': '**', 'em': '*', 'i': '*'}
+
+_LIST_TAGS = ('ul', 'ol', 'li')
+_TABLE_TAGS = frozenset(('table', 'tr', 'th', 'td') + TABLE_SECTIONS)
+
+
+def _tokenize(content):
+    """Split content into text strings and _Tags; return (tokens, names of the tags)."""
+    parts = _TOKEN_RE.split(content)
+    # Tags are immutable, so the many copies of <p>, </li> and the like share one
+    seen = {}
+    tags = []
+    for closing, name, attrs in zip(parts[1::4], parts[2::4], parts[3::4]):
+        text = f'<{closing}{name}{attrs}>'
+        tag = seen.get(text)
+        if tag is None:
+            tag = seen[text] = _Tag(name.lower(), closing == '/', attrs, text)
+        tags.append(tag)
+    tokens = [None] * (2 * len(tags) + 1)
+    tokens[0::2] = parts[0::4]
+    tokens[1::2] = tags
+    return [token for token in tokens if token], {tag.name for tag in seen.values()}
+
+
+def _text(tokens):
+    """The text tokens stand for, tags included."""
+    return ''.join(token if token.__class__ is str else token.text for token in tokens)
+
+
+def _tags(tokens, prefixes):
+    """The positions of the tags whose name starts with one of prefixes.
+
+    Rules visit only these and copy the tokens between them as slices.
+    """
+    return [at for at, token in enumerate(tokens)
+            if token.__class__ is _Tag and token.name.startswith(prefixes)]
+
+
+def _opens(token, name):
+    """Return the attributes ``<name([^<>]*)>`` captures from a tag, or None.
+
+    Like the pattern, name also matches longer tag names it is a prefix of.
+    """
+    if token.closing or not token.name.startswith(name):
+        return None
+    return token.text[len(name) + 1:-1]
+
+
+def _closes(token, name):
+    """Whether a tag is exactly ``</name>``."""
+    return token.closing and token.name == name and not token.attrs
+
+
+def _blank(token):
+    return token.__class__ is str and (not token or token.isspace())
+
+
+def _strip(tokens):
+    """Strip whitespace from the ends of a token list, as str.strip does to its text."""
+    start, end = 0, len(tokens)
+    while start < end and _blank(tokens[start]):
+        start += 1
+    while end > start and _blank(tokens[end - 1]):
+        end -= 1
+    tokens = tokens[start:end]
+    if tokens and tokens[0].__class__ is str:
+        tokens[0] = tokens[0].lstrip()
+    if tokens and tokens[-1].__class__ is str:
+        tokens[-1] = tokens[-1].rstrip()
+    return tokens
+
+
+def _replace_elements(tokens, name, opens, render):
+    """Replace elements in a token list, as markup.replace_elements does in text.
+
+    opens(token) returns what render(state, inner tokens) needs, or None
+    for a tag that opens no element; render returns the tokens put in
+    place of the element. An element ends at the first ``</name>`` and one
+    that is never closed is left untouched.
+    """
+    out = []
+    pos = 0
+    state = None
+    start = 0
+    for at in _tags(tokens, name):
+        if state is None:
+            state = opens(tokens[at])
+            start = at
+        elif _closes(tokens[at], name):
+            out.extend(tokens[pos:start])
+            out.extend(render(state, tokens[start + 1:at]))
+            pos = at + 1
+            state = None
+    if not pos:
+        return tokens
+    out.extend(tokens[pos:])
+    return out
+
+
+def _element_rule(name, render):
+    """A ``<name([^<>]*)>(.*?)</name>`` rule; render(attrs, inner tokens) returns the new tokens."""
+    return lambda tokens: _replace_elements(tokens, name, lambda token: _opens(token, name), render)
+
+
+def _heading(level):
+    return lambda attrs, inner: ['#' * level + ' ', *_strip(inner), '\n']
+
+
+def _blockquote(attrs, inner):
+    out = ['\n> ']
+    for token in _strip(inner):
+        if token.__class__ is str:
+            out.append(token.replace('\n', '\n> '))
+        elif '\n' in token.text:
+            # The quote marker cuts the tag in two, as it does in the text
+            out.extend(_tokenize(token.text.replace('\n', '\n> '))[0])
+        else:
+            out.append(token)
+    out.append('\n')
+    return out
+
+
+def _inline_kind(token):
+    """The inline element kind a tag opens or closes, or None."""
+    if token.closing:
+        return token.name if token.name in _INLINE_MARKERS and not token.attrs else None
+    return next(kind for kind in _INLINE_MARKERS if token.name.startswith(kind))
+
+
+def convert_inline(tokens):
+    """strong/b and em/i, each kind paired up on its own as wrap_elements does."""
+    opened = {}
+    out = None
+    for at in _tags(tokens, tuple(_INLINE_MARKERS)):
+        kind = _inline_kind(tokens[at])
+        if kind is None:
+            continue
+        if not tokens[at].closing:
+            opened.setdefault(kind, at)
+        elif kind in opened:
+            if out is None:
+                out = tokens[:]
+            out[opened.pop(kind)] = out[at] = _INLINE_MARKERS[kind]
+    return tokens if out is None else out
+
+
+def _link_href(token):
+    if token.closing or token.name != 'a' or not token.attrs[:1].isspace():
+        return None
+    return attr_value(token.attrs, 'href')
+
+
+def convert_links(tokens):
+    """<a href> links, like the regex engine's convert_links."""
+    return _replace_elements(tokens, 'a', _link_href, lambda href, text: ['[', *text, f']({href})'])
+
+
+class _ListLevel:
+    """An open <ul>/<ol> while convert_lists scans; items are lists of tokens."""
+
+    def __init__(self, tag, start, indent):
+        self.tag = tag
+        self.start = start
+        self.indent = indent
+        self.items = []
+        self.item = None
+
+    def start_item(self):
+        self.end_item()
+        self.item = []
+
+    def end_item(self):
+        if self.item is not None:
+            self.items.append(_strip(self.item))
+            self.item = None
+
+    def nest(self):
+        """Return the indent of a sub-list opened in the current item.
+
+        A sub-list outside any <li> continues the previous item.
+        """
+        if self.item is None:
+            self.item = self.items.pop() if self.items else []
+        return self.indent + LIST_INDENT * len(list_marker(self.tag, len(self.items)))
+
+    def render(self):
+        """Return the list's markdown as tokens."""
+        self.end_item()
+        out = ['\n']
+        for i, item in enumerate(self.items):
+            if i:
+                out.append('\n')
+            out.append(self.indent + list_marker(self.tag, i))
+            out.extend(item)
+        out.append('\n')
+        return out
+
+
+def convert_lists(tokens):
+    """ul/ol lists with a stack of open lists, like the regex engine's convert_lists."""
+    out = []
+    pos = 0
+    levels = []
+
+    for at in _tags(tokens, _LIST_TAGS):
+        token = tokens[at]
+        tag = token.name
+        if tag not in _LIST_TAGS:
+            continue
+        if not levels:
+            if token.closing or tag == 'li':
+                continue
+            out.extend(tokens[pos:at])
+        elif levels[-1].item is not None:
+            levels[-1].item.extend(tokens[pos:at])
+        pos = at + 1
+
+        if token.closing:
+            if token.attrs:
+                continue
+            if tag == 'li':
+                depth = next((d for d in range(len(levels) - 1, -1, -1)
+                              if levels[d].item is not None), None)
+            else:
+                depth = next((d for d in range(len(levels) - 1, -1, -1)
+                              if levels[d].tag == tag), None)
+            if depth is None:
+                continue
+            if depth + 1 < len(levels):
+                # Lists opened inside the closed element were never closed
+                levels[depth].item.extend(tokens[levels[depth + 1].start:at])
+                del levels[depth + 1:]
+            if tag == 'li':
+                levels[depth].end_item()
+                continue
+            rendered = levels.pop().render()
+            if levels:
+                levels[-1].item.extend(rendered)
+            else:
+                out.extend(rendered)
+        elif tag == 'li':
+            levels[-1].start_item()
+        else:
+            indent = levels[-1].nest() if levels else ''
+            levels.append(_ListLevel(tag, at, indent))
+
+    out.extend(tokens[levels[0].start:] if levels else tokens[pos:])
+    return out
+
+
+def _cell_token(token):
+    """Keep a token of a cell on one table line: block breaks become spaces, pipes are escaped."""
+    if token.__class__ is str:
+        return token.replace('\n', ' ').replace('|', '\\|')
+    if token.name == 'p' and (not token.closing or not token.attrs) \
+            or token.name == 'br' and not token.closing and _CELL_BREAK_ATTRS_RE.fullmatch(token.attrs):
+        return ' '
+    if '\n' in token.text or '|' in token.text:
+        return token._replace(attrs=token.attrs.replace('\n', ' ').replace('|', '\\|'),
+                              text=token.text.replace('\n', ' ').replace('|', '\\|'))
+    return token
+
+
+def _table(grid):
+    layout = grid.layout()
+    if layout is None:
+        return []
+    header, rows, width = layout
+    out = ['\n']
+    for i, row in enumerate(rows if header is None else [header] + rows):
+        if i:
+            out.append('\n')
+        out.append('| ')
+        for j, cell in enumerate(row):
+            if j:
+                out.append(' | ')
+            out.extend(cell)
+        out.append(' |')
+        if not i and header is not None:
+            out.append('\n| ' + ' | '.join(['---'] * width) + ' |')
+    out.append('\n')
+    return out
+
+
+def convert_tables(tokens):
+    """Tables in one forward scan, like the regex engine's convert_tables."""
+    out = []
+    pos = 0
+    depth = 0
+    table_start = None
+    grid = None
+    cell_start = None
+    cell_attrs = ''
+    cell_header = False
+
+    for at in _tags(tokens, tuple(_TABLE_TAGS)):
+        token = tokens[at]
+        tag = token.name
+        if tag not in _TABLE_TAGS:
+            continue
+
+        if tag == 'table':
+            if not token.closing:
+                if not depth:
+                    out.extend(tokens[pos:at])
+                    table_start = at
+                    grid = TableGrid(())
+                    cell_start = None
+                depth += 1
+                continue
+            if not depth:
+                continue
+            depth -= 1
+            if depth:
+                continue
+        elif depth != 1:
+            continue
+
+        if cell_start is not None:
+            grid.add_cell(_strip([_cell_token(cell) for cell in tokens[cell_start:at]]),
+                          cell_attrs, cell_header)
+            cell_start = None
+
+        if tag == 'table':
+            out.extend(_table(grid))
+            pos = at + 1
+        elif tag in TABLE_SECTIONS:
+            grid.end_row()
+            grid.section = None if token.closing else tag
+        elif tag == 'tr':
+            if token.closing:
+                grid.end_row()
+            else:
+                grid.start_row()
+        elif not token.closing:
+            cell_start = at + 1
+            cell_attrs = token.attrs
+            cell_header = tag == 'th'
+
+    out.extend(tokens[table_start:] if depth else tokens[pos:])
+    return out
+
+
+def convert_images(tokens):
+    """<img> tags with a src, like the regex engine's convert_images."""
+    out = tokens[:]
+    for at in _tags(tokens, 'img'):
+        token = tokens[at]
+        if not token.closing and token.name == 'img' and token.attrs[:1].isspace():
+            out[at] = image_markdown(token.attrs) or token
+    return out
+
+
+def remove_citations(tokens):
+    """Superscript citations, ``<sup[^>]*>\\[?\\d+\\]?</sup>``."""
+    out = []
+    pos = 0
+    for at in _tags(tokens, 'sup'):
+        if not _closes(tokens[at], 'sup'):
+            continue
+        start = at - 1
+        while start >= pos and tokens[start].__class__ is str:
+            start -= 1
+        if start >= pos and _opens(tokens[start], 'sup') is not None \
+                and _CITATION_RE.fullmatch(''.join(tokens[start + 1:at])):
+            out.extend(tokens[pos:start])
+            pos = at + 1
+    if not pos:
+        return tokens
+    out.extend(tokens[pos:])
+    return out
+
+
+# The element rules of clean_html_to_markdown in the same order: (rule
+# name, prefixes of the tag names it converts, function of the tokens)
+RULES = [
+    *[(f'h{i}', (f'h{i}',), _element_rule(f'h{i}', _heading(i))) for i in range(1, 7)],
+    ('inline', tuple(_INLINE_MARKERS), convert_inline),
+    ('link', ('a',), convert_links),
+    ('blockquote', ('blockquote',), _element_rule('blockquote', _blockquote)),
+    ('list', ('ul', 'ol'), convert_lists),
+    ('table', ('table',), convert_tables),
+    ('iframe', ('iframe',), _element_rule('iframe', lambda attrs, inner: [iframe_link(attrs, _text(inner))])),
+    ('image', ('img',), convert_images),
+    ('figcaption', ('figcaption',), _element_rule('figcaption', lambda attrs, inner: [])),
+    ('sup_citation', ('sup',), remove_citations),
+    ('sup', ('sup',), _element_rule('sup', lambda attrs, inner: [])),
+]
+
+
+def _apply(rule, convert, tokens):
+    """Run one rule over tokens, recording it when profiling."""
+    if not profiling.enabled():
+        return convert(tokens)
+    started = time.perf_counter()
+    result = convert(tokens)
+    record_rule(rule, time.perf_counter() - started, int(result != tokens), _text(tokens), _text(result))
+    return result
+
+
+def tokenize_html_to_markdown(html_content):
+    """Convert HTML to markdown from one tokenization; same output as clean_html_to_markdown.
+
+    The comments, CDATA markers and the tags left over by the element
+    rules are removed from the text, as the regex engine does.
+    """
+    if not html_content:
+        return ""
+
+    content = html_content.strip()
+    content = step_rule('wp_comments', lambda c: remove_comments(c, _WP_COMMENT_RE), content)
+    content = step_rule('wp_closing_comments', lambda c: remove_comments(c, _WP_CLOSING_COMMENT_RE),
+                        content)
+    content = step_rule('cdata', lambda c: c.replace('<![CDATA[', '').replace(']]>', ''), content)
+
+    tokens, names = _tokenize(content)
+    for rule, prefixes, convert in RULES:
+        if any(name.startswith(prefixes) for name in names):
+            tokens = _apply(rule, convert, tokens)
+
+    markdown = step_rule('tags', remove_tags, _text(tokens))
+    markdown = step_rule('unescape', unescape, markdown)
+    markdown = step_rule(
+        'whitespace',
+        lambda c: _WHITESPACE_RE.sub(lambda m: '\n\n' if m.group(0)[0] == '\n' else ' ', c),
+        markdown
+    )
+    markdown = step_rule('list_indent', lambda c: c.replace(LIST_INDENT, ' '), markdown)
+    return markdown.strip()
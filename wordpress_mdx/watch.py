@@ -0,0 +1,416 @@
+"""Watch mode: converting only the posts that changed whenever the export is saved again.
+
+A conversion run that ends in watch mode keeps what it built in memory:
+the manifest, the blog index entries, the search index and the related
+posts vectors, plus every post of the export, parsed, with a hash of its
+<post> element; the run hands over the posts it parsed, so the export is
+not parsed again. When the export's modification time, size or inode
+changes, the new file is split into its <post> elements with one scan of
+the bytes; only elements whose hash is new are parsed, and posts are
+matched to the loaded ones by id. The scan is checked against the run's
+parse: when they find a different number of posts, as in an export whose
+encoding the scan cannot read, every change parses the whole export and
+compares the posts field by field instead. Added and changed posts are converted
+and removed ones are dropped from the indexes; their pages are published
+with the blog index, the sitemap and the feeds. Nothing is read back from
+the target directory. The search index, the related posts state and the
+manifest, whose files take longer to write, are saved once the export
+stops changing.
+
+An export that is still being written does not end in the close tag of
+its root element, or has a <post> element cut short; it is skipped until
+the next change.
+"""
+
+import hashlib
+import io
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+
+from .assets import asset_key, collect_asset_urls, copy_new_assets, load_asset_map
+from .export import iter_posts, join_seo, load_seo_index, record_fields
+from .feeds import stage_feeds, stale_feed_files
+from .manifest import find_orphans, iter_changed_posts, save_manifest
+from .output import OutputWriter
+from .pipeline import (iter_results, remove_stale_indexes, report_post, stage_blog_index,
+                       stage_search_index, write_result)
+from .related import RELATED_NAME, term_counts
+
+
+# Seconds between two looks at the export
+DEFAULT_INTERVAL = 0.2
+
+# Seconds the export stays unchanged before the files that take longer to
+# write are saved, so saves in quick succession are not held up by them
+SAVE_DELAY = 2.0
+
+# The close tag of the root element, after which the export is complete
+_ROOT_END_RE = re.compile(rb'</[\w:.-]+>\s*\Z')
+
+# The XML declaration, which names the encoding the elements are parsed with
+_DECLARATION_RE = re.compile(rb'(?:\xef\xbb\xbf)?<\?xml\b[^>]*\?>')
+
+_POST_START_RE = re.compile(rb'<post(?=[\s/>])')
+_POST_END_RE = re.compile(rb'</post\s*>')
+
+
+class IncompleteExport(ValueError):
+    """An export that is still being written, or is not one."""
+
+
+def iter_post_elements(data):
+    """Yield the bytes of each <post> element of an export, from its start tag to </post>.
+
+    The start tag may have attributes. A </post> inside a CDATA section,
+    which leaves one of the element's sections open, does not end the
+    element. The scan reads bytes, so it finds no element in an export
+    whose encoding is not ASCII-compatible, such as UTF-16.
+    """
+    if not _ROOT_END_RE.search(data):
+        raise IncompleteExport("the export does not end in the close tag of its root element")
+    position = 0
+    while True:
+        match = _POST_START_RE.search(data, position)
+        if match is None:
+            return
+        start = match.start()
+        tag_end = data.find(b'>', start)
+        if data[tag_end - 1:tag_end] == b'/':
+            position = tag_end + 1
+            yield data[start:position]
+            continue
+        end = _POST_END_RE.search(data, tag_end)
+        while end and data.count(b'<![CDATA[', start, end.start()) != data.count(b']]>', start,
+                                                                                  end.start()):
+            end = _POST_END_RE.search(data, end.end())
+        if end is None:
+            raise IncompleteExport("a <post> element is not closed")
+        position = end.end()
+        yield data[start:position]
+
+
+def xml_declaration(data):
+    """The XML declaration data starts with, or b''."""
+    match = _DECLARATION_RE.match(data)
+    return match.group() if match else b''
+
+
+def file_state(path):
+    """What tells a new version of a file: (mtime_ns, size, inode), or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class ExportSnapshot:
+    """The posts of the latest version of an export, parsed, with a hash of each <post> element.
+
+    scan says whether iter_post_elements finds the posts the parser does;
+    it is checked whenever the whole export is parsed. Without it, the
+    hashes are None and posts are compared by their fields.
+    """
+
+    def __init__(self):
+        self.posts = {}
+        self.hashes = {}
+        self.seeded = False
+        self.scan = True
+
+    def seed(self, data, records):
+        """Load the export data, of which records are the parsed posts; return whether the scan agrees.
+
+        The elements the scan finds are paired with the records in order,
+        so nothing is parsed again.
+        """
+        try:
+            digests = [hashlib.sha256(element).digest() for element in iter_post_elements(data)]
+        except IncompleteExport:
+            digests = []
+        self.scan = len(digests) == len(records)
+        if not self.scan:
+            digests = [None] * len(records)
+        self.posts = {}
+        self.hashes = {}
+        for digest, fields in zip(digests, records):
+            post_id = fields.get('id', 'unknown')
+            self.posts[post_id] = fields
+            self.hashes[post_id] = digest
+        self.seeded = True
+        return self.scan
+
+    def diff(self, data):
+        """Load a new version of the export; return (added or changed records, removed ids).
+
+        Records are in export order. Raises IncompleteExport, leaving the
+        snapshot as it was, when data is not a whole export. The first
+        diff of a snapshot that was not seeded parses the whole export.
+        """
+        if not (self.seeded and self.scan):
+            return self._diff_parsed(data)
+        known = {digest: post_id for post_id, digest in self.hashes.items()}
+        declaration = xml_declaration(data)
+        posts = {}
+        hashes = {}
+        changed = []
+        for element in iter_post_elements(data):
+            digest = hashlib.sha256(element).digest()
+            post_id = known.get(digest)
+            if post_id is None:
+                try:
+                    fields = record_fields(ET.fromstring(declaration + element))
+                except ET.ParseError as e:
+                    raise IncompleteExport(f"a <post> element does not parse: {e}") from e
+                post_id = fields.get('id', 'unknown')
+                changed.append(fields)
+            else:
+                fields = self.posts[post_id]
+            posts[post_id] = fields
+            hashes[post_id] = digest
+        removed = [post_id for post_id in self.posts if post_id not in posts]
+        self.posts = posts
+        self.hashes = hashes
+        return changed, removed
+
+    def _diff_parsed(self, data):
+        """diff by parsing the whole export, which seeds the snapshot again."""
+        try:
+            records = list(iter_posts(io.BytesIO(data)))
+        except ET.ParseError as e:
+            raise IncompleteExport(f"the export does not parse: {e}") from e
+        posts = self.posts
+        hashes = self.hashes
+        self.seed(data, records)
+        changed = [fields for fields in records
+                   if fields.get('id', 'unknown') not in hashes
+                   or posts[fields.get('id', 'unknown')] != fields]
+        removed = [post_id for post_id in posts if post_id not in self.posts]
+        return changed, removed
+
+    def forget(self, post_id):
+        """Treat a post as changed on the next diff, such as one that failed to convert."""
+        self.hashes.pop(post_id, None)
+
+
+class WatchSession:
+    """The outputs of a finished conversion run, updated in memory as the export changes.
+
+    manifest, index, search and related are the run's manifest entries,
+    blog index entries, SearchIndexBuilder and RelatedPosts; index, search
+    and related are None when the run does not write them. settings holds
+    the rest of what a run converts with: converter, redirects, public_dir,
+    assets, hosts, cache, feeds_dir and feeds_path, as cli.run computes them.
+    """
+
+    def __init__(self, args, settings, manifest, orphans, index=None, search=None, related=None):
+        self.args = args
+        self.settings = settings
+        self.manifest = manifest
+        self.orphans = orphans
+        self.index = index
+        self.search = search
+        self.related = related
+        self.snapshot = ExportSnapshot()
+        self.unsaved = False
+        self.seo_index = load_seo_index(args.csv) if args.csv else None
+
+    def seed(self, data, records, failed=()):
+        """Start from the export the run converted: data, whose posts it parsed into records.
+
+        The failed posts of the run are converted again on the first refresh.
+        """
+        self.snapshot.seed(data, records)
+        for post_id in failed:
+            self.snapshot.forget(post_id)
+
+    def _records(self, records):
+        """Records as the run converts them: with the CSV's SEO columns, images copied first."""
+        if self.seo_index is not None:
+            # join_seo takes the rows it uses out of the index it is given
+            records = join_seo(records, dict(self.seo_index))
+        records = list(records)
+        settings = self.settings
+        if settings['assets']:
+            args = self.args
+            copied, failed = copy_new_assets(
+                collect_asset_urls(records, settings['hosts']), settings['asset_dir'],
+                settings['url_prefix'], settings['assets'], settings['hosts'],
+                args.asset_concurrency)
+            if copied:
+                print(f"✓ Copied {len(copied)} image(s)")
+            for url, reason in failed.items():
+                print(f"✗ Could not copy {url}: {reason}")
+        return records
+
+    def refresh(self, data, reload_csv=False):
+        """Bring the output up to date with a new version of the export; return the run summary.
+
+        With reload_csv the CSV export is read again and every post is
+        compared with its manifest entry, as its SEO columns may have changed.
+        """
+        started = time.perf_counter()
+        args = self.args
+        settings = self.settings
+        target_dir = args.target_dir
+        changed, removed = self.snapshot.diff(data)
+        if reload_csv and args.csv:
+            self.seo_index = load_seo_index(args.csv)
+            changed = list(self.snapshot.posts.values())
+
+        summary = {
+            'target_dir': target_dir, 'processed': 0, 'errors': [], 'created_posts': [],
+            'html_check_errors': [], 'quarantined': [], 'cache_hits': 0, 'links_rewritten': 0,
+            'assets_localized': 0, 'images_sized': 0, 'dry_run': False,
+            'writes': {'created': 0, 'updated': 0, 'unchanged': 0}, 'profiles': [],
+            'removed': removed, 'converted': 0, 'orphans': self.orphans,
+        }
+        if not changed and not removed:
+            summary['seconds'] = time.perf_counter() - started
+            return summary
+
+        records = self._records(changed)
+        copies = load_asset_map(settings['assets']) if settings['assets'] else None
+        current = {}
+        pending = list(iter_changed_posts(
+            records, self.manifest, current, target_dir, settings['converter'],
+            asset_key=(lambda fields: asset_key(fields, settings['hosts'], copies))
+            if settings['assets'] else None))
+        if not pending and not removed:
+            summary['seconds'] = time.perf_counter() - started
+            return summary
+        # A worker pool only pays off once it has more than a few posts to convert
+        jobs = args.jobs if len(pending) > args.jobs * args.chunk_size else 1
+
+        previous = dict(self.manifest)
+        for post_id in removed:
+            self.manifest.pop(post_id, None)
+            if self.index is not None:
+                self.index.pop(post_id, None)
+        self.manifest.update(current)
+
+        feeds_dir = settings['feeds_dir']
+        with OutputWriter(target_dir, args.fsync_batch) as writer, \
+                OutputWriter(feeds_dir or target_dir, args.fsync_batch) as feed_writer:
+            for result in iter_results(pending, args.engine, args.template, jobs=jobs,
+                                       chunk_size=args.chunk_size, timeout=args.timeout,
+                                       cache=settings['cache'], redirects=settings['redirects'],
+                                       public_dir=settings['public_dir'], assets=settings['assets']):
+                write_result(result, writer)
+                report_post(result, summary)
+                if result['error']:
+                    # Converted again on the next run, and once the post is saved again
+                    self.manifest.pop(result['id'], None)
+                    self.snapshot.forget(result['id'])
+                    continue
+                if self.index is not None:
+                    self.index[result['id']] = result['index']
+                if self.search is not None:
+                    self.search.update(result['id'], result['slug'], result['title'],
+                                       result['search'])
+                if self.related is not None:
+                    self.related.update(result['id'], term_counts(result['search']))
+
+            index_files = None
+            if self.index is not None:
+                index_files = stage_blog_index(writer, self.snapshot.posts, self.index,
+                                               self.related, args.index, args.index_shard_size,
+                                               summary)
+            if feeds_dir:
+                feed_files = stage_feeds(feed_writer, (self.index[post_id] for post_id in
+                                                       self.snapshot.posts if post_id in self.index),
+                                         args.site_url, path=settings['feeds_path'],
+                                         sitemap=args.sitemap)
+            writer.publish()
+            feed_writer.publish()
+        remove_stale_indexes(target_dir, index_files, args.index)
+        if feeds_dir:
+            for name in stale_feed_files(feeds_dir, feed_files):
+                os.remove(os.path.join(feeds_dir, name))
+
+        self.orphans = find_orphans(previous, self.orphans, self.manifest, target_dir)
+        self.unsaved = True
+        summary['converted'] = len(pending)
+        summary['orphans'] = self.orphans
+        summary['seconds'] = time.perf_counter() - started
+        return summary
+
+    def save(self):
+        """Write the search index, the related posts state and the manifest of the latest refreshes.
+
+        The manifest goes last, so a watcher stopped before then leaves a
+        manifest from which the next run converts those posts again.
+        """
+        if not self.unsaved:
+            return
+        started = time.perf_counter()
+        args = self.args
+        if self.related is not None:
+            with OutputWriter(args.target_dir, args.fsync_batch) as writer:
+                writer.stage_file(RELATED_NAME, self.related.dump())
+                writer.publish()
+        if self.search is not None:
+            with OutputWriter(self.search.index_dir, args.fsync_batch) as writer:
+                stage_search_index(writer, self.snapshot.posts, self.search)
+                writer.publish()
+            remove_stale_indexes(args.target_dir, search=self.search)
+        save_manifest(self.settings['manifest_path'], self.manifest, self.orphans)
+        self.unsaved = False
+        print(f"✓ Saved the search index, related posts and manifest in "
+              f"{time.perf_counter() - started:.2f}s")
+
+    def watch(self, interval=DEFAULT_INTERVAL, seen=None):
+        """Refresh whenever the export or the CSV export changes, until interrupted.
+
+        seen holds the file_state of the files as the run read them, so
+        the first look only refreshes when they changed since.
+
+        Pages, the blog index, the sitemap and the feeds are published by
+        each refresh. The search index, the related posts state and the
+        manifest take longer to write, so they are saved once the export
+        has not changed for SAVE_DELAY seconds, and when watching stops.
+        """
+        xml_file = self.args.xml
+        paths = [xml_file] + ([self.args.csv] if self.args.csv else [])
+        seen = dict(seen or {})
+        refreshed = 0
+        print(f"\nWatching {', '.join(paths)} for changes; press Ctrl-C to stop")
+        try:
+            while True:
+                states = {path: file_state(path) for path in paths}
+                changed = [path for path in paths if states[path] != seen.get(path)]
+                if not changed or states[xml_file] is None:
+                    if time.monotonic() - refreshed >= SAVE_DELAY:
+                        self.save()
+                    time.sleep(interval)
+                    continue
+                first = not seen
+                seen = states
+                try:
+                    with open(xml_file, 'rb') as f:
+                        data = f.read()
+                    summary = self.refresh(data, reload_csv=not first and self.args.csv in changed)
+                except IncompleteExport as e:
+                    print(f"… Waiting for the export to be written completely: {e}")
+                    continue
+                except OSError as e:
+                    print(f"✗ Could not read {xml_file}: {e}")
+                    continue
+                refreshed = time.monotonic()
+                self.report(summary)
+        except KeyboardInterrupt:
+            self.save()
+            print("\nStopped watching")
+
+    def report(self, summary):
+        """Print what a refresh did in one line, and the problems it found."""
+        writes = summary['writes']
+        print(f"↻ {time.strftime('%H:%M:%S')} {summary['converted']} post(s) converted "
+              f"({writes['created']} created, {writes['updated']} updated), "
+              f"{len(summary['removed'])} removed, in {summary['seconds']:.2f}s")
+        for item in summary['html_check_errors']:
+            print(f"  ⚠ HTML tags in {item['file']}: {', '.join(item['tags'][:3])}")
+        for slug in summary['orphans']:
+            print(f"  ⚠ No post in the export writes {os.path.join(summary['target_dir'], slug)} anymore")
@@ -0,0 +1,158 @@
+"""The wordpress engine: the lighter cleanup Rules/migrate_blog_posts.py used.
+
+It only handles the plain tags the block editor writes (no attributes on
+paragraphs, headings or inline tags) and leaves anything else in place.
+Elements are paired up in one forward scan each (see
+markup.replace_elements) rather than with ``<tag>(.*?)</tag>`` patterns,
+which rescan the rest of the post for every tag left open.
+"""
+
+import re
+from html import unescape
+
+from .markup import attr_value, replace_elements, wrap_elements
+from .profiling import step_rule, sub_rule
+
+
+# Headings and inline tags, each kind converted in one wrap_elements pass:
+# tag name -> markdown for the opening and closing tag. Like the
+# ``<tag>(.*?)</tag>`` rules they replace, elements may not span lines.
+HEADING_MARKERS = {f'h{i}': ('#' * i + ' ', '') for i in range(1, 7)}
+INLINE_MARKERS = {'strong': ('**', '**'), 'b': ('**', '**'), 'em': ('*', '*'), 'i': ('*', '*')}
+
+
+def _tag_re(markers):
+    names = '|'.join(markers)
+    return re.compile(f'<({names})>|</({names})>')
+
+
+_HEADING_TAG_RE = _tag_re(HEADING_MARKERS)
+_INLINE_TAG_RE = _tag_re(INLINE_MARKERS)
+
+# Only links whose first attribute is the href, as in <a href="(.*?)"[^>]*>
+_LINK_TAG_RE = re.compile(r'<a href="([^"\n]*)"[^<>]*>|</a>')
+_IMG_TAG_RE = re.compile(r'<img(\s[^<>]*)>')
+
+
+def _element_rule(opening, closing, render, single_line=False):
+    """Compile a ``opening(.*?)closing`` rule applied with replace_elements; render(inner) replaces it."""
+    tag_re = re.compile(f'{re.escape(opening)}()|{re.escape(closing)}')
+    return lambda content: replace_elements(content, tag_re, lambda attrs: attrs,
+                                            lambda attrs, inner: render(inner), single_line)
+
+
+def _comment_rule(opening):
+    """Compile a ``<!-- wp:[^>]+ -->\\n?`` rule for comments starting with opening.
+
+    Each comment ends at the first '>' after it, so the scan moves on from
+    there, where the pattern would search to the next '>' again from every
+    opening.
+    """
+    def strip(content):
+        out = []
+        pos = search = 0
+        while True:
+            start = content.find(opening, search)
+            if start < 0:
+                break
+            end = content.find('>', start + len(opening))
+            if end < 0:
+                break
+            search = end + 1
+            # At least one character between the opening and ' -->'
+            if end - 3 > start + len(opening) and content.startswith(' --', end - 3):
+                out.append(content[pos:start])
+                pos = search = end + 2 if content.startswith('\n', end + 1) else end + 1
+        out.append(content[pos:])
+        return ''.join(out)
+
+    return strip
+
+
+def convert_links(content):
+    """Convert <a href> links on one line to markdown."""
+    return replace_elements(
+        content, _LINK_TAG_RE,
+        lambda href: href,
+        lambda href, text: f'[{text}]({href})',
+        single_line=True
+    )
+
+
+def _image(match):
+    attrs = match.group(1)
+    # The src comes before the alt, or without an alt the <img /> is self-closed
+    alt = attr_value(attrs, 'alt', empty=True)
+    src = None if alt is None else attr_value(attrs[:attrs.lower().rfind('alt=')], 'src')
+    if src is None:
+        alt = None
+        if attrs.endswith('/'):
+            src = attr_value(attrs, 'src')
+    if src is None:
+        return match.group(0)
+    return f'![{alt or ""}]({src})'
+
+
+# The cleanup, compiled once: (rule name, pattern, replacement) applied in
+# order, or (rule name, None, function) for rules that are not a single
+# substitution.
+RULES = [
+    # Remove WordPress block comments
+    ('wp_comments', None, _comment_rule('<!-- wp:')),
+    ('wp_closing_comments', None, _comment_rule('<!-- /wp:')),
+
+    # Convert HTML paragraph tags to markdown
+    ('p', None, _element_rule('<p>', '</p>', lambda inner: inner + '\n')),
+
+    # Convert HTML headings to markdown
+    ('headings', None, lambda c: wrap_elements(c, _HEADING_TAG_RE, HEADING_MARKERS, single_line=True)),
+
+    # Convert HTML lists to markdown
+    ('ul_open', re.compile(r'<ul>\s*'), ''),
+    ('ul_close', re.compile(r'</ul>\s*'), '\n'),
+    ('ol_open', re.compile(r'<ol>\s*'), ''),
+    ('ol_close', re.compile(r'</ol>\s*'), '\n'),
+    ('li', None, _element_rule('<li>', '</li>', lambda inner: '- ' + inner)),
+
+    # Convert HTML strong/bold and emphasis/italic to markdown
+    ('inline', None, lambda c: wrap_elements(c, _INLINE_TAG_RE, INLINE_MARKERS, single_line=True)),
+
+    # Convert HTML links to markdown
+    ('link', None, convert_links),
+
+    # Convert HTML images to markdown
+    ('image', _IMG_TAG_RE, _image),
+
+    # Convert HTML blockquotes to markdown
+    ('blockquote', None, _element_rule('<blockquote>', '</blockquote>', lambda inner: '> ' + inner.strip())),
+
+    # Convert HTML code blocks
+    ('pre', None, _element_rule('<pre><code>', '</code></pre>', lambda inner: f'```\n{inner}\n```')),
+    ('code', None, _element_rule('<code>', '</code>', lambda inner: f'`{inner}`', single_line=True)),
+
+    # Convert HTML line breaks
+    ('br', re.compile(r'<br\s*/?>'), '\n'),
+
+    # Unescape HTML entities
+    ('unescape', None, unescape),
+
+    # Clean up multiple newlines
+    ('blank_lines', re.compile(r'\n\n\n+'), '\n\n'),
+]
+
+
+def clean_wordpress_content(content):
+    """
+    Remove WordPress block comments and convert HTML to clean Markdown
+    """
+    if not content:
+        return ''
+
+    for rule, pattern, repl in RULES:
+        if pattern is None:
+            content = step_rule(rule, repl, content)
+        else:
+            content = sub_rule(rule, pattern, repl, content)
+
+    # Strip leading/trailing whitespace
+    return content.strip()